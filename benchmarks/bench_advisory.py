@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_advisory.py
+
+Reproducible benchmark of the advisory serving path (run from the repo root):
+
+    python benchmarks/bench_advisory.py                 # writes benchmarks/results/<commit>.json
+    python benchmarks/bench_advisory.py --quick         # smaller sample sizes
+    python benchmarks/bench_advisory.py --compare benchmarks/results/<old>.json
+
+Covers
+- cold start: import, Predictor.load() and first prediction in a fresh process
+- warm single-request latency (p50/p95/p99), cache off
+- known-district vs village vs no-data (fallback profile) vs GPS outside
+  every polygon (nearest-district blend) latency
+- batch throughput at several batch sizes
+- warm latency with the advisory cache on (plus SHAP explanation stats)
+- memory high-water mark (ru_maxrss) of a process that loaded and scored
+- in-memory size of the serving dataset frame vs a default-dtype read
+
+Inputs come from benchmarks/workload.py (village map + district list) with
+a fixed seed, so runs on different commits see the same requests.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from load_serve import percentile
+from startup_report import LOAD_SNIPPET, run_python
+from workload import load_places, sample_inputs
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+MEMORY_SNIPPET = """
+import json, resource
+from workload import sample_inputs
+import predict
+p = predict.Predictor().load()
+after_load = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+p.predict_crops_batch(sample_inputs(%d, seed=7))
+after_batch = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"after_load_mb": after_load / 1024, "after_batch_mb": after_batch / 1024}))
+"""
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(latencies_ms):
+    values = sorted(latencies_ms)
+    return {
+        "n": len(values),
+        "mean_ms": round(sum(values) / len(values), 4),
+        "p50_ms": round(percentile(values, 50), 4),
+        "p95_ms": round(percentile(values, 95), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "max_ms": round(values[-1], 4),
+    }
+
+
+def time_single(predictor, inputs):
+    latencies = []
+    for farmer_input in inputs:
+        start = time.perf_counter()
+        predictor.predict_crop(farmer_input)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies)
+
+
+def bench_cold_start(repeats):
+    runs = [
+        json.loads(run_python(["-c", LOAD_SNIPPET]).stdout.strip().splitlines()[-1])
+        for _ in range(repeats)
+    ]
+    return {
+        stage: {
+            "min_ms": round(min(r[stage] for r in runs), 2),
+            "median_ms": round(sorted(r[stage] for r in runs)[len(runs) // 2], 2),
+        }
+        for stage in runs[0]
+    }
+
+
+def bench_memory(batch_size):
+    snippet = "import sys; sys.path.insert(0, 'benchmarks')\n" + MEMORY_SNIPPET % batch_size
+    result = json.loads(run_python(["-c", snippet]).stdout.strip().splitlines()[-1])
+    return {k: round(v, 1) for k, v in result.items()} | {"batch_size": batch_size}
+
+
+def bench_paths(predictor, n):
+    places = load_places()
+    paths = {}
+    for kind in ("district", "village", "fallback", "gps_outside"):
+        inputs = sample_inputs(n, seed=11, mix=((kind, 1.0),))
+        # also warms lazily loaded lookups (the polygon grid for GPS)
+        advisories = predictor.predict_crops_batch(inputs)
+        result = time_single(predictor, inputs)
+        result["fallback_share"] = round(
+            sum(a["fallback_level"] != "DISTRICT" for a in advisories) / len(advisories), 3
+        )
+        result["nearest_district_share"] = round(
+            sum(a["fallback_level"] == "NEAREST_DISTRICT" for a in advisories) / len(advisories), 3
+        )
+        result["places"] = len(places[kind])
+        paths[kind] = result
+    return paths
+
+
+def bench_batches(predictor, sizes, repeats):
+    results = {}
+    for size in sizes:
+        inputs = sample_inputs(size, seed=13)
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predictor.predict_crops_batch(inputs)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[str(size)] = {
+            "seconds": round(best, 4),
+            "inputs_per_second": round(size / best, 1),
+        }
+    return results
+
+
+def run(args):
+    from advisory_cache import AdvisoryCache
+    from district_profiles import memory_report
+    from predict import Predictor
+
+    n_single = 200 if args.quick else 1000
+    sizes = [1, 100, 1000] if args.quick else [1, 100, 1000, 10000]
+
+    print("cold start...", flush=True)
+    cold = bench_cold_start(2 if args.quick else 5)
+
+    predictor = Predictor().load()
+    warmup = sample_inputs(50, seed=1)
+    predictor.predict_crops_batch(warmup)
+
+    print("warm single-request latency...", flush=True)
+    single = time_single(predictor, sample_inputs(n_single, seed=5))
+
+    print("known vs fallback vs nearest-district paths...", flush=True)
+    paths = bench_paths(predictor, n_single // 4)
+
+    print("batch throughput...", flush=True)
+    batches = bench_batches(predictor, sizes, 2 if args.quick else 3)
+
+    print("warm latency with cache...", flush=True)
+    cached = Predictor(cache=AdvisoryCache()).load()
+    cached.predict_crops_batch(sample_inputs(n_single, seed=5))
+    cached_single = time_single(cached, sample_inputs(n_single, seed=5))
+    cached_single["cache"] = cached.cache.stats()
+    cached_single["explanations"] = cached.explainer.stats()
+
+    print("memory high-water mark...", flush=True)
+    memory = bench_memory(sizes[-1])
+    memory["dataset"] = memory_report(predictor.features, predictor.cat_features, predictor.data_path)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "cold_start": cold,
+        "warm_single": single,
+        "paths": paths,
+        "batch_throughput": batches,
+        "warm_single_cached": cached_single,
+        "memory": memory,
+    }
+
+
+def flatten(report, prefix=""):
+    out = {}
+    for k, v in report.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = v
+    return out
+
+
+def compare(old, new):
+    """
+    Prints every numeric metric that exists in both reports with its change.
+    """
+    a, b = flatten(old), flatten(new)
+    print(f"\n{'metric':<52} {'old':>12} {'new':>12} {'change':>9}")
+    for key in sorted(a.keys() & b.keys()):
+        if key.startswith("meta."):
+            continue
+        change = (b[key] - a[key]) / a[key] * 100 if a[key] else 0.0
+        print(f"{key:<52} {a[key]:>12.4g} {b[key]:>12.4g} {change:>8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="smaller samples for a fast check")
+    parser.add_argument("--out", help="JSON output path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier report to diff against")
+    args = parser.parse_args()
+
+    report = run(args)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{report['meta']['commit']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    print("\nSaved benchmark report to", out)
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
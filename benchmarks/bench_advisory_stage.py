@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_advisory_stage.py
+
+Scalar vs array post-model advisory chain (run from the repo root):
+
+    python benchmarks/bench_advisory_stage.py            # 100k rows
+    python benchmarks/bench_advisory_stage.py --rows 20000
+
+Synthetic model outputs and soil/NDVI columns (fixed seed) go through
+    soil_health_bands -> advise -> explain_prediction           per row
+    soil_health_bands_batch -> advise_batch -> explain_prediction_batch
+The two results must be identical (as JSON); reports time and rows/s for each path
+and the speedup. No model is loaded.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from explain import explain_prediction, explain_prediction_batch
+from predict import ZONES, advise, advise_batch, confidence_band_relative_batch
+from soil_health import soil_health_bands, soil_health_bands_batch
+
+FALLBACK_LEVELS = ["DISTRICT", "NEAREST_DISTRICT", "STATE"]
+
+
+def known_crops():
+    crops = set()
+    for path in ("data/fertilizer_rules.csv", "data/market_reference.csv"):
+        with open(ROOT / path, newline="", encoding="utf-8") as f:
+            crops.update(row["crop"] for row in csv.DictReader(f) if row["crop"] != "*")
+    return sorted(crops) + ["Onion", "Banana", "Sugarcane"]
+
+
+def synthetic_columns(n, seed):
+    rng = np.random.default_rng(seed)
+    crops = np.array(known_crops(), dtype=object)
+
+    probs = np.sort(rng.dirichlet(np.ones(8), size=n)[:, :3], axis=1)[:, ::-1]
+    top1_conf = confidence_band_relative_batch(probs[:, 0], probs[:, 1]).astype(object)
+    ndvi = rng.uniform(0.1, 0.7, n)
+    ndvi[rng.random(n) < 0.01] = np.nan
+
+    return {
+        "top3_crops": np.stack([rng.choice(crops, n) for _ in range(3)], axis=1),
+        "top3_probs": probs,
+        "top1_conf": top1_conf,
+        "safe_mode": (top1_conf == "LOW") | (ndvi < 0.28),
+        "nitrogen": rng.normal(45, 20, n),
+        "phosphorus": rng.normal(35, 15, n),
+        "potassium": rng.normal(35, 15, n),
+        "ndvi_value": ndvi,
+        "zone": rng.choice(np.array(ZONES + [None], dtype=object), n),
+        "fallback_level": rng.choice(np.array(FALLBACK_LEVELS, dtype=object), n),
+        "radius_km": rng.uniform(5, 400, n),
+    }
+
+
+def run_scalar(c, season):
+    advisories, explanations = [], []
+    for i in range(len(c["zone"])):
+        soil_health = soil_health_bands(c["nitrogen"][i], c["phosphorus"][i], c["potassium"][i])
+        advisory = advise(
+            c["top3_crops"][i].tolist(), c["top3_probs"][i].tolist(), c["top1_conf"][i],
+            bool(c["safe_mode"][i]), soil_health, float(c["ndvi_value"][i]), c["zone"][i],
+            c["fallback_level"][i], float(c["radius_km"][i]), season
+        )
+        advisories.append(advisory)
+        explanations.append(explain_prediction(advisory))
+    return advisories, explanations
+
+
+def run_batch(c, season):
+    soil_health = soil_health_bands_batch(c["nitrogen"], c["phosphorus"], c["potassium"])
+    advisories = advise_batch(
+        c["top3_crops"], c["top3_probs"], c["top1_conf"], c["safe_mode"], soil_health,
+        c["ndvi_value"], c["zone"], c["fallback_level"], c["radius_km"], season
+    )
+    explanations = explain_prediction_batch(
+        c["top1_conf"],
+        [a["ndvi_value"] for a in advisories],
+        soil_health["overall"],
+        c["zone"],
+        c["fallback_level"],
+        [a["data_trust_level"]["radius_km"] for a in advisories],
+        c["safe_mode"]
+    )
+    return advisories, explanations
+
+
+def timed_run(fn, columns, season):
+    start = time.perf_counter()
+    result = fn(columns, season)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.rows, args.seed)
+    season = "Kharif"
+
+    # warm the rule/market stores so file loading is not timed
+    run_batch(synthetic_columns(100, args.seed + 1), season)
+
+    scalar, scalar_seconds = timed_run(run_scalar, columns, season)
+    batch, batch_seconds = timed_run(run_batch, columns, season)
+
+    # compared as serialized, so NaN NDVI values count as equal
+    for i, (a, b) in enumerate(zip(zip(*scalar), zip(*batch))):
+        if json.dumps(a) != json.dumps(b):
+            raise SystemExit(f"❌ array path differs from scalar path at row {i}")
+
+    print(json.dumps({
+        "rows": args.rows,
+        "scalar_seconds": round(scalar_seconds, 3),
+        "batch_seconds": round(batch_seconds, 3),
+        "scalar_rows_per_second": round(args.rows / scalar_seconds),
+        "batch_rows_per_second": round(args.rows / batch_seconds),
+        "speedup": round(scalar_seconds / batch_seconds, 1),
+        "identical": True,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_columnar.py
+
+CSV vs columnar copy of the processed datasets (run from the repo root):
+
+    python benchmarks/bench_columnar.py
+    python benchmarks/bench_columnar.py data/processed/tn_ml_ndvi_only.csv --repeats 10
+
+Each dataset is written to a temporary directory as CSV + columnar copy
+(src/columnar.py, Feather when pyarrow is installed, .npy otherwise), so
+the tree is not touched. Reports on-disk size and best-of-N load time for
+the full table, a 4-column projection, and the serving read of
+district_profiles (categoricals + float32). Both reads must give equal frames.
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from columnar import arrow_available, columnar_source, read_dataset, write_dataset
+
+DATASETS = [
+    "data/processed/tn_crop_with_soil.csv",
+    "data/processed/tn_final_ml_dataset.csv",
+    "data/processed/tn_ml_ndvi_only.csv",
+]
+
+
+def disk_bytes(path):
+    path = Path(path)
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.iterdir())
+    return path.stat().st_size
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def serving_dtypes(df):
+    return {
+        c: "float32" if pd.api.types.is_numeric_dtype(df[c]) else "category"
+        for c in df.columns
+    }
+
+
+def bench_dataset(source, workdir, repeats):
+    csv_path = Path(workdir) / Path(source).name
+    df = pd.read_csv(ROOT / source, low_memory=False)
+    write_dataset(df, csv_path)
+    _, columnar_path = columnar_source(csv_path)
+
+    some = df.columns[:4].tolist()
+    dtype = serving_dtypes(df)
+    reads = {
+        "full": ({}, {}),
+        "4_columns": ({"usecols": some}, {"columns": some}),
+        "serving": ({"dtype": dtype}, {"dtype": dtype}),
+    }
+
+    result = {
+        "rows": len(df),
+        "columns": df.shape[1],
+        "csv_bytes": disk_bytes(csv_path),
+        "columnar_bytes": disk_bytes(columnar_path),
+    }
+    for name, (csv_kwargs, columnar_kwargs) in reads.items():
+        from_csv, csv_seconds = best_of(
+            lambda: pd.read_csv(csv_path, low_memory=False, **csv_kwargs), repeats
+        )
+        from_columnar, columnar_seconds = best_of(
+            lambda: read_dataset(csv_path, **columnar_kwargs), repeats
+        )
+        pd.testing.assert_frame_equal(from_csv, from_columnar)
+        result[name] = {
+            "csv_ms": round(csv_seconds * 1e3, 2),
+            "columnar_ms": round(columnar_seconds * 1e3, 2),
+            "speedup": round(csv_seconds / columnar_seconds, 1),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("datasets", nargs="*", default=DATASETS)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_columnar_")
+    try:
+        report = {
+            "backend": "feather" if arrow_available() else "npy",
+            "repeats": args.repeats,
+            "datasets": {d: bench_dataset(d, workdir, args.repeats) for d in args.datasets},
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
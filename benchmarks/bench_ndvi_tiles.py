@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_ndvi_tiles.py
+
+NDVI from red/NIR tiles (src/ndvi_tiles.py) on a synthetic scene (run
+from the repo root):
+
+    python benchmarks/bench_ndvi_tiles.py
+    python benchmarks/bench_ndvi_tiles.py --rows 8000 --cols 8000 --block-pixels 250000 1000000
+
+One uint16 red/NIR/qa tile with no-data and clouds is written to a
+temporary directory (district rasters too, so the tree is not touched),
+then reduced once per block size, each in a fresh process so its peak
+RSS is its own. Every run must match NDVI computed over the whole scene
+in memory and grouped with pandas.
+"""
+import argparse
+import json
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from district_polygons import GEOJSON_PATH, district_names, load_district_grid
+from ndvi_tiles import build_district_raster, find_tiles, open_tile, tile_stats
+from zonal_ndvi import raster_districts
+
+SIDECAR = {"date": "2022-06-15", "lon0": 77.6, "lat0": 11.7, "dlon": 0.0001, "dlat": -0.0001,
+           "nodata": 0, "scale": 0.0001, "cloud_bits": 1024}
+
+
+def write_scene(workdir, rows, cols, seed=42):
+    rng = np.random.default_rng(seed)
+    stem = Path(workdir) / "S2_BENCH_20220615"
+    for band, high in (("red", 3000), ("nir", 6000), ("qa", None)):
+        out = np.lib.format.open_memmap(f"{stem}_{band}.npy", mode="w+", dtype=np.uint16, shape=(rows, cols))
+        for r0 in range(0, rows, 1000):
+            r1 = min(rows, r0 + 1000)
+            if high is None:
+                out[r0:r1] = (rng.random((r1 - r0, cols)) < 0.1) * 1024
+            else:
+                block = rng.integers(1, high, (r1 - r0, cols), dtype=np.uint16)
+                block[rng.random(block.shape) < 0.01] = 0
+                out[r0:r1] = block
+        out.flush()
+        del out
+    with open(f"{stem}.json", "w", encoding="utf-8") as f:
+        json.dump(SIDECAR, f)
+
+
+def reference(workdir, geojson_path):
+    tile = find_tiles([workdir])[0]
+    red, nir, qa = (np.load(tile["bands"][b]) for b in ("red", "nir", "qa"))
+    grid = load_district_grid(geojson_path)
+    d = raster_districts(grid, SIDECAR["lon0"], SIDECAR["lat0"], SIDECAR["dlon"], SIDECAR["dlat"], red.shape)
+    r = red.astype(np.float32) * np.float32(SIDECAR["scale"])
+    n = nir.astype(np.float32) * np.float32(SIDECAR["scale"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ndvi = (n - r) / (n + r)
+    ok = (red != 0) & (nir != 0) & (qa & 1024 == 0) & (n + r > 0) & (d >= 0)
+    names = np.array([x.upper() for x in grid.names], dtype=object)
+    frame = pd.DataFrame({"District": names[d[ok]], "ndvi": ndvi[ok].astype(np.float64)})
+    return frame.groupby("District")["ndvi"].agg(["mean", "min", "max", "std", "count"]).reset_index()
+
+
+def measured_tile_stats(tile, names, geojson_path, block_pixels, cache_dir):
+    start = time.perf_counter()
+    result = tile_stats(tile, names, geojson_path, block_pixels, cache_dir)
+    result["seconds"] = time.perf_counter() - start
+    result["maxrss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--cols", type=int, default=5000)
+    parser.add_argument("--block-pixels", type=int, nargs="*", default=[250_000, 1_000_000, 4_000_000])
+    parser.add_argument("--geojson", default=GEOJSON_PATH)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_ndvi_tiles_")
+    try:
+        write_scene(workdir, args.rows, args.cols)
+        tile = find_tiles([workdir])[0]
+        names = district_names(args.geojson)
+        cache_dir = Path(workdir) / "zonal"
+
+        start = time.perf_counter()
+        build_district_raster(open_tile(tile, None)[1], args.geojson, cache_dir)
+        raster_seconds = time.perf_counter() - start
+        expected = reference(workdir, args.geojson)
+
+        runs = {}
+        for block_pixels in args.block_pixels:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                r = pool.submit(measured_tile_stats, tile, names, args.geojson, block_pixels, cache_dir).result()
+            if r["error"]:
+                raise SystemExit(r["error"])
+            got = r["stats"].result(suffix="_ndvi")
+            assert len(got) == len(expected), (len(got), len(expected))
+            for ours, theirs in (("mean_ndvi", "mean"), ("min_ndvi", "min"), ("max_ndvi", "max"), ("std_ndvi", "std")):
+                np.testing.assert_allclose(got[ours], expected[theirs], rtol=1e-9)
+            np.testing.assert_array_equal(got["observations"], expected["count"])
+            runs[block_pixels] = {
+                "seconds": round(r["seconds"], 3),
+                "pixels_per_sec": round(r["pixels"] / r["seconds"]),
+                "worker_maxrss_mb": round(r["maxrss_mb"], 1),
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps({
+        "pixels": args.rows * args.cols,
+        "band_mb": round(args.rows * args.cols * 2 / 2**20, 1),
+        "district_raster_seconds": round(raster_seconds, 3),
+        "districts": len(expected),
+        "block_pixels": runs,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_resolver.py
+
+Census-scale benchmark of src/location_resolver (run from the repo root):
+
+    python benchmarks/bench_resolver.py                  # 300k synthetic villages
+    python benchmarks/bench_resolver.py --villages 50000
+
+Village names are generated from Tamil place-name syllables with a fixed
+seed. Reports index build time, exact and fuzzy lookup latency (first
+sight and repeated, i.e. served from the fuzzy memo), and how often a
+one-character misspelling resolves to the right district; then
+the polygon grid build time and GPS point lookup latency / throughput for
+uniform points over the state's bounding box.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from load_serve import percentile
+from workload import load_places
+
+SYLLABLES = [
+    "ka", "ma", "pa", "ta", "na", "la", "ra", "va", "ku", "mu", "pu", "tu",
+    "ki", "ni", "ri", "vi", "thi", "thu", "cha", "chi", "pal", "pat", "pet",
+    "kot", "kal", "kur", "nal", "nur", "ur", "am", "ai", "an", "en", "il",
+]
+SUFFIXES = ["", "patti", "palayam", "puram", "kottai", "kulam", "nallur", "ur", "pettai", "halli"]
+
+
+def synthetic_villages(n, districts, seed):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        stem = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        names.add(stem + rng.choice(SUFFIXES))
+    return [(name, rng.choice(districts)) for name in sorted(names)]
+
+
+def misspell(name, rng):
+    i = rng.randrange(len(name))
+    edit = rng.choice(("drop", "swap", "double"))
+    if edit == "drop" and len(name) > 4:
+        return name[:i] + name[i + 1:]
+    if edit == "swap" and i < len(name) - 1:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + name[i] + name[i:]
+
+
+def time_lookups(index, names):
+    latencies = []
+    results = []
+    for name in names:
+        start = time.perf_counter()
+        results.append(index.lookup(name))
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return results, {
+        "n": len(latencies),
+        "mean_us": round(sum(latencies) / len(latencies), 2),
+        "p50_us": round(percentile(latencies, 50), 2),
+        "p99_us": round(percentile(latencies, 99), 2),
+    }
+
+
+def bench_coordinates(n, seed):
+    import numpy as np
+    from district_polygons import load_district_grid
+
+    start = time.perf_counter()
+    grid = load_district_grid()
+    build_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed)
+    x_min, y_min = grid.origin
+    lon = rng.uniform(x_min, x_min + grid.shape[1] * grid.cell, n)
+    lat = rng.uniform(y_min, y_min + grid.shape[0] * grid.cell, n)
+
+    start = time.perf_counter()
+    located = grid.locate(lon, lat)
+    batch_seconds = time.perf_counter() - start
+
+    latencies = []
+    for x, y in zip(lon[:2000].tolist(), lat[:2000].tolist()):
+        start = time.perf_counter()
+        grid.district_at(x, y)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+
+    return {
+        "districts": len(grid.names),
+        "grid_cells": grid.shape[0] * grid.shape[1],
+        "boundary_cell_share": round(float(grid.boundary.mean()), 3),
+        "build_seconds": round(build_seconds, 3),
+        "inside_share": round(float((located >= 0).mean()), 3),
+        "batch_points_per_second": round(n / batch_seconds),
+        "single_p50_us": round(percentile(latencies, 50), 2),
+        "single_p99_us": round(percentile(latencies, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--villages", type=int, default=300_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from location_resolver import VillageIndex
+
+    districts = load_places()["district"]
+    villages = synthetic_villages(args.villages, districts, args.seed)
+    truth = dict(villages)
+
+    start = time.perf_counter()
+    index = VillageIndex(villages, districts)
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(args.seed + 1)
+    sample = [name for name, _ in rng.sample(villages, args.queries)]
+
+    _, exact = time_lookups(index, sample)
+
+    typos = [misspell(name, rng) for name in sample]
+    results, fuzzy = time_lookups(index, typos)
+    fuzzy["resolved_share"] = round(
+        sum(r[1] != "DISTRICT_ASSUMED" for r in results) / len(results), 3
+    )
+    fuzzy["correct_district_share"] = round(
+        sum(r[0] == truth[name] for r, name in zip(results, sample)) / len(results), 3
+    )
+    _, fuzzy_repeat = time_lookups(index, typos)
+
+    report = {
+        "names": {
+            "villages": len(index),
+            "build_seconds": round(build_seconds, 3),
+            "grams": len(index.postings),
+            "exact_lookup": exact,
+            "fuzzy_lookup": fuzzy,
+            "fuzzy_repeat_lookup": fuzzy_repeat,
+        },
+        "coordinates": bench_coordinates(args.points, args.seed),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
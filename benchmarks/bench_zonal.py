@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_zonal.py
+
+District x month zonal NDVI (src/zonal_ndvi.py) on synthetic pixels (run
+from the repo root):
+
+    python benchmarks/bench_zonal.py
+    python benchmarks/bench_zonal.py --pixels 2000000 --months 6
+
+A fixed set of pixel centres over the Tamil Nadu bounding box is observed
+every month with random NDVI, the way a raster time series arrives. The
+cell map is built in a temporary directory (cold: every pixel located
+once), then the months are reduced again from the saved map (warm).
+Both runs must match a pandas groupby of the same observations with the
+districts taken straight from the polygons.
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from district_polygons import GEOJSON_PATH, OUTSIDE, load_district_grid
+from running_stats import RunningStats
+from zonal_ndvi import CellMap, zonal_chunk
+
+
+def synthetic_months(grid, pixels, months, seed=42):
+    """
+    One DataFrame per month: lat, lon (3 decimals), year, month, ndvi.
+    """
+    rng = np.random.default_rng(seed)
+    x_min, y_min = grid.origin
+    lon = np.round(x_min + rng.random(pixels) * grid.shape[1] * grid.cell, 3)
+    lat = np.round(y_min + rng.random(pixels) * grid.shape[0] * grid.cell, 3)
+    for m in range(months):
+        ndvi = rng.normal(0.45, 0.15, pixels)
+        ndvi[rng.random(pixels) < 0.01] = np.nan
+        yield pd.DataFrame({"lat": lat, "lon": lon, "year": 2022, "month": m + 1, "ndvi": ndvi})
+
+
+def reduce_months(frames, cells):
+    cols = {"lat": "lat", "lon": "lon", "ndvi": "ndvi", "year": "year", "month": "month"}
+    stats = RunningStats(["District", "year", "month"])
+    rows = 0
+    start = time.perf_counter()
+    for frame in frames:
+        zonal_chunk(frame, cells, cols, stats)
+        rows += len(frame)
+    return stats.result(suffix="_ndvi"), rows, time.perf_counter() - start
+
+
+def reference(frames, grid):
+    parts = []
+    for frame in frames:
+        district = grid.locate(frame["lon"].to_numpy(), frame["lat"].to_numpy())
+        inside = district != OUTSIDE
+        names = np.array([n.upper() for n in grid.names], dtype=object)
+        parts.append(frame[inside].assign(District=names[district[inside]]))
+    both = pd.concat(parts)
+    out = both.groupby(["District", "year", "month"])["ndvi"].agg(["mean", "min", "max", "std", "count"])
+    return out.reset_index()
+
+
+def check(result, expected):
+    result = result.dropna(subset=["mean_ndvi"]).reset_index(drop=True)
+    assert len(result) == len(expected), (len(result), len(expected))
+    for ours, theirs in (("mean_ndvi", "mean"), ("min_ndvi", "min"), ("max_ndvi", "max"), ("std_ndvi", "std")):
+        np.testing.assert_allclose(result[ours], expected[theirs], rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(result["observations"], expected["count"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pixels", type=int, default=1_000_000, help="pixels per month")
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--geojson", default=GEOJSON_PATH)
+    args = parser.parse_args()
+
+    grid = load_district_grid(args.geojson)
+    frames = list(synthetic_months(grid, args.pixels, args.months))
+    expected = reference(frames, grid)
+
+    cache_dir = tempfile.mkdtemp(prefix="bench_zonal_")
+    try:
+        cells = CellMap.for_grid(grid, geojson_path=args.geojson)
+        cold, rows, cold_seconds = reduce_months(frames, cells)
+        cells.save(cache_dir)
+        located = cells.added
+
+        start = time.perf_counter()
+        cells = CellMap.load(args.geojson, cache_dir=cache_dir)
+        load_seconds = time.perf_counter() - start
+        warm, _, warm_seconds = reduce_months(frames, cells)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    check(cold, expected)
+    check(warm, expected)
+    print(json.dumps({
+        "pixels_per_month": args.pixels,
+        "months": args.months,
+        "district_months": len(expected),
+        "cells_located": located,
+        "cold_seconds": round(cold_seconds, 3),
+        "cell_map_load_seconds": round(load_seconds, 3),
+        "warm_seconds": round(warm_seconds, 3),
+        "warm_rows_per_sec": round(rows / warm_seconds),
+        "warm_cells_added": cells.added,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
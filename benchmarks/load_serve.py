@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+benchmarks/load_serve.py
+
+Synthetic load generator for src/serve.py (run from the repo root).
+
+    # start a server with the given batching settings and load it
+    python benchmarks/load_serve.py --spawn --max-batch-size 64 --max-wait-ms 3
+
+    # or load an already running server
+    python benchmarks/load_serve.py --port 8080 --concurrency 128 --requests 20000
+
+Each virtual client keeps one HTTP/1.1 keep-alive connection and sends
+POST /predict back to back. Reports p50/p95/p99 latency, throughput and
+the server's batching counters as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from workload import sample_inputs
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def http_call(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1")
+        + body
+    )
+    await writer.drain()
+
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    data = await reader.readexactly(length)
+    return status, json.loads(data)
+
+
+async def get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return (await http_call(reader, writer, host, "GET", path))[1]
+    finally:
+        writer.close()
+
+
+async def client(host, port, inputs, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for farmer_input in inputs:
+            start = time.perf_counter()
+            status, _ = await http_call(reader, writer, host, "POST", "/predict", farmer_input)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, concurrency, n_requests, seed):
+    inputs = sample_inputs(n_requests, seed=seed)
+    shards = [inputs[i::concurrency] for i in range(concurrency)]
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, s, latencies, errors) for s in shards if s))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "server": await get_json(host, port, "/stats"),
+    }
+
+
+async def wait_until_ready(host, port, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await get_json(host, port, "/health")).get("status") == "OK":
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"server on {host}:{port} did not become ready")
+
+
+def spawn_server(args):
+    cmd = [
+        sys.executable, str(ROOT / "src" / "serve.py"),
+        "--host", args.host, "--port", str(args.port),
+        "--max-batch-size", str(args.max_batch_size),
+        "--max-wait-ms", str(args.max_wait_ms),
+    ]
+    if args.cache_size is not None:
+        cmd += ["--cache-size", str(args.cache_size)]
+    if args.workers:
+        cmd += ["--workers", str(args.workers)]
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "src"))
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--spawn", action="store_true", help="start src/serve.py for the run")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=3.0)
+    parser.add_argument("--cache-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=0, help="serve.py --workers for --spawn")
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    server = spawn_server(args) if args.spawn else None
+    try:
+        asyncio.run(wait_until_ready(args.host, args.port))
+        report = asyncio.run(run_load(args.host, args.port, args.concurrency, args.requests, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
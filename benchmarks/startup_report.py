@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+benchmarks/startup_report.py
+
+Cold-start report for the serving path (run from the repo root):
+
+    python benchmarks/startup_report.py [--out startup.json]
+
+- `python -X importtime -c "import predict"` in a fresh interpreter,
+  parsed into the slowest modules by cumulative import time
+- Predictor().load() wall time in a fresh interpreter
+- first prediction after load
+Each number is checked against the cold-start budget below.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / "src"
+
+# Cold-start budget (milliseconds)
+BUDGET_MS = {
+    "import_predict": 250,
+    "predictor_load": 3000,
+    "first_prediction": 500,
+}
+
+LOAD_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+import predict
+t1 = time.perf_counter()
+p = predict.Predictor().load()
+t2 = time.perf_counter()
+p.predict_crop({"District": "ranipet"})
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_predict": (t1 - t0) * 1000,
+    "predictor_load": (t2 - t1) * 1000,
+    "first_prediction": (t3 - t2) * 1000,
+}))
+"""
+
+
+def run_python(args):
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    return subprocess.run(
+        [sys.executable] + args,
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def import_time_report(module="predict", top=15):
+    """
+    Parses -X importtime output: "import time: self [us] | cumulative | name"
+    """
+    proc = run_python(["-X", "importtime", "-c", f"import {module}"])
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+
+    total = next((r["cumulative_ms"] for r in rows if r["module"] == module), None)
+    slowest = sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+    return {"module": module, "total_ms": total, "slowest": slowest}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    imports = import_time_report()
+    timings = json.loads(run_python(["-c", LOAD_SNIPPET]).stdout.strip().splitlines()[-1])
+
+    budget = {
+        stage: {
+            "ms": round(timings[stage], 1),
+            "budget_ms": limit,
+            "ok": timings[stage] <= limit,
+        }
+        for stage, limit in BUDGET_MS.items()
+    }
+    report = {"importtime": imports, "cold_start": budget}
+
+    print(f"import predict (-X importtime): {imports['total_ms']:.1f} ms")
+    for r in imports["slowest"]:
+        print(f"  {r['cumulative_ms']:9.1f} ms  {'  ' * r['depth']}{r['module']}")
+    print("\nCold-start budget:")
+    for stage, b in budget.items():
+        status = "OK" if b["ok"] else "OVER BUDGET"
+        print(f"  {stage:<18} {b['ms']:8.1f} ms / {b['budget_ms']} ms  {status}")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+        print("\nSaved report to", args.out)
+
+    return 0 if all(b["ok"] for b in budget.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+benchmarks/workload.py
+
+Synthetic farmer inputs for the benchmarks: a realistic mix of village
+names (data/village_to_district.csv), district names as farmers type them,
+places that are in neither (state-wide fallback profile), and GPS points
+just outside every district polygon (nearest-district blend).
+"""
+import csv
+import random
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+VILLAGE_MAP_PATH = ROOT / "data" / "village_to_district.csv"
+CENTROIDS_PATH = ROOT / "data" / "processed" / "tn_district_centroids.csv"
+
+UNKNOWN_PLACES = ["karaikal", "puducherry", "bengaluru", "tirupati", "nellore", "mysuru"]
+
+# (lat, lon) across the state border or offshore: no polygon contains them
+OUTSIDE_POINTS = [
+    (11.934, 79.830),  # Puducherry
+    (10.925, 79.838),  # Karaikal
+    (13.630, 79.420),  # Tirupati
+    (12.300, 76.640),  # Mysuru
+    (11.000, 76.500),  # Palakkad gap
+    (13.080, 80.400),  # offshore, Chennai
+    (9.000, 79.500),   # Gulf of Mannar
+]
+
+
+def read_column(path, column):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row[column].strip() for row in csv.DictReader(f) if row.get(column)]
+
+
+def load_places():
+    """
+    Returns {"village": [...], "district": [...], "fallback": [...],
+    "gps_outside": [(lat, lon), ...]}.
+    """
+    return {
+        "village": read_column(VILLAGE_MAP_PATH, "village"),
+        "district": [d.lower() for d in read_column(CENTROIDS_PATH, "District")],
+        "fallback": list(UNKNOWN_PLACES),
+        "gps_outside": list(OUTSIDE_POINTS),
+    }
+
+
+def spellings(name, rng):
+    """
+    The same place the way different farmers / IVR transcripts send it.
+    """
+    return rng.choice([name, name.title(), name.upper(), f" {name} "])
+
+
+def sample_inputs(n, seed=42, mix=(("district", 0.7), ("village", 0.2), ("fallback", 0.1)), vary_spelling=True):
+    rng = random.Random(seed)
+    places = load_places()
+    kinds = [k for k, _ in mix]
+    weights = [w for _, w in mix]
+
+    inputs = []
+    for _ in range(n):
+        kind = rng.choices(kinds, weights)[0]
+        place = rng.choice(places[kind])
+        if kind == "gps_outside":
+            inputs.append({"lat": place[0], "lon": place[1]})
+        else:
+            inputs.append({"District": spellings(place, rng) if vary_spelling else place})
+    return inputs
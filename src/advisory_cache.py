@@ -0,0 +1,93 @@
+# advisory_cache.py
+# Bounded in-process cache of full advisory outputs (LRU + TTL).
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 4096
+DEFAULT_TTL_SECONDS = 6 * 3600
+
+
+def copy_advisory(advisory):
+    """
+    Copy of an advisory down to its leaves (top_factors is a list of
+    dicts), so callers cannot mutate cached entries.
+    """
+    if isinstance(advisory, dict):
+        return {k: copy_advisory(v) for k, v in advisory.items()}
+    if isinstance(advisory, list):
+        return [copy_advisory(v) for v in advisory]
+    return advisory
+
+
+class AdvisoryCache:
+    """
+    LRU cache with a per-entry TTL (ttl_seconds unless put() says otherwise).
+    Counters (hits / misses / evictions / expirations) are kept so the
+    cache can be sized from production traffic.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if self.clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,58 @@
+# artifacts.py
+import hashlib
+import os
+import time
+
+
+def file_version(path):
+    """
+    Cheap version stamp for a model/data artifact: size + mtime.
+    Returns None when the file does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    sha256 of a file's contents, for artifacts that must match exactly
+    (unlike file_version, survives copies). None when the file is missing.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(chunk_size), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class FileWatch:
+    """
+    Rate-limited change detection for hot-reloaded files: poll() stats the
+    files at most every `interval` seconds and returns True when any
+    version stamp changed (always on the first poll). Not thread-safe;
+    callers poll under their own reload lock.
+    """
+
+    def __init__(self, *paths, interval=1.0):
+        self.paths = paths
+        self.interval = interval
+        self.version = None
+        self._checked_at = None
+
+    def poll(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.interval:
+            return False
+        self._checked_at = now
+
+        version = tuple(file_version(p) for p in self.paths)
+        if self.version is not None and version == self.version:
+            return False
+        self.version = version
+        return True
@@ -1,5 +1,9 @@
+import os
+
 import pandas as pd
 
+from running_stats import RunningStats
+
 ndvi = pd.read_csv("data/processed/tn_ndvi_clean.csv")
 
 kharif = [6,7,8,9,10]
@@ -22,4 +26,58 @@ df = pd.DataFrame(features)
 df.to_csv("data/processed/tn_ndvi_features.csv", index=False)
 
 print("✅ NDVI features created")
-print(df)
\ No newline at end of file
+print(df)
+
+# ==================================================
+# DISTRICT FEATURES (from src/zonal_ndvi.py / src/ndvi_tiles.py, when available)
+# ==================================================
+# The point/grid and tile tables merge exactly into one District x month
+# table (a District x year one only when neither has months).
+# Same recipe per district: the district's monthly means stand in for the
+# state's monthly NDVI. A District x year table (lat/lon NDVI without
+# months) gives the year's mean/max/std directly; kharif/rabi stay empty
+# and fall back to the state values in merge_crop_soil_ndvi.py.
+# Always written (header only without district NDVI), so the pipeline
+# can track it.
+DISTRICT_MONTH_PATHS = [
+    "data/processed/tn_ndvi_district_month.csv",
+    "data/processed/tn_ndvi_district_month_tiles.csv",
+]
+DISTRICT_FEATURES_PATH = "data/processed/tn_ndvi_district_features.csv"
+DISTRICT_COLUMNS = ["District", "Year", "ndvi_mean", "ndvi_max", "ndvi_std", "ndvi_kharif_mean", "ndvi_rabi_mean"]
+
+tables = {}
+for path in DISTRICT_MONTH_PATHS:
+    if os.path.exists(path):
+        table = pd.read_csv(path)
+        keys = ["District", "year"] + (["month"] if "month" in table.columns else [])
+        tables.setdefault(tuple(keys), []).append((path, table))
+
+district = pd.DataFrame(columns=DISTRICT_COLUMNS)
+if tables:
+    keys = max(tables, key=len)
+    stats = RunningStats(keys)
+    for path, table in tables[keys]:
+        stats.merge(RunningStats.from_result(table, keys, suffix="_ndvi"))
+    for other in set(tables) - {keys}:
+        for path, _ in tables[other]:
+            print(f"⚠️ Ignoring {path}: District x year only, other tables have months")
+    zonal = stats.result(suffix="_ndvi").rename(columns={"year": "Year", "month": "Month", "mean_ndvi": "NDVI"})
+    if "Month" in zonal.columns:
+        zonal["kharif"] = zonal["NDVI"].where(zonal["Month"].isin(kharif))
+        zonal["rabi"] = zonal["NDVI"].where(zonal["Month"].isin(rabi))
+        district = zonal.groupby(["District", "Year"]).agg(
+            ndvi_mean=("NDVI", "mean"),
+            ndvi_max=("NDVI", "max"),
+            ndvi_std=("NDVI", "std"),
+            ndvi_kharif_mean=("kharif", "mean"),
+            ndvi_rabi_mean=("rabi", "mean"),
+        ).reset_index()
+    else:
+        district = zonal.rename(columns={"NDVI": "ndvi_mean", "max_ndvi": "ndvi_max", "std_ndvi": "ndvi_std"})
+        district = district.reindex(columns=DISTRICT_COLUMNS)
+
+district.to_csv(DISTRICT_FEATURES_PATH, index=False)
+if len(district):
+    print(f"✅ District NDVI features: {district['District'].nunique()} districts, "
+          f"{district['Year'].nunique()} years")
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+src/columnar.py
+
+Columnar copies of the processed CSVs, for faster, typed, projected reads.
+
+    python src/columnar.py convert data/processed/tn_ml_ndvi_only.csv ...
+    python src/columnar.py export data/processed/tn_ml_ndvi_only.csv
+
+Each dataset keeps its CSV path as its name. Next to data/processed/x.csv:
+    x.feather   Arrow IPC, uncompressed, when pyarrow is installed
+    x.cols/     otherwise: one .npy per column + meta.json
+String and categorical columns are dictionary-encoded (integer codes +
+the distinct values), numbers keep their dtype, and pandas dtypes
+(including categoricals) come back as written. Both layouts read only the
+requested columns and memory-map the files.
+
+write_dataset() writes the columnar copy and the CSV export (still what
+humans open and what git tracks). read_dataset() uses the columnar copy
+when it was written from the CSV currently on disk, and falls back to
+parsing the CSV otherwise (missing, stale, or edited by hand).
+benchmarks/bench_columnar.py compares load times and sizes with the CSVs.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from artifacts import file_digest, file_version
+
+# Bumped when the .cols layout changes; older copies are ignored
+COLUMNAR_FORMAT = 1
+
+META_FILE = "meta.json"
+
+# Smaller column files are read outright; mapping them costs more than it saves
+MMAP_MIN_BYTES = 1 << 20
+
+
+def arrow_available():
+    try:
+        import pyarrow.feather  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def columnar_paths(csv_path):
+    """
+    (feather path, .cols directory) for a dataset's CSV path.
+    """
+    base = Path(csv_path).with_suffix("")
+    return base.with_suffix(".feather"), Path(f"{base}.cols")
+
+
+def source_stamp(csv_path):
+    return {"version": file_version(csv_path), "digest": file_digest(csv_path)}
+
+
+# ==================================================
+# .npy LAYOUT
+# ==================================================
+def write_columns(df, directory, source=None):
+    """
+    One .npy per column (+ one for the distinct values of each string or
+    categorical column) and meta.json. Replaces `directory` atomically.
+    """
+    import pandas as pd
+
+    directory = Path(directory)
+    tmp = directory.with_name(f"{directory.name}.tmp{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        s = df[name]
+        entry = {"name": str(name), "dtype": str(s.dtype), "file": f"c{i:03d}.npy"}
+
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            entry.update(kind="category", ordered=bool(s.cat.ordered))
+            codes = s.cat.codes.to_numpy()
+            values = s.cat.categories.to_numpy()
+        elif s.dtype.kind in "biufcmM":
+            entry["kind"] = "array"
+            codes, values = s.to_numpy(), None
+        else:
+            entry["kind"] = "string"
+            codes, values = pd.factorize(s, use_na_sentinel=True)
+            values = np.asarray(values, dtype=object)
+
+        if values is not None:
+            # smallest signed code type; -1 marks missing
+            code_dtype = np.min_scalar_type(-max(len(values), 1))
+            codes = codes.astype(code_dtype)
+            entry["values_file"] = f"c{i:03d}_values.npy"
+            entry["values_kind"] = "str" if values.dtype == object else "array"
+            np.save(tmp / entry["values_file"], values.astype(str) if values.dtype == object else values)
+        np.save(tmp / entry["file"], codes)
+        columns.append(entry)
+
+    with open(tmp / META_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "format": COLUMNAR_FORMAT,
+            "rows": len(df),
+            "columns": columns,
+            "source": source,
+        }, f, indent=2)
+
+    if directory.exists():
+        shutil.rmtree(directory)
+    os.replace(tmp, directory)
+
+
+def read_meta(directory):
+    try:
+        with open(Path(directory) / META_FILE, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("format") == COLUMNAR_FORMAT else None
+
+
+def read_columns(directory, columns=None, dtype=None, mmap=True):
+    """
+    DataFrame of the requested columns (file order, like usecols).
+    `dtype` casts are applied as each column is read (numeric columns stay
+    memory-mapped when no cast is needed); string columns asked for as
+    "category" are built from their stored codes.
+    """
+    import pandas as pd
+
+    directory = Path(directory)
+    meta = read_meta(directory)
+    if meta is None:
+        raise FileNotFoundError(f"no columnar data in {directory}")
+
+    wanted = None if columns is None else set(columns)
+    data = {}
+    for entry in meta["columns"]:
+        if wanted is not None and entry["name"] not in wanted:
+            continue
+        path = directory / entry["file"]
+        mode = "r" if mmap and path.stat().st_size >= MMAP_MIN_BYTES else None
+        codes = np.load(path, mmap_mode=mode)
+
+        if entry["kind"] == "array":
+            target = (dtype or {}).get(entry["name"], entry["dtype"])
+            if target == "category":
+                data[entry["name"]] = pd.Series(codes, dtype=entry["dtype"]).astype(target)
+            else:
+                data[entry["name"]] = pd.Series(codes.astype(target, copy=False), copy=False)
+            continue
+
+        values = np.load(directory / entry["values_file"])
+        if entry["values_kind"] == "str":
+            values = values.astype(object)
+        if entry["kind"] == "category":
+            data[entry["name"]] = pd.Categorical.from_codes(
+                np.asarray(codes), categories=values, ordered=entry["ordered"]
+            )
+        elif dtype and dtype.get(entry["name"]) == "category":
+            # sorted categories, as read_csv(dtype="category") gives
+            order = np.argsort(values.astype(str), kind="stable")
+            recode = np.empty(len(order) + 1, dtype=np.int64)
+            recode[order] = np.arange(len(order))
+            recode[-1] = -1
+            data[entry["name"]] = pd.Categorical.from_codes(
+                recode[np.asarray(codes)],
+                categories=pd.Index(values[order], dtype=entry["dtype"])
+            )
+        else:
+            decoded = values.take(np.asarray(codes), mode="clip").astype(object)
+            decoded[np.asarray(codes) < 0] = None
+            data[entry["name"]] = pd.Series(decoded, dtype=entry["dtype"])
+
+    return pd.DataFrame(data, index=pd.RangeIndex(meta["rows"]))
+
+
+# ==================================================
+# DATASETS (CSV PATH AS NAME)
+# ==================================================
+def write_dataset(df, csv_path, csv=True):
+    """
+    Writes the CSV export (unless csv=False), then the columnar copy,
+    stamped with the CSV it matches.
+    """
+    csv_path = Path(csv_path)
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    if csv:
+        df.to_csv(csv_path, index=False)
+    stamp = source_stamp(csv_path) if csv_path.exists() else None
+
+    feather_path, cols_dir = columnar_paths(csv_path)
+    if arrow_available():
+        df.reset_index(drop=True).to_feather(feather_path, compression="uncompressed")
+        with open(f"{feather_path}.json", "w", encoding="utf-8") as f:
+            json.dump({"format": COLUMNAR_FORMAT, "source": stamp}, f)
+        shutil.rmtree(cols_dir, ignore_errors=True)
+    else:
+        write_columns(df, cols_dir, stamp)
+
+
+def matches_source(source, csv_path):
+    """
+    True when a columnar copy was written from the CSV now at csv_path
+    (or the CSV is gone). Compares size + mtime first, then the content.
+    """
+    if not Path(csv_path).exists():
+        return True
+    if not source:
+        return False
+    if source["version"] == file_version(csv_path):
+        return True
+    return source["digest"] == file_digest(csv_path)
+
+
+def columnar_source(csv_path):
+    """
+    ("feather" | "cols", path) for a usable columnar copy, or None.
+    """
+    feather_path, cols_dir = columnar_paths(csv_path)
+    if feather_path.exists() and arrow_available():
+        try:
+            with open(f"{feather_path}.json", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+        if meta and meta.get("format") == COLUMNAR_FORMAT and matches_source(meta["source"], csv_path):
+            return "feather", feather_path
+    meta = read_meta(cols_dir)
+    if meta is not None and matches_source(meta["source"], csv_path):
+        return "cols", cols_dir
+    return None
+
+
+def read_dataset(csv_path, columns=None, dtype=None):
+    """
+    pd.read_csv(csv_path, usecols=columns, dtype=dtype) equivalent that
+    reads the columnar copy when one matches the CSV. Columns missing from
+    the dataset are ignored, as when usecols is built from the header.
+    """
+    import pandas as pd
+
+    found = columnar_source(csv_path)
+    if found is None:
+        if columns is not None:
+            header = pd.read_csv(csv_path, nrows=0).columns
+            columns = [c for c in header if c in set(columns)]
+        return pd.read_csv(csv_path, usecols=columns, dtype=dtype, low_memory=False)
+
+    kind, path = found
+    if kind == "feather":
+        import pyarrow.feather as feather
+
+        table = feather.read_table(path, memory_map=True)
+        if columns is not None:
+            table = table.select([c for c in table.column_names if c in set(columns)])
+        df = table.to_pandas()
+    else:
+        df = read_columns(path, columns, dtype)
+
+    if dtype:
+        df = df.astype({c: t for c, t in dtype.items() if c in df.columns and df[c].dtype != t})
+    return df
+
+
+def dataset_columns(csv_path):
+    """
+    Column names of a dataset without parsing its rows.
+    """
+    import pandas as pd
+
+    found = columnar_source(csv_path)
+    if found is None:
+        return pd.read_csv(csv_path, nrows=0).columns.tolist()
+    kind, path = found
+    if kind == "feather":
+        import pyarrow.feather as feather
+
+        return feather.read_table(path, memory_map=True).column_names
+    return [c["name"] for c in read_meta(path)["columns"]]
+
+
+# ==================================================
+# CLI
+# ==================================================
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Columnar copies of processed CSVs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="write columnar copies of CSVs")
+    convert.add_argument("csv", nargs="+")
+    export = sub.add_parser("export", help="rewrite CSVs from their columnar copies")
+    export.add_argument("csv", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        for csv_path in args.csv:
+            write_dataset(pd.read_csv(csv_path, low_memory=False), csv_path, csv=False)
+            print("✅ Columnar copy written for", csv_path)
+    else:
+        for csv_path in args.csv:
+            found = columnar_source(csv_path)
+            if found is None:
+                sys.exit(f"❌ No columnar copy matching {csv_path}")
+            df = read_dataset(csv_path)
+            write_dataset(df, csv_path)
+            print("✅ CSV exported to", csv_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# district_polygons.py
+# Point -> district using data/external/tn_shapefiles/tn_districts.geojson.
+#
+# The polygons are read once (json + numpy, no GIS stack) into per-district
+# edge arrays and rasterised onto a regular lon/lat grid:
+#   - a cell no district boundary passes near lies wholly inside one
+#     district (or outside all of them) and answers a lookup directly;
+#   - a boundary cell keeps the few districts whose edges pass near it, and
+#     only points falling there run an exact point-in-polygon test.
+# Most points never touch polygon geometry at query time.
+import json
+import math
+
+import numpy as np
+
+GEOJSON_PATH = "data/external/tn_shapefiles/tn_districts.geojson"
+
+# ~1.1 km at Tamil Nadu's latitude
+CELL_DEGREES = 0.01
+
+OUTSIDE = -1
+
+
+def geometry_rings(geometry):
+    """
+    Every ring (outer and holes) of a Polygon / MultiPolygon as (N, 2) lon/lat.
+    Even-odd point-in-polygon over all rings handles holes and enclaves.
+    """
+    polygons = (
+        [geometry["coordinates"]] if geometry["type"] == "Polygon"
+        else geometry["coordinates"]
+    )
+    return [np.asarray(ring, dtype=float)[:, :2] for polygon in polygons for ring in polygon]
+
+
+class Edges:
+    """
+    All ring edges of one district, with the slope precomputed for
+    ray casting.
+    """
+
+    def __init__(self, rings):
+        starts = np.concatenate([r[:-1] for r in rings])
+        ends = np.concatenate([r[1:] for r in rings])
+        self.x0, self.y0 = starts[:, 0], starts[:, 1]
+        self.x1, self.y1 = ends[:, 0], ends[:, 1]
+        dy = self.y1 - self.y0
+        self.slope = (self.x1 - self.x0) / np.where(dy == 0, 1.0, dy)
+        self.bbox = (
+            min(self.x0.min(), self.x1.min()), min(self.y0.min(), self.y1.min()),
+            max(self.x0.max(), self.x1.max()), max(self.y0.max(), self.y1.max())
+        )
+
+    def contains(self, lon, lat, chunk=512):
+        """
+        Even-odd ray casting for arrays of points.
+        """
+        inside = np.zeros(len(lon), dtype=bool)
+        for s in range(0, len(lon), chunk):
+            x = lon[s:s + chunk, None]
+            y = lat[s:s + chunk, None]
+            straddles = (self.y0 > y) != (self.y1 > y)
+            crosses = straddles & (x < self.x0 + (y - self.y0) * self.slope)
+            inside[s:s + chunk] = crosses.sum(axis=1) % 2 == 1
+        return inside
+
+    def crossings_at(self, y):
+        """
+        Sorted x positions where the horizontal line at latitude y crosses
+        the boundary.
+        """
+        straddles = (self.y0 > y) != (self.y1 > y)
+        return np.sort(self.x0[straddles] + (y - self.y0[straddles]) * self.slope[straddles])
+
+
+class DistrictGrid:
+
+    def __init__(self, names, rings_per_district, cell_degrees=CELL_DEGREES):
+        self.names = list(names)
+        self.edges = [Edges(rings) for rings in rings_per_district]
+        self.cell = cell_degrees
+
+        x_min = min(e.bbox[0] for e in self.edges)
+        y_min = min(e.bbox[1] for e in self.edges)
+        x_max = max(e.bbox[2] for e in self.edges)
+        y_max = max(e.bbox[3] for e in self.edges)
+        self.origin = (x_min, y_min)
+        self.shape = (
+            math.ceil((y_max - y_min) / self.cell) + 1,
+            math.ceil((x_max - x_min) / self.cell) + 1
+        )
+
+        self.owner = self._rasterize_owners()
+        self.candidates = self._boundary_candidates()
+        self.boundary = np.zeros(self.shape[0] * self.shape[1], dtype=bool)
+        self.boundary[list(self.candidates)] = True
+
+    # --------------------------
+    # BUILD
+    # --------------------------
+    def _rasterize_owners(self):
+        """
+        District of every cell centre, by scanline fill of each polygon.
+        """
+        rows, cols = self.shape
+        owner = np.full(self.shape, OUTSIDE, dtype=np.int16)
+        centres_x = self.origin[0] + (np.arange(cols) + 0.5) * self.cell
+
+        for d, e in enumerate(self.edges):
+            r0 = max(0, int((e.bbox[1] - self.origin[1]) / self.cell))
+            r1 = min(rows - 1, int((e.bbox[3] - self.origin[1]) / self.cell))
+            for r in range(r0, r1 + 1):
+                xs = e.crossings_at(self.origin[1] + (r + 0.5) * self.cell)
+                for a, b in zip(xs[0::2], xs[1::2]):
+                    c0, c1 = np.searchsorted(centres_x, (a, b))
+                    owner[r, c0:c1] = d
+        return owner
+
+    def _boundary_candidates(self):
+        """
+        {flat cell index: district ids} for every cell within one cell of a
+        district boundary. Edges are sampled every half cell, so growing the
+        touched cells by one cell in each direction covers every cell an edge
+        really crosses.
+        """
+        rows, cols = self.shape
+        step = self.cell / 2
+        candidates = {}
+
+        for d, e in enumerate(self.edges):
+            length = np.hypot(e.x1 - e.x0, e.y1 - e.y0)
+            n = np.ceil(length / step).astype(int) + 1
+            t = np.concatenate([np.linspace(0.0, 1.0, k) for k in n])
+            x0, y0 = np.repeat(e.x0, n), np.repeat(e.y0, n)
+            x1, y1 = np.repeat(e.x1, n), np.repeat(e.y1, n)
+            r, c = self.cell_of(x0 + (x1 - x0) * t, y0 + (y1 - y0) * t)
+
+            touched = set()
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    rr, cc = r + dr, c + dc
+                    ok = (rr >= 0) & (rr < rows) & (cc >= 0) & (cc < cols)
+                    touched.update(np.unique(rr[ok] * cols + cc[ok]).tolist())
+            for flat in touched:
+                candidates.setdefault(flat, []).append(d)
+
+        return {flat: tuple(ds) for flat, ds in candidates.items()}
+
+    # --------------------------
+    # QUERY
+    # --------------------------
+    def cell_of(self, lon, lat):
+        r = np.floor((lat - self.origin[1]) / self.cell).astype(np.int64)
+        c = np.floor((lon - self.origin[0]) / self.cell).astype(np.int64)
+        return r, c
+
+    def locate(self, lon, lat):
+        """
+        District index (OUTSIDE if none) for arrays of lon/lat.
+        """
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        rows, cols = self.shape
+        r, c = self.cell_of(lon, lat)
+        in_grid = (r >= 0) & (r < rows) & (c >= 0) & (c < cols) & np.isfinite(lon) & np.isfinite(lat)
+
+        result = np.full(len(lon), OUTSIDE, dtype=np.int64)
+        flat = np.where(in_grid, r * cols + c, 0)
+        result[in_grid] = self.owner.ravel()[flat[in_grid]]
+
+        # Points in boundary cells: exact test against the nearby districts
+        on_boundary = np.flatnonzero(in_grid & self.boundary[flat])
+        result[on_boundary] = OUTSIDE
+        pending = {}
+        for i, cell in zip(on_boundary.tolist(), flat[on_boundary].tolist()):
+            for d in self.candidates[cell]:
+                pending.setdefault(d, []).append(i)
+        for d, ids in sorted(pending.items()):
+            ids = np.array(ids)
+            ids = ids[result[ids] == OUTSIDE]
+            if ids.size:
+                inside = self.edges[d].contains(lon[ids], lat[ids])
+                result[ids[inside]] = d
+        return result
+
+    def district_at(self, lon, lat):
+        """
+        Scalar locate() without array overhead for the common interior case.
+        """
+        if not (math.isfinite(lon) and math.isfinite(lat)):
+            return None
+        r = math.floor((lat - self.origin[1]) / self.cell)
+        c = math.floor((lon - self.origin[0]) / self.cell)
+        if not (0 <= r < self.shape[0] and 0 <= c < self.shape[1]):
+            return None
+
+        cell = r * self.shape[1] + c
+        if self.boundary[cell]:
+            i = int(self.locate([lon], [lat])[0])
+        else:
+            i = int(self.owner[r, c])
+        return None if i == OUTSIDE else self.names[i]
+
+
+def district_name(feature):
+    return str(feature["properties"]["district"]).strip().lower()
+
+
+def district_names(path=GEOJSON_PATH):
+    """
+    District names in feature order (the DistrictGrid indices), without
+    building the grid.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [district_name(feature) for feature in json.load(f)["features"]]
+
+
+def load_district_grid(path=GEOJSON_PATH, cell_degrees=CELL_DEGREES):
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+
+    names, rings = [], []
+    for feature in collection["features"]:
+        names.append(district_name(feature))
+        rings.append(geometry_rings(feature["geometry"]))
+    return DistrictGrid(names, rings, cell_degrees)
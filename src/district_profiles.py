@@ -0,0 +1,248 @@
+# district_profiles.py
+# Precomputed per-district, per-season inputs for predict_crop.
+# Built once from the serving dataset (or loaded from an offline artifact)
+# so a request only needs a dictionary lookup.
+# pandas/joblib are imported only when a table is built or loaded.
+from artifacts import file_version
+from columnar import dataset_columns, read_dataset
+from soil_health import estimate_soil_health
+
+DATA_PATH = "data/processed/tn_ml_ndvi_only.csv"
+PROFILES_PATH = "models/district_profiles.joblib"
+
+SEASONS = ["Kharif", "Rabi", "Summer"]
+NDVI_COLUMNS = ["ndvi_kharif_mean", "ndvi_rabi_mean", "ndvi_mean"]
+# Read by estimate_soil_health when the dataset has them
+SOIL_COLUMNS = ["Nitrogen", "Phosphorus", "Potassium"]
+
+# Profile key used when the district is not in the dataset
+FALLBACK_DISTRICT = None
+
+# Bumped when the profile layout changes, so old artifacts are rebuilt
+PROFILE_FORMAT = 2
+
+# Districts closer than this count as this far when weighting a blend
+MIN_BLEND_DISTANCE_KM = 1.0
+
+
+def season_ndvi_column(season):
+    return (
+        "ndvi_kharif_mean" if season == "Kharif"
+        else "ndvi_rabi_mean" if season == "Rabi"
+        else "ndvi_mean"
+    )
+
+
+def base_feature_row(rows, features, cat_features):
+    """
+    Mode of every categorical feature, mean of every numeric feature.
+    """
+    row = {}
+    for f in features:
+        if f in cat_features:
+            row[f] = (
+                rows[f].mode().iloc[0]
+                if f in rows.columns and not rows[f].dropna().empty
+                else ""
+            )
+        else:
+            row[f] = (
+                float(rows[f].mean())
+                if f in rows.columns and not rows[f].dropna().empty
+                else 0.0
+            )
+    return row
+
+
+def build_profiles_for_rows(rows, features, cat_features, fallback_level):
+    """
+    One profile per season for a block of historical rows.
+    """
+    base_row = base_feature_row(rows, features, cat_features)
+    ndvi = {
+        col: float(rows[col].mean()) if col in rows.columns else float("nan")
+        for col in NDVI_COLUMNS
+    }
+    soil_health = estimate_soil_health(rows)
+
+    profiles = {}
+    for season in SEASONS:
+        ndvi_col = season_ndvi_column(season)
+
+        row = dict(base_row)
+        row["Season"] = season
+        row[ndvi_col] = ndvi[ndvi_col]
+
+        profiles[season] = {
+            "fallback_level": fallback_level,
+            "ndvi": ndvi,
+            "ndvi_value": ndvi[ndvi_col],
+            "row": row,
+            "soil_health": soil_health
+        }
+    return profiles
+
+
+def build_district_profiles(data, features, cat_features):
+    """
+    Returns {(district_norm, season): profile}.
+    (FALLBACK_DISTRICT, season) holds the whole-dataset profile.
+    """
+    if "District_norm" not in data.columns:
+        # Normalise each distinct name once instead of every row
+        district = data["District"].astype("category")
+        categories = district.cat.categories
+        norm = dict(zip(categories, categories.str.strip().str.lower()))
+        data = data.assign(District_norm=district.map(norm))
+
+    profiles = {}
+    for district, rows in data.groupby("District_norm", sort=False, observed=True):
+        per_season = build_profiles_for_rows(rows, features, cat_features, "DISTRICT")
+        for season, profile in per_season.items():
+            profiles[(district, season)] = profile
+
+    per_season = build_profiles_for_rows(data, features, cat_features, "STATE")
+    for season, profile in per_season.items():
+        profiles[(FALLBACK_DISTRICT, season)] = profile
+
+    return profiles
+
+
+def load_serving_data(features, cat_features, data_path=DATA_PATH):
+    """
+    Reads only the columns profiles need: District, the schema features and
+    the NDVI/soil columns (from the columnar copy when there is one).
+    Strings become categoricals, numbers float32.
+    """
+    wanted = {"District", *features, *NDVI_COLUMNS, *SOIL_COLUMNS}
+    usecols = [c for c in dataset_columns(data_path) if c in wanted]
+    dtype = {
+        c: "category" if c == "District" or c in cat_features else "float32"
+        for c in usecols
+    }
+    return read_dataset(data_path, columns=usecols, dtype=dtype)
+
+
+def frame_footprint(data):
+    return {
+        "rows": len(data),
+        "columns": data.shape[1],
+        "bytes": int(data.memory_usage(deep=True).sum())
+    }
+
+
+def memory_report(features, cat_features, data_path=DATA_PATH):
+    """
+    Footprint of the full default-dtype read vs the serving read.
+    """
+    import pandas as pd
+
+    full = pd.read_csv(data_path)
+    full = full.assign(District_norm=full["District"].str.strip().str.lower())
+    lean = load_serving_data(features, cat_features, data_path)
+    report = {"full": frame_footprint(full), "serving": frame_footprint(lean)}
+    report["reduction"] = round(report["full"]["bytes"] / report["serving"]["bytes"], 1)
+    return report
+
+
+def blend_profiles(neighbours, names, distances_km):
+    """
+    Inverse-distance blend of neighbouring district profiles (nearest first):
+    weighted mean of numeric features and NDVI, weighted vote for categorical
+    features. Soil health bands come from the nearest district.
+    """
+    weights = [1.0 / max(d, MIN_BLEND_DISTANCE_KM) for d in distances_km]
+    total = sum(weights)
+    nearest = neighbours[0]
+
+    row = {}
+    for f, value in nearest["row"].items():
+        if isinstance(value, str):
+            votes = {}
+            for p, w in zip(neighbours, weights):
+                votes[p["row"][f]] = votes.get(p["row"][f], 0.0) + w
+            row[f] = max(votes, key=votes.get)  # ties: nearest first
+        else:
+            row[f] = sum(p["row"][f] * w for p, w in zip(neighbours, weights)) / total
+
+    ndvi = {
+        col: sum(p["ndvi"][col] * w for p, w in zip(neighbours, weights)) / total
+        for col in nearest["ndvi"]
+    }
+    ndvi_value = sum(p["ndvi_value"] * w for p, w in zip(neighbours, weights)) / total
+
+    return {
+        "fallback_level": "NEAREST_DISTRICT",
+        "ndvi": ndvi,
+        "ndvi_value": ndvi_value,
+        "row": row,
+        "soil_health": nearest["soil_health"],
+        "neighbours": list(names),
+        "radius_km": float(max(distances_km))
+    }
+
+
+def lookup_profile(profiles, district, season):
+    profile = profiles.get((district, season))
+    if profile is None:
+        profile = profiles[(FALLBACK_DISTRICT, season)]
+    return profile
+
+
+def load_district_profiles(features, cat_features, data_path=DATA_PATH, profiles_path=PROFILES_PATH):
+    """
+    Loads the offline artifact when it was built from the current dataset
+    and schema, otherwise rebuilds the table from the CSV.
+    """
+    source = {
+        "data_version": file_version(data_path),
+        "features": list(features),
+        "cat_features": list(cat_features),
+        "format": PROFILE_FORMAT
+    }
+
+    import joblib
+    import pandas as pd
+
+    try:
+        artifact = joblib.load(profiles_path)
+        if artifact.get("source") == source:
+            return artifact["profiles"]
+    except Exception:
+        pass
+
+    data = load_serving_data(features, cat_features, data_path)
+    return build_district_profiles(data, features, cat_features)
+
+
+def save_district_profiles(features, cat_features, data_path=DATA_PATH, profiles_path=PROFILES_PATH):
+    import joblib
+
+    data = load_serving_data(features, cat_features, data_path)
+    artifact = {
+        "source": {
+            "data_version": file_version(data_path),
+            "features": list(features),
+            "cat_features": list(cat_features),
+            "format": PROFILE_FORMAT
+        },
+        "profiles": build_district_profiles(data, features, cat_features)
+    }
+    joblib.dump(artifact, profiles_path)
+    return artifact
+
+
+if __name__ == "__main__":
+    import joblib
+
+    schema = joblib.load("models/feature_schema_catboost.joblib")
+    artifact = save_district_profiles(schema["features"], schema["cat_features"])
+    print(f"✅ Saved {len(artifact['profiles'])} district profiles to {PROFILES_PATH}")
+
+    report = memory_report(schema["features"], schema["cat_features"])
+    print(
+        f"📦 Serving frame: {report['serving']['bytes'] / 1024:.0f} KB "
+        f"({report['serving']['columns']} cols) vs full read "
+        f"{report['full']['bytes'] / 1024:.0f} KB ({report['full']['columns']} cols), "
+        f"{report['reduction']}x smaller"
+    )
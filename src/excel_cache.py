@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+src/excel_cache.py
+
+Parse-once cache for the Excel inputs (climate/drought workbooks under
+data/external/). openpyxl is slow, so each sheet is parsed once into a
+columnar copy (columnar.write_columns: one .npy per column, dtypes kept)
+keyed by the workbook's sha256; later reads are memory-mapped .npy loads.
+
+    python src/excel_cache.py                    # convert every workbook under data/external
+    python src/excel_cache.py path/to/book.xlsx  # or just these
+
+    from excel_cache import read_excel_cached
+    df = read_excel_cached(path)                       # first sheet
+    df = read_excel_cached(path, usecols=["Year", "NDVI"], nrows=5)
+
+A changed workbook has a new hash, so it is parsed again; identical
+copies in different folders share one entry. Hashes are reused while a
+file's size + mtime are unchanged. Object columns mixing text with
+other values are cached as text.
+
+Cache: data/processed/.excel_cache/<sha256>/<sheet>/
+"""
+import json
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+from artifacts import file_digest, file_version
+from columnar import read_columns, read_meta, write_columns
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = ROOT / "data" / "processed" / ".excel_cache"
+HASH_INDEX = "hashes.json"
+
+EXCEL_SUFFIXES = (".xls", ".xlsx")
+
+_lock = threading.Lock()
+
+
+# ==================================================
+# HASHES (REUSED WHILE SIZE + MTIME ARE UNCHANGED)
+# ==================================================
+def load_hash_index(cache_dir):
+    try:
+        with open(Path(cache_dir) / HASH_INDEX, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_hash_index(cache_dir, index):
+    path = Path(cache_dir) / HASH_INDEX
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def workbook_digest(path, cache_dir=CACHE_DIR):
+    """
+    sha256 of a workbook, recomputed only when its size/mtime changed.
+    """
+    key = str(Path(path).resolve())
+    stamp = file_version(path)
+    if stamp is None:
+        raise FileNotFoundError(path)
+    with _lock:
+        index = load_hash_index(cache_dir)
+        cached = index.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        digest = file_digest(path)
+        index[key] = [stamp, digest]
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        save_hash_index(cache_dir, index)
+    return digest
+
+
+# ==================================================
+# CONVERT / READ
+# ==================================================
+def sheet_dir(digest, sheet_name, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / digest / f"sheet_{sheet_name}"
+
+
+def typed_for_cache(df):
+    """
+    Columns as the cache can store them: names as text, and object
+    columns that mix text with numbers/dates turned into text.
+    """
+    import pandas as pd
+
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for c in df.columns:
+        if df[c].dtype == object:
+            kind = pd.api.types.infer_dtype(df[c], skipna=True)
+            if kind not in ("string", "empty"):
+                df[c] = df[c].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+def convert_sheet(path, sheet_name=0, cache_dir=CACHE_DIR, digest=None):
+    """
+    Parses one sheet with openpyxl and writes its columnar copy (no-op
+    when the copy exists). Returns the copy's directory.
+    """
+    import pandas as pd
+
+    digest = digest or workbook_digest(path, cache_dir)
+    target = sheet_dir(digest, sheet_name, cache_dir)
+    if read_meta(target) is not None:
+        return target
+
+    df = pd.read_excel(path, sheet_name=sheet_name, engine="openpyxl")
+    source = {"path": str(path), "digest": digest, "sheet": sheet_name}
+    try:
+        write_columns(typed_for_cache(df), target, source)
+    except OSError:
+        # another process wrote the same entry first
+        if read_meta(target) is None:
+            raise
+    return target
+
+
+def read_excel_cached(path, sheet_name=0, usecols=None, nrows=None, cache_dir=CACHE_DIR):
+    """
+    pd.read_excel(path, sheet_name, usecols=<column names>, nrows) through
+    the cache: parses the sheet only when this workbook content has not
+    been converted yet.
+    """
+    target = convert_sheet(path, sheet_name, cache_dir)
+    if nrows == 0:
+        import pandas as pd
+
+        names = [c["name"] for c in read_meta(target)["columns"]]
+        return pd.DataFrame(columns=[c for c in names if usecols is None or c in set(usecols)])
+    df = read_columns(target, usecols)
+    return df if nrows is None else df.head(nrows)
+
+
+def prune(cache_dir=CACHE_DIR):
+    """
+    Removes cache entries no indexed workbook hashes to any more.
+    """
+    index = load_hash_index(cache_dir)
+    live = {digest for _, digest in index.values()}
+    removed = 0
+    for entry in Path(cache_dir).iterdir() if Path(cache_dir).exists() else []:
+        if entry.is_dir() and entry.name not in live:
+            shutil.rmtree(entry)
+            removed += 1
+    return removed
+
+
+def main():
+    paths = [Path(p) for p in sys.argv[1:]] or sorted(
+        p for p in (ROOT / "data" / "external").rglob("*") if p.suffix.lower() in EXCEL_SUFFIXES
+    )
+    for path in paths:
+        digest = workbook_digest(path)
+        cached = read_meta(sheet_dir(digest, 0)) is not None
+        try:
+            target = convert_sheet(path, digest=digest)
+        except Exception as e:
+            print(f"❌ {path}: {type(e).__name__}: {e}")
+            continue
+        meta = read_meta(target)
+        status = "cached" if cached else "converted"
+        print(f"✅ {path.name:<45} {status:<9} {meta['rows']:>7} rows  {len(meta['columns']):>3} cols  {digest[:12]}")
+
+    if not sys.argv[1:]:
+        removed = prune()
+        if removed:
+            print(f"🧹 Removed {removed} cache entries for workbooks that changed")
+
+
+if __name__ == "__main__":
+    main()
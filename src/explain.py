@@ -1,3 +1,21 @@
+import numpy as np
+
+CONFIDENCE_TEXT = {
+    "HIGH": "The top crop has a strong advantage over alternatives, indicating stable suitability.",
+    "MEDIUM": "Multiple crops show similar suitability; the ranking reflects lower agronomic risk.",
+    "LOW": "Crop suitability is uncertain; conservative crop choices are advised."
+}
+LOW_NDVI_TEXT = "Vegetation health is currently low, which may indicate crop stress or low productivity."
+NDVI_TEXT = "Vegetation health is moderate, supporting common seasonal crops."
+SOIL_TEXT = "Soil condition is inferred as {overall}, based on regional nutrient patterns."
+ZONE_TEXT = "The location falls under the {zone} agro-climatic zone, which influences crop suitability."
+TRUST_TEXT = (
+    "The recommendation uses {source}-level data "
+    "within approximately {radius_km} km to avoid false precision."
+)
+SAFE_MODE_TEXT = "Safe Mode is enabled due to uncertainty, avoiding risky recommendations."
+
+
 def explain_prediction(output: dict):
     """
     Converts system output into human-readable explanation.
@@ -7,53 +25,56 @@ def explain_prediction(output: dict):
     exp = []
 
     # Confidence explanation
-    if output["top1_confidence"] == "HIGH":
-        exp.append(
-            "The top crop has a strong advantage over alternatives, indicating stable suitability."
-        )
-    elif output["top1_confidence"] == "MEDIUM":
-        exp.append(
-            "Multiple crops show similar suitability; the ranking reflects lower agronomic risk."
-        )
-    else:
-        exp.append(
-            "Crop suitability is uncertain; conservative crop choices are advised."
-        )
+    exp.append(CONFIDENCE_TEXT.get(output["top1_confidence"], CONFIDENCE_TEXT["LOW"]))
 
     # NDVI explanation
-    ndvi = output["ndvi_value"]
-    if ndvi < 0.3:
-        exp.append(
-            "Vegetation health is currently low, which may indicate crop stress or low productivity."
-        )
-    else:
-        exp.append(
-            "Vegetation health is moderate, supporting common seasonal crops."
-        )
+    exp.append(LOW_NDVI_TEXT if output["ndvi_value"] < 0.3 else NDVI_TEXT)
 
     # Soil explanation
-    exp.append(
-        f"Soil condition is inferred as {output['soil_health']['overall'].lower()}, "
-        "based on regional nutrient patterns."
-    )
+    exp.append(SOIL_TEXT.format(overall=output["soil_health"]["overall"].lower()))
 
     # Zone explanation
-    exp.append(
-        f"The location falls under the {output['agro_climatic_zone']} agro-climatic zone, "
-        "which influences crop suitability."
-    )
+    exp.append(ZONE_TEXT.format(zone=output["agro_climatic_zone"]))
 
     # Trust explanation
     trust = output["data_trust_level"]
-    exp.append(
-        f"The recommendation uses {trust['source'].lower()}-level data "
-        f"within approximately {trust['radius_km']} km to avoid false precision."
-    )
+    exp.append(TRUST_TEXT.format(source=trust["source"].lower(), radius_km=trust["radius_km"]))
 
     # Safe mode
     if output["safe_mode"]:
-        exp.append(
-            "Safe Mode is enabled due to uncertainty, avoiding risky recommendations."
-        )
+        exp.append(SAFE_MODE_TEXT)
 
     return exp
+
+
+def explain_prediction_batch(top1_confidence, ndvi_value, overall, zone, trust_source, radius_km, safe_mode):
+    """
+    Array version of explain_prediction over output columns.
+    Fixed sentences are picked with masks; the formatted ones are built
+    once per distinct value.
+    """
+    def per_value(values, render):
+        texts = {}
+        return [texts[v] if v in texts else texts.setdefault(v, render(v)) for v in values]
+
+    confidence = np.asarray(top1_confidence, dtype=object)
+    confidence_text = np.select(
+        [confidence == "HIGH", confidence == "MEDIUM"],
+        [CONFIDENCE_TEXT["HIGH"], CONFIDENCE_TEXT["MEDIUM"]],
+        default=CONFIDENCE_TEXT["LOW"]
+    ).tolist()
+    ndvi_text = np.where(np.asarray(ndvi_value, dtype=float) < 0.3, LOW_NDVI_TEXT, NDVI_TEXT).tolist()
+    soil_text = per_value(overall, lambda v: SOIL_TEXT.format(overall=v.lower()))
+    zone_text = per_value(zone, lambda v: ZONE_TEXT.format(zone=v))
+    trust_text = per_value(
+        zip(trust_source, radius_km),
+        lambda v: TRUST_TEXT.format(source=v[0].lower(), radius_km=v[1])
+    )
+
+    explanations = [
+        list(sentences)
+        for sentences in zip(confidence_text, ndvi_text, soil_text, zone_text, trust_text)
+    ]
+    for i in np.flatnonzero(np.asarray(safe_mode, dtype=bool)).tolist():
+        explanations[i].append(SAFE_MODE_TEXT)
+    return explanations
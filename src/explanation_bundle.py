@@ -0,0 +1,174 @@
+# explanation_bundle.py
+# Model explanations precomputed at training time by train_catboost_top3.py
+# and shipped next to the model:
+#   - global feature importance
+#   - per-class importance (mean |SHAP| over the training rows of all classes)
+#   - mean SHAP per class for every (district, season) seen in training,
+#     plus district-only, season-only and whole-set summaries as fallbacks
+# The bundle records the sha256 of the model file it was built from, and
+# serving ignores it unless that matches the model actually loaded.
+# Arrays are memory-mapped on load, so an explanation is an index lookup.
+import threading
+
+import numpy as np
+
+from artifacts import FileWatch, file_digest
+
+EXPLANATIONS_PATH = "models/catboost_tn_top3_explanations.joblib"
+MODEL_PATH = "models/catboost_tn_top3.joblib"
+
+# Bumped when the bundle layout changes
+EXPLANATION_FORMAT = 1
+
+# Training rows per ShapValues call while building
+SHAP_CHUNK_ROWS = 512
+
+TOP_K = 3
+
+
+def normalize_district(name):
+    return " ".join(str(name).lower().split())
+
+
+def group_keys(district, season):
+    """
+    Summary keys for one row, most specific first.
+    """
+    return [(district, season), (district, None), (None, season), (None, None)]
+
+
+def build_explanation_bundle(model, X, cat_features, model_path=MODEL_PATH, chunk_rows=SHAP_CHUNK_ROWS):
+    """
+    Bundle dict for `model` over training frame X (schema feature columns,
+    including District and Season). Call after the model file is saved.
+    """
+    from catboost import Pool
+
+    features = X.columns.tolist()
+    classes = [str(c) for c in model.classes_]
+    districts = [normalize_district(d) for d in X["District"]]
+    seasons = [str(s).strip() for s in X["Season"]]
+
+    keys = {}
+    row_groups = np.array([
+        [keys.setdefault(k, len(keys)) for k in group_keys(d, s)]
+        for d, s in zip(districts, seasons)
+    ], dtype=np.int64)
+
+    shap_sums = np.zeros((len(keys), len(classes), len(features)))
+    abs_sums = np.zeros((len(classes), len(features)))
+
+    for start in range(0, len(X), chunk_rows):
+        chunk = X.iloc[start:start + chunk_rows]
+        shap = np.asarray(model.get_feature_importance(
+            Pool(chunk, cat_features=cat_features), type="ShapValues"
+        ))
+        if shap.ndim == 2:
+            # binary: contributions towards class 1, mirrored for class 0
+            shap = np.stack([-shap, shap], axis=1)
+        shap = shap[:, :, :-1]
+        for level in range(row_groups.shape[1]):
+            np.add.at(shap_sums, row_groups[start:start + chunk_rows, level], shap)
+        abs_sums += np.abs(shap).sum(axis=0)
+
+    # every row sits in exactly one group per level
+    group_rows = np.bincount(row_groups.ravel(), minlength=len(keys))
+
+    return {
+        "format": EXPLANATION_FORMAT,
+        "model_digest": file_digest(model_path),
+        "features": features,
+        "classes": classes,
+        "rows": len(X),
+        "global_importance": np.asarray(model.get_feature_importance(), dtype=np.float32),
+        "class_importance": (abs_sums / max(len(X), 1)).astype(np.float32),
+        "group_keys": list(keys),
+        "group_rows": group_rows.astype(np.int32),
+        "group_shap": (shap_sums / np.maximum(group_rows, 1)[:, None, None]).astype(np.float32),
+    }
+
+
+def ranked(features, values, k):
+    order = np.argsort(-np.abs(values), kind="stable")[:k]
+    return [(features[j], float(values[j])) for j in order.tolist()]
+
+
+class ExplanationBundle:
+
+    def __init__(self, bundle):
+        self.features = list(bundle["features"])
+        self.classes = list(bundle["classes"])
+        self.model_digest = bundle["model_digest"]
+        self.global_importance = bundle["global_importance"]
+        self.class_importance = bundle["class_importance"]
+        self.group_shap = bundle["group_shap"]
+        self.group_rows = bundle["group_rows"]
+        self.class_index = {c: i for i, c in enumerate(self.classes)}
+        self.group_index = {tuple(k): i for i, k in enumerate(bundle["group_keys"])}
+
+    def global_top_features(self, k=TOP_K):
+        return [f for f, _ in ranked(self.features, self.global_importance, k)]
+
+    def class_top_features(self, crop, k=TOP_K):
+        c = self.class_index.get(str(crop))
+        if c is None:
+            return self.global_top_features(k)
+        return [f for f, _ in ranked(self.features, self.class_importance[c], k)]
+
+    def top_factors(self, district, season, crop, k=TOP_K):
+        """
+        Mean SHAP contributions to `crop` for training rows of this district
+        and season (falling back to the district, the season, then all rows),
+        in the advisory's top_factors format. None for an unknown crop.
+        """
+        c = self.class_index.get(str(crop))
+        if c is None:
+            return None
+        for key in group_keys(normalize_district(district) if district else None, season):
+            g = self.group_index.get(key)
+            if g is not None:
+                return [
+                    {"feature": f, "contribution": round(v, 4)}
+                    for f, v in ranked(self.features, self.group_shap[g, c], k)
+                ]
+        return None
+
+
+class ExplanationStore:
+    """
+    Lazily loaded, hot-reloaded ExplanationBundle for one model file.
+    get() returns None while the bundle is missing, in an old format, or
+    built from a different model or feature list.
+    """
+
+    RELOAD_CHECK_SECONDS = 5.0
+
+    def __init__(self, path=EXPLANATIONS_PATH, model_path=MODEL_PATH, features=None):
+        self.path = path
+        self.model_path = model_path
+        self.features = list(features) if features is not None else None
+        self.bundle = None
+        self.watch = FileWatch(path, model_path, interval=self.RELOAD_CHECK_SECONDS)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        import joblib
+
+        self.bundle = None
+        try:
+            raw = joblib.load(self.path, mmap_mode="r")
+        except (OSError, EOFError, ValueError):
+            return
+        if raw.get("format") != EXPLANATION_FORMAT:
+            return
+        if raw.get("model_digest") != file_digest(self.model_path):
+            return
+        if self.features is not None and list(raw["features"]) != self.features:
+            return
+        self.bundle = ExplanationBundle(raw)
+
+    def get(self):
+        with self._lock:
+            if self.watch.poll():
+                self._load()
+            return self.bundle
@@ -1,6 +1,6 @@
-import pandas as pd
+from columnar import read_dataset, write_dataset
 
-df = pd.read_csv("data/processed/tn_final_ml_dataset.csv")
+df = read_dataset("data/processed/tn_final_ml_dataset.csv")
 
 print("Before filtering:", df.shape)
 
@@ -10,7 +10,7 @@ df = df[df["ndvi_mean"].notna()]
 print("After filtering:", df.shape)
 print("Years used:", sorted(df["Year"].unique()))
 
-df.to_csv("data/processed/tn_ml_ndvi_only.csv", index=False)
+write_dataset(df, "data/processed/tn_ml_ndvi_only.csv")
 
 print("✅ NDVI-aligned ML dataset saved")
 print(df.head())
\ No newline at end of file
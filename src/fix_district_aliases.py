@@ -1,10 +1,12 @@
 import pandas as pd
 from pathlib import Path
 
+from columnar import read_dataset, write_dataset
+
 ROOT = Path(__file__).resolve().parents[1]
 FILE = ROOT / "data" / "processed" / "tn_crop_with_soil.csv"
 
-df = pd.read_csv(FILE)
+df = read_dataset(FILE)
 
 print("Before fix:")
 print(df[df["Soil_Type"].isna()]["District"].value_counts())
@@ -29,5 +31,5 @@ df = df.drop(columns=["Soil_Type"]).merge(
 print("\nAfter fix:")
 print(df[df["Soil_Type"].isna()]["District"].value_counts())
 
-df.to_csv(FILE, index=False)
+write_dataset(df, FILE)
 print("\n✅ Alias fixed and file saved:", FILE)
@@ -1,10 +1,20 @@
 #!/usr/bin/env python3
 # src/ingest_ndvi.py (improved)
+# Files are ingested in parallel (one process per file); each worker streams
+# its file in chunks into mergeable per-group stats (running_stats.py), so
+# memory is bounded by the number of groups, and the parent merges the
+# workers' stats exactly. Throughput is reported in rows/sec.
+import os
 from pathlib import Path
 import pandas as pd
 import numpy as np
 import sys
-import math
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from excel_cache import read_excel_cached
+from running_stats import RunningStats
 
 ROOT = Path.cwd()
 NDVI_DIR = ROOT / "data" / "external" / "ndvi"
@@ -12,29 +22,41 @@ OUT_DIR = ROOT / "data" / "processed"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 # Config
-CSV_CHUNK_SIZE = 200_000  # read csv in chunks if file large
+CSV_CHUNK_SIZE = 200_000  # rows per chunk; memory per worker is one chunk + one row per group
+RAW_SAMPLE_ROWS = 2000  # raw rows kept per file for ndvi_raw.csv
 RAW_SAVE_LIMIT = 2_000_000  # maximum rows to write to ndvi_raw.csv (prevents OOM in accidental huge concat)
+
+# Aggregation level per file: state column > lat/lon grid > year only.
+# Only the most specific level found in any file is written out.
+LEVELS = {
+    "region": (["region", "year"], "ndvi_region_year.csv"),
+    # month kept so src/zonal_ndvi.py can build district x month NDVI
+    "grid": (["lat_round", "lon_round", "year", "month"], "ndvi_year_grid.csv"),
+    "year": (["year"], "ndvi_year.csv"),
+}
 POSSIBLE_DATE_NAMES = ["date", "acq_date", "acquisition_date", "timestamp", "time", "datetime", "obs_date"]
 POSSIBLE_NDVI_NAMES = ["ndvi", "ndvi_mean", "ndvi_mean_value", "ndvi_value", "ndvi_med", "value", "mean_ndvi", "NDVI_mean", "NDVI"]
 POSSIBLE_LAT = ["lat","latitude","y"]
 POSSIBLE_LON = ["lon","longitude","long","x"]
 POSSIBLE_STATE = ["state","region","admin1","province","state_name","region_name","district","zone"]
 
-def try_read_any_file(path: Path):
-    """Read a csv/xlsx; if csv and big, return iterator of chunks, else df"""
+def read_header(path: Path):
+    """Column names of a csv/xlsx without reading its rows"""
     suffix = path.suffix.lower()
     if suffix == ".csv":
-        size = path.stat().st_size
-        if size > 50_000_000:  # >50MB -> use chunking to avoid memory blow
-            return pd.read_csv(path, chunksize=CSV_CHUNK_SIZE, low_memory=False)
-        else:
-            return pd.read_csv(path, low_memory=False)
+        return pd.read_csv(path, nrows=0).columns.tolist()
     elif suffix in (".xls", ".xlsx"):
-        # For Excel, try first sheet
-        return pd.read_excel(path, sheet_name=0, engine="openpyxl")
+        return read_excel_cached(path, sheet_name=0, nrows=0).columns.tolist()
     else:
         raise ValueError(f"Unsupported file type: {path}")
 
+def iter_chunks(path: Path, usecols, chunk_rows=CSV_CHUNK_SIZE):
+    """Chunks of at most chunk_rows rows (csv) or the whole first sheet (xlsx, parsed once into excel_cache), only `usecols`"""
+    if path.suffix.lower() == ".csv":
+        yield from pd.read_csv(path, usecols=usecols, chunksize=chunk_rows, low_memory=False)
+    else:
+        yield read_excel_cached(path, sheet_name=0, usecols=usecols)
+
 def detect_column(cols_lower, candidates):
     for cand in candidates:
         if cand in cols_lower:
@@ -100,12 +122,76 @@ def map_latlon_to_state_if_possible(df_points, lon_col, lat_col, shapefile_path=
                 break
     return pd.DataFrame(joined.drop(columns=["geometry","index_right"], errors="ignore"))
 
-def append_or_accumulate(agg_df, chunk):
-    if agg_df is None:
-        return chunk
-    return pd.concat([agg_df, chunk], ignore_index=True)
+def ingest_file(path: Path, chunk_rows=CSV_CHUNK_SIZE):
+    """
+    Worker: streams one file into RunningStats at the most specific level
+    its columns allow. Columns are detected once from the header and only
+    those are read. Returns a small dict (stats, raw sample, counts).
+    """
+    start = time.perf_counter()
+    result = {"name": path.name, "level": None, "stats": None, "sample": None, "rows": 0, "error": None}
+    try:
+        header = read_header(path)
+    except Exception as e:
+        result["error"] = f"failed to open: {e}"
+        return result
+    frame = pd.DataFrame(columns=header)
+
+    ndvi_col = secure_colname_match(frame, POSSIBLE_NDVI_NAMES)
+    if ndvi_col is None:
+        result["error"] = "no NDVI-like column found"
+        return result
+    date_col = secure_colname_match(frame, POSSIBLE_DATE_NAMES)
+    state_col = secure_colname_match(frame, POSSIBLE_STATE)
+    lat_c = secure_colname_match(frame, POSSIBLE_LAT)
+    lon_c = secure_colname_match(frame, POSSIBLE_LON)
+
+    if state_col:
+        level = "region"
+    elif lat_c and lon_c:
+        level = "grid"
+    else:
+        level = "year"
+    keys, _ = LEVELS[level]
+    stats = RunningStats(keys)
+    usecols = [c for c in header if c in {ndvi_col, date_col, state_col, lat_c, lon_c}]
+
+    try:
+        for chunk in iter_chunks(path, usecols, chunk_rows):
+            result["rows"] += len(chunk)
+            if result["sample"] is None:
+                result["sample"] = chunk.head(RAW_SAMPLE_ROWS)
+
+            part = pd.DataFrame({"ndvi": pd.to_numeric(chunk[ndvi_col], errors="coerce")})
+            # no date column -> no year -> the file contributes no groups
+            if date_col:
+                dates = pd.to_datetime(chunk[date_col], errors="coerce")
+                part["year"] = dates.dt.year.astype("Int64")
+                part["month"] = dates.dt.month.astype("Int64")
+            else:
+                part["year"] = pd.array([pd.NA] * len(chunk), dtype="Int64")
+                part["month"] = pd.array([pd.NA] * len(chunk), dtype="Int64")
+
+            if level == "region":
+                part["region"] = chunk[state_col].astype(str).str.strip()
+            elif level == "grid":
+                part["lat_round"] = pd.to_numeric(chunk[lat_c], errors="coerce").round(3)
+                part["lon_round"] = pd.to_numeric(chunk[lon_c], errors="coerce").round(3)
+            stats.add(part, "ndvi")
+    except Exception as e:
+        result["error"] = f"failed while reading: {e}"
+        return result
+
+    result.update(level=level, stats=stats, seconds=time.perf_counter() - start)
+    return result
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Aggregate NDVI files into region/grid/year stats")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (1 = in-process)")
+    parser.add_argument("--chunk-rows", type=int, default=CSV_CHUNK_SIZE)
+    args = parser.parse_args()
+
     if not NDVI_DIR.exists():
         print("No ndvi folder at", NDVI_DIR, " — place your ndvi files there.")
         sys.exit(1)
@@ -118,124 +204,35 @@ def main():
 
     print("Found files:", [f.name for f in files])
 
-    # We'll build a small list of frames or aggregated stats without loading everything at once.
+    start = time.perf_counter()
+    jobs = max(1, min(args.jobs, len(files)))
+    if jobs == 1:
+        results = [ingest_file(f, args.chunk_rows) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # map keeps file order, so merges are reproducible
+            results = list(pool.map(ingest_file, files, [args.chunk_rows] * len(files)))
+    seconds = time.perf_counter() - start
+
+    # merge worker stats per level (exact: sums, counts, min/max, sums of squares)
+    merged = {}
     raw_parts = []
     total_rows = 0
-    # Track if we found a state column anywhere
-    found_state = False
-    found_latlon = False
-
-    # We'll accumulate per-file region/year aggregates (if possible) to then merge
-    perfile_aggregates = []
-
-    for f in files:
-        print("Processing", f.name)
-        try:
-            obj = try_read_any_file(f)
-        except Exception as e:
-            print("Failed to open", f, ":", e)
+    for r in results:
+        total_rows += r["rows"]
+        if r["error"]:
+            print("Skipping", r["name"], "-", r["error"])
             continue
+        print(f"Read {r['rows']} rows from {r['name']} ({r['level']} level, "
+              f"{r['rows'] / max(r['seconds'], 1e-9):,.0f} rows/sec)")
+        if r["sample"] is not None:
+            raw_parts.append(r["sample"])
+        if r["level"] not in merged:
+            merged[r["level"]] = RunningStats(LEVELS[r["level"]][0])
+        merged[r["level"]].merge(r["stats"])
 
-        # if obj is a TextFileReader (chunks)
-        if hasattr(obj, "__iter__") and not isinstance(obj, pd.DataFrame):
-            # chunked processing for large csv
-            agg_this_file = None
-            row_count = 0
-            for chunk in obj:
-                row_count += len(chunk)
-                # detect columns in this chunk
-                ndvi_col = secure_colname_match(chunk, POSSIBLE_NDVI_NAMES)
-                date_col = secure_colname_match(chunk, POSSIBLE_DATE_NAMES)
-                state_col = secure_colname_match(chunk, POSSIBLE_STATE)
-                lat_c = secure_colname_match(chunk, POSSIBLE_LAT)
-                lon_c = secure_colname_match(chunk, POSSIBLE_LON)
-
-                # if ndvi missing in this chunk skip
-                if ndvi_col is None:
-                    continue
-
-                # ensure numeric
-                chunk[ndvi_col] = pd.to_numeric(chunk[ndvi_col], errors="coerce")
-                # parse date to year if possible
-                if date_col:
-                    chunk[date_col] = pd.to_datetime(chunk[date_col], errors="coerce")
-                    chunk["year"] = chunk[date_col].dt.year
-                else:
-                    chunk["year"] = pd.NA
-
-                # prefer state col if available
-                if state_col:
-                    found_state = True
-                    chunk[state_col] = chunk[state_col].astype(str).str.strip()
-                    grp = chunk.dropna(subset=["year", ndvi_col]).groupby([state_col, "year"])[ndvi_col].agg(["mean","min","max","count"]).reset_index()
-                    grp = grp.rename(columns={state_col:"region","mean":"mean_ndvi","min":"min_ndvi","max":"max_ndvi","count":"observations"})
-                    agg_this_file = append_or_accumulate(agg_this_file, grp)
-                elif lat_c and lon_c:
-                    found_latlon = True
-                    # aggregate by rounded lat/lon + year
-                    chunk = chunk.dropna(subset=[lat_c, lon_c, ndvi_col])
-                    chunk["lat_round"] = chunk[lat_c].round(3)
-                    chunk["lon_round"] = chunk[lon_c].round(3)
-                    grp = chunk.groupby(["lat_round","lon_round","year"])[ndvi_col].agg(["mean","count"]).reset_index()
-                    grp = grp.rename(columns={"mean":"mean_ndvi","count":"observations"})
-                    agg_this_file = append_or_accumulate(agg_this_file, grp)
-                else:
-                    # year-only aggregation
-                    grp = chunk.dropna(subset=["year", ndvi_col]).groupby(["year"])[ndvi_col].agg(["mean","count"]).reset_index()
-                    grp = grp.rename(columns={"mean":"mean_ndvi","count":"observations"})
-                    agg_this_file = append_or_accumulate(agg_this_file, grp)
-
-                # keep a small sample of raw rows (limit total)
-                if len(raw_parts) == 0:
-                    sample = chunk.head(1000)
-                else:
-                    sample = chunk.head(200)
-                raw_parts.append(sample)
-            print(f"Read (chunked) ~{row_count} rows from {f.name}")
-            if agg_this_file is not None:
-                perfile_aggregates.append((f.name, agg_this_file))
-        else:
-            # obj is DataFrame (small file)
-            df = obj
-            total_rows += len(df)
-            # store sample raw
-            raw_parts.append(df.head(2000))
-            # detect columns
-            ndvi_col = secure_colname_match(df, POSSIBLE_NDVI_NAMES)
-            date_col = secure_colname_match(df, POSSIBLE_DATE_NAMES)
-            state_col = secure_colname_match(df, POSSIBLE_STATE)
-            lat_c = secure_colname_match(df, POSSIBLE_LAT)
-            lon_c = secure_colname_match(df, POSSIBLE_LON)
-
-            if ndvi_col is None:
-                print("Skipping", f.name, "- no NDVI-like column found.")
-                continue
-
-            df[ndvi_col] = pd.to_numeric(df[ndvi_col], errors="coerce")
-            if date_col:
-                df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-                df["year"] = df[date_col].dt.year
-            else:
-                df["year"] = pd.NA
-
-            if state_col:
-                found_state = True
-                df[state_col] = df[state_col].astype(str).str.strip()
-                grp = df.dropna(subset=["year", ndvi_col]).groupby([state_col, "year"])[ndvi_col].agg(["mean","min","max","count"]).reset_index()
-                grp = grp.rename(columns={state_col:"region","mean":"mean_ndvi","min":"min_ndvi","max":"max_ndvi","count":"observations"})
-                perfile_aggregates.append((f.name, grp))
-            elif lat_c and lon_c:
-                found_latlon = True
-                df = df.dropna(subset=[lat_c, lon_c, ndvi_col])
-                df["lat_round"] = df[lat_c].round(3)
-                df["lon_round"] = df[lon_c].round(3)
-                grp = df.groupby(["lat_round","lon_round","year"])[ndvi_col].agg(["mean","count"]).reset_index()
-                grp = grp.rename(columns={"mean":"mean_ndvi","count":"observations"})
-                perfile_aggregates.append((f.name, grp))
-            else:
-                grp = df.dropna(subset=["year", ndvi_col]).groupby(["year"])[ndvi_col].agg(["mean","count"]).reset_index()
-                grp = grp.rename(columns={"mean":"mean_ndvi","count":"observations"})
-                perfile_aggregates.append((f.name, grp))
+    print(f"Ingested {total_rows} rows from {len(files)} files in {seconds:.2f}s "
+          f"with {jobs} worker(s): {total_rows / max(seconds, 1e-9):,.0f} rows/sec")
 
     # Save a combined raw sample (avoid writing enormous raw file)
     if raw_parts:
@@ -248,51 +245,17 @@ def main():
     else:
         print("No raw rows captured (no NDVI columns found in files?)")
 
-    # Merge per-file aggregates into a unified table
-    if not perfile_aggregates:
+    # the most specific level any file supports wins
+    level = next((lv for lv in LEVELS if lv in merged and len(merged[lv])), None)
+    if level is None:
         print("No per-file aggregates created — there was no year/ndvi info found.")
         sys.exit(1)
 
-    # unify logic: if any aggregate has 'region' column use region-based merging
-    use_region = any('region' in df.columns for _, df in perfile_aggregates)
-    if use_region:
-        agg_frames = []
-        for name, df in perfile_aggregates:
-            if 'region' in df.columns:
-                agg_frames.append(df[['region','year','mean_ndvi','min_ndvi','max_ndvi','observations']])
-        combined = pd.concat(agg_frames, ignore_index=True)
-        # group again to ensure duplicates handled
-        combined = combined.groupby(['region','year']).agg({'mean_ndvi':'mean','min_ndvi':'min','max_ndvi':'max','observations':'sum'}).reset_index()
-        combined = combined.rename(columns={'region':'region'})
-        out_path = OUT_DIR / "ndvi_region_year.csv"
-        combined.to_csv(out_path, index=False)
-        print("Saved region-year NDVI to", out_path, "with rows:", len(combined))
-        return
-
-    # if no region but lat/lon grid aggregates exist
-    latlon_present = any('lat_round' in df.columns for _, df in perfile_aggregates)
-    if latlon_present:
-        agg_frames = []
-        for name, df in perfile_aggregates:
-            if 'lat_round' in df.columns:
-                agg_frames.append(df)
-        combined = pd.concat(agg_frames, ignore_index=True)
-        combined = combined.groupby(['lat_round','lon_round','year']).agg({'mean_ndvi':'mean','observations':'sum'}).reset_index()
-        out_path = OUT_DIR / "ndvi_year_grid.csv"
-        combined.to_csv(out_path, index=False)
-        print("Saved lat/lon grid-year NDVI to", out_path, "with rows:", len(combined))
-        return
-
-    # else fallback: year-only aggregation
-    agg_frames = []
-    for name, df in perfile_aggregates:
-        if 'year' in df.columns:
-            agg_frames.append(df[['year','mean_ndvi','observations']])
-    combined = pd.concat(agg_frames, ignore_index=True)
-    combined = combined.groupby(['year']).agg({'mean_ndvi':'mean','observations':'sum'}).reset_index()
-    out_path = OUT_DIR / "ndvi_year.csv"
+    _, out_name = LEVELS[level]
+    combined = merged[level].result(suffix="_ndvi")
+    out_path = OUT_DIR / out_name
     combined.to_csv(out_path, index=False)
-    print("Saved year-only NDVI to", out_path, "with rows:", len(combined))
+    print(f"Saved {level}-level NDVI to", out_path, "with rows:", len(combined))
 
 if __name__ == "__main__":
     main()
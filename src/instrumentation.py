@@ -0,0 +1,155 @@
+# instrumentation.py
+# Per-stage latency histograms for the advisory hot path.
+#
+# Off by default; set ZENITH_METRICS=1 to enable. When off, timed() returns
+# a shared no-op context manager, so instrumented code costs one function
+# call per stage.
+#
+#   with timed("predict_proba"):
+#       probs = model.predict_proba(pool)
+#
+# Export with prometheus_text() (text exposition format) or snapshot() (JSON).
+import bisect
+import contextlib
+import os
+import threading
+import time
+
+ENV_FLAG = "ZENITH_METRICS"
+METRIC_NAME = "advisory_stage_latency_seconds"
+
+# Upper bounds in seconds (Prometheus "le"); +Inf is implicit
+BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def env_enabled():
+    return os.environ.get(ENV_FLAG, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class Histogram:
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += seconds
+            self.count += 1
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-quantile (None if empty).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for upper, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return upper
+        return float("inf")
+
+
+class StageTimer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe((time.perf_counter_ns() - self.start) / 1e9)
+        return False
+
+
+class Registry:
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        h = self.histograms.get(stage)
+        if h is None:
+            with self._lock:
+                h = self.histograms.setdefault(stage, Histogram())
+        return h
+
+    def timed(self, stage):
+        if not self.enabled:
+            return _NULL_TIMER
+        return StageTimer(self.histogram(stage))
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def snapshot(self):
+        stages = {}
+        for stage, h in sorted(self.histograms.items()):
+            stages[stage] = {
+                "count": h.count,
+                "sum_seconds": h.total,
+                "mean_ms": h.total / h.count * 1000 if h.count else None,
+                "p50_le_seconds": h.quantile(0.50),
+                "p99_le_seconds": h.quantile(0.99),
+                "buckets": {
+                    str(le): n for le, n in zip(h.buckets + ("+Inf",), h.counts)
+                },
+            }
+        return {"enabled": self.enabled, "metric": METRIC_NAME, "stages": stages}
+
+    def prometheus_text(self):
+        lines = [
+            f"# HELP {METRIC_NAME} Wall time of each advisory pipeline stage.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for stage, h in sorted(self.histograms.items()):
+            cumulative = 0
+            for le, n in zip(h.buckets + ("+Inf",), h.counts):
+                cumulative += n
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {h.total}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the serving path
+registry = Registry(enabled=env_enabled())
+
+
+def timed(stage):
+    return registry.timed(stage)
+
+
+def enable(flag=True):
+    registry.enabled = flag
+
+
+def snapshot():
+    return registry.snapshot()
+
+
+def prometheus_text():
+    return registry.prometheus_text()
+
+
+def reset():
+    registry.reset()
@@ -1,26 +1,230 @@
 # location_resolver.py
-import pandas as pd
+# Place name -> district.
+#
+# VillageIndex answers exact names from a hash map and misspellings /
+# transliterations ("thelungapati", "manaparai") from a character-trigram
+# inverted index. A fuzzy lookup counts, per name, how many query trigrams
+# it shares (one bincount over the query's postings arrays), keeps names
+# whose shared count and size still allow the minimum Jaccard similarity
+# and takes the best, so it never compares the query with every name.
+# Fuzzy results are memoized per normalized name in a bounded LRU.
+import csv
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
 
 VILLAGE_MAP_PATH = "data/village_to_district.csv"
+DISTRICTS_PATH = "data/processed/tn_district_centroids.csv"
+
+NGRAM = 3
+# Minimum trigram Jaccard similarity for a fuzzy match
+FUZZY_MIN_SCORE = 0.6
+# Normalized names whose fuzzy result is remembered
+FUZZY_MEMO_SIZE = 4096
+
+# Built on first use so importing the serving path stays cheap
+_index = None
+_grid = None
+_index_lock = threading.Lock()
+
+
+def normalize_name(name):
+    return " ".join(str(name).lower().split())
+
+
+def name_grams(norm, n=NGRAM):
+    padded = f" {norm} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class VillageIndex:
+
+    def __init__(self, villages, districts=(), min_score=FUZZY_MIN_SCORE, memo_size=FUZZY_MEMO_SIZE):
+        """
+        villages: (village, district) pairs; the first district listed for
+        a village wins. districts: names accepted as districts as typed.
+        """
+        self.min_score = min_score
+        self.memo_size = memo_size
+        self._memo = OrderedDict()  # norm -> best_match result
+        self._memo_lock = threading.Lock()
+
+        self.villages = {}
+        for village, district in villages:
+            self.villages.setdefault(normalize_name(village), normalize_name(district))
+        self.districts = {normalize_name(d) for d in districts}
+
+        # Fuzzy candidates: villages first, then districts
+        self.names = list(self.villages) + sorted(self.districts - self.villages.keys())
+        self.n_villages = len(self.villages)
+
+        postings = {}
+        sizes = []
+        for i, name in enumerate(self.names):
+            grams = name_grams(name)
+            sizes.append(len(grams))
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        self.sizes = np.array(sizes, dtype=np.int32)
+        self.postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def best_match(self, norm):
+        """
+        (name_id, score) of the most similar name, or None below min_score.
+        Ties go to the lowest id, i.e. villages before districts.
+        """
+        with self._memo_lock:
+            if norm in self._memo:
+                self._memo.move_to_end(norm)
+                return self._memo[norm]
+
+        best = self._best_match(norm)
+
+        with self._memo_lock:
+            self._memo[norm] = best
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return best
+
+    def _best_match(self, norm):
+        grams = name_grams(norm)
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists:
+            return None
+
+        q = len(grams)
+        shared = np.bincount(np.concatenate(lists))
+        # Jaccard >= t needs at least ceil(t * |q|) shared grams and
+        # t * |q| <= |s| <= |q| / t
+        candidates = np.flatnonzero(shared >= math.ceil(self.min_score * q - 1e-9))
+        sizes = self.sizes[candidates]
+        fits = (sizes >= self.min_score * q - 1e-9) & (sizes * self.min_score <= q + 1e-9)
+        candidates, sizes = candidates[fits], sizes[fits]
+        if not candidates.size:
+            return None
+
+        hits = shared[candidates]
+        scores = hits / (q + sizes - hits)
+        best = int(np.argmax(scores))
+        if scores[best] < self.min_score:
+            return None
+        return int(candidates[best]), float(scores[best])
+
+    def lookup(self, place_name):
+        """
+        Returns (district, resolution_type, score).
+        """
+        name = normalize_name(place_name)
+
+        # 1️⃣ Exact village match
+        district = self.villages.get(name)
+        if district is not None:
+            return district, "VILLAGE_MATCH", 1.0
+
+        # 2️⃣ User already gave a known district
+        if name in self.districts:
+            return name, "DISTRICT_ASSUMED", 1.0
+
+        # 3️⃣ Closest spelling of a village or district
+        best = self.best_match(name)
+        if best is not None:
+            i, score = best
+            if i < self.n_villages:
+                return self.villages[self.names[i]], "FUZZY_VILLAGE_MATCH", score
+            return self.names[i], "FUZZY_DISTRICT_MATCH", score
+
+        # 4️⃣ Fallback: treat as a district name (fallback profile later)
+        return name, "DISTRICT_ASSUMED", 0.0
+
+
+def read_pairs(path, columns):
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            return [
+                tuple(row[c] for c in columns)
+                for row in csv.DictReader(f)
+                if all(row.get(c) for c in columns)
+            ]
+    except (OSError, KeyError):
+        return []
+
+
+def build_index(village_map_path=VILLAGE_MAP_PATH, districts_path=DISTRICTS_PATH):
+    villages = read_pairs(village_map_path, ("village", "district"))
+    districts = [d for (d,) in read_pairs(districts_path, ("District",))]
+    return VillageIndex(villages, districts)
+
+
+def load_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = build_index()
+    return _index
 
-try:
-    village_df = pd.read_csv(VILLAGE_MAP_PATH)
-    village_df["village_norm"] = village_df["village"].str.lower().str.strip()
-except:
-    village_df = pd.DataFrame()
 
 def resolve_location(place_name: str):
     """
     Resolves village/town name to nearest known district.
     Returns: (district, resolution_type)
     """
-    name = place_name.lower().strip()
+    district, resolution_type, _ = load_index().lookup(place_name)
+    return district, resolution_type
+
+
+def resolve_locations(place_names):
+    """
+    Batch resolve_location; each distinct name is looked up once.
+    """
+    index = load_index()
+    resolved = {}
+    for name in place_names:
+        if name not in resolved:
+            resolved[name] = index.lookup(name)[:2]
+    return [resolved[name] for name in place_names]
+
 
-    # 1️⃣ Exact village match
-    match = village_df[village_df["village_norm"] == name]
-    if not match.empty:
-        return match.iloc[0]["district"].lower(), "VILLAGE_MATCH"
+# ==================================================
+# COORDINATES (GPS)
+# ==================================================
+def load_grid():
+    global _grid
+    if _grid is None:
+        with _index_lock:
+            if _grid is None:
+                from district_polygons import load_district_grid
 
-    # 2️⃣ If user already gave district
-    return name, "DISTRICT_ASSUMED"
-    # 3️⃣ Fallback
\ No newline at end of file
+                _grid = load_district_grid()
+    return _grid
+
+
+def resolve_coordinates(lat, lon):
+    """
+    Resolves a GPS point to the district polygon containing it.
+    Returns: (district, resolution_type); district is None outside all polygons.
+    """
+    district = load_grid().district_at(float(lon), float(lat))
+    if district is None:
+        return None, "OUTSIDE_COVERAGE"
+    return district, "COORDINATE_MATCH"
+
+
+def resolve_coordinates_batch(points):
+    """
+    Batch resolve_coordinates for a sequence of (lat, lon) pairs.
+    """
+    if not len(points):
+        return []
+    grid = load_grid()
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    located = grid.locate(points[:, 1], points[:, 0])
+    return [
+        (None, "OUTSIDE_COVERAGE") if i < 0 else (grid.names[i], "COORDINATE_MATCH")
+        for i in located.tolist()
+    ]
@@ -1,11 +1,18 @@
-from rules.fertilizer_engine import fertilizer_rules
+from rules.fertilizer_engine import recommend_fertilizer
 from rules.market_engine import get_market_info
+from soil_behavior import infer_soil_behavior
+from soil_health import NUTRIENT_BANDS, band_value
 
-fertilizer_info = fertilizer_rules(
-    crop="Paddy",
-    soil="Clayey",
-    nitrogen=32
-)
+soil_health = {
+    "nitrogen": band_value(32, *NUTRIENT_BANDS["nitrogen"]),
+    "phosphorus": "MEDIUM",
+    "potassium": "MEDIUM"
+}
+soil_behavior = infer_soil_behavior(soil_health, ndvi=0.5, zone="DELTA")
 
-market_info = get_market_info("Paddy")
-print("Fertilizer Recommendation:", fertilizer_info)
\ No newline at end of file
+fertilizer_info = recommend_fertilizer(crop="Paddy", soil_behavior=soil_behavior)
+market_info = get_market_info("Paddy", zone="DELTA")
+
+print("Soil Behavior:", soil_behavior)
+print("Fertilizer Recommendation:", fertilizer_info)
+print("Market Awareness:", market_info)
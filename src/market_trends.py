@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+src/market_trends.py
+
+Daily mandi price ingestion and incremental trend indicators.
+
+    python src/market_trends.py             # ingest new drops, refresh trends
+    python src/market_trends.py --rebuild   # wipe the store, re-ingest every drop
+
+Drops are CSV files placed in data/raw/mandi_prices/ (Agmarknet / data.gov.in
+exports work as-is). Recognised columns, case-insensitive:
+    date     (date | arrival_date; YYYY-MM-DD or DD/MM/YYYY)
+    crop     (crop | commodity)
+    market   (market)
+    district (district, optional; used for the agro-climatic zone)
+    price    (modal_price | modal_x0020_price | price)
+    arrivals (arrivals | arrivals_tonnes | arrival_quantity, optional)
+
+Store layout (data/processed/mandi_store/):
+    <crop>/<market>/day.i32, price.f32, arrivals.f32
+        append-only columns, one value per trading day
+    state.json
+        per partition: the last WINDOW days, the latest indicators and the
+        number of values in its columns; manifest of drops already
+        ingested (name -> size/mtime)
+
+Series are keyed by slug(crop), slug(market), so "Paddy"/"paddy" or
+"MADURAI"/"Madurai" are one series. Column data is flushed before
+state.json is replaced, and on load the columns are cut back to the
+recorded count, so a crash mid-ingest leaves no values state.json does not
+know about (the drop is ingested again on the next run).
+
+New days update their partition's indicators from the rolling window
+only (SMA 7/28, 14-day price slope, 28-day volatility of log returns), so
+history is never re-read. data/processed/market_trends.csv holds the
+latest trend per (crop, zone) and is hot-reloaded by rules/market_engine.
+"""
+import argparse
+import csv
+import datetime
+import json
+import math
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+from agro_zones import get_zone
+from artifacts import file_version
+
+ROOT = Path(__file__).resolve().parents[1]
+DROPS_DIR = ROOT / "data" / "raw" / "mandi_prices"
+STORE_DIR = ROOT / "data" / "processed" / "mandi_store"
+TRENDS_PATH = ROOT / "data" / "processed" / "market_trends.csv"
+
+SHORT_WINDOW = 7
+LONG_WINDOW = 28
+SLOPE_WINDOW = 14
+WINDOW = LONG_WINDOW + 1  # one extra day for the first log return
+MIN_OBSERVATIONS = SHORT_WINDOW
+
+# Trend labels (same vocabulary as data/market_reference.csv, plus Falling)
+VOLATILITY_LIMIT = 0.04  # std of daily log returns
+SLOPE_LIMIT = 0.002      # price slope per day, relative to the long SMA
+
+COLUMNS = {
+    "date": ("date", "arrival_date"),
+    "crop": ("crop", "commodity"),
+    "market": ("market",),
+    "district": ("district",),
+    "price": ("modal_price", "modal_x0020_price", "price"),
+    "arrivals": ("arrivals", "arrivals_tonnes", "arrival_quantity"),
+}
+
+TREND_FIELDS = [
+    "crop", "zone", "market", "trend", "as_of",
+    "sma_7", "sma_28", "slope_14", "volatility_28", "observations"
+]
+
+EPOCH = datetime.date(1970, 1, 1)
+
+# (file, bytes per value) of each partition column
+COLUMN_FILES = (("day.i32", 4), ("price.f32", 4), ("arrivals.f32", 4))
+
+
+# ==================================================
+# PARSING
+# ==================================================
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "_", text.strip().lower()).strip("_") or "unknown"
+
+
+def parse_day(text):
+    text = text.strip()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+        try:
+            return (datetime.datetime.strptime(text, fmt).date() - EPOCH).days
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date: {text!r}")
+
+
+def day_to_iso(day):
+    return (EPOCH + datetime.timedelta(days=int(day))).isoformat()
+
+
+def header_map(fieldnames):
+    """
+    {our column: column name in the drop}.
+    """
+    normalized = {re.sub(r"\s+", "_", f.strip().lower()): f for f in fieldnames or []}
+    found = {}
+    for column, aliases in COLUMNS.items():
+        for alias in aliases:
+            if alias in normalized:
+                found[column] = normalized[alias]
+                break
+    missing = {"date", "crop", "market", "price"} - found.keys()
+    if missing:
+        raise ValueError(f"missing columns: {sorted(missing)}")
+    return found
+
+
+def series_key(crop, market):
+    return slug(crop), slug(market)
+
+
+def read_drop(path):
+    """
+    {series_key: {day: [price_sum, n, arrivals, district]}} for one file
+    plus {series_key: (crop, market)} as first spelled; several rows for
+    the same market and day are averaged.
+    """
+    days = {}
+    names = {}
+    rows = skipped = 0
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        cols = header_map(reader.fieldnames)
+        for row in reader:
+            rows += 1
+            try:
+                day = parse_day(row[cols["date"]])
+                price = float(row[cols["price"]])
+            except (ValueError, TypeError):
+                skipped += 1
+                continue
+            if not math.isfinite(price) or price <= 0:
+                skipped += 1
+                continue
+            try:
+                arrivals = float(row[cols["arrivals"]]) if "arrivals" in cols else 0.0
+            except (ValueError, TypeError):
+                arrivals = 0.0
+
+            crop, market = row[cols["crop"]].strip(), row[cols["market"]].strip()
+            key = series_key(crop, market)
+            names.setdefault(key, (crop, market))
+            entry = days.setdefault(key, {}).setdefault(
+                day, [0.0, 0, 0.0, row.get(cols.get("district"), "") or ""]
+            )
+            entry[0] += price
+            entry[1] += 1
+            entry[2] += arrivals
+    return days, names, rows, skipped
+
+
+# ==================================================
+# INCREMENTAL INDICATORS
+# ==================================================
+def indicators(window):
+    """
+    Indicators from the rolling window only (oldest first, at most WINDOW
+    [day, price, arrivals] entries): constant work per appended day.
+    """
+    days = np.array([w[0] for w in window], dtype=float)
+    prices = np.array([w[1] for w in window], dtype=float)
+
+    sma_short = prices[-SHORT_WINDOW:].mean()
+    sma_long = prices[-LONG_WINDOW:].mean()
+
+    x, y = days[-SLOPE_WINDOW:], prices[-SLOPE_WINDOW:]
+    slope = 0.0
+    if len(x) >= 2 and np.ptp(x) > 0:
+        slope = float(np.polyfit(x - x[0], y, 1)[0])
+
+    returns = np.diff(np.log(prices[-WINDOW:]))
+    volatility = float(returns.std()) if len(returns) >= 2 else 0.0
+
+    return {
+        "sma_7": float(sma_short),
+        "sma_28": float(sma_long),
+        "slope_14": slope,
+        "volatility_28": volatility,
+    }
+
+
+def classify_trend(ind):
+    if ind["volatility_28"] > VOLATILITY_LIMIT:
+        return "Volatile"
+    relative_slope = ind["slope_14"] / ind["sma_28"] if ind["sma_28"] else 0.0
+    if relative_slope > SLOPE_LIMIT and ind["sma_7"] >= ind["sma_28"]:
+        return "Rising"
+    if relative_slope < -SLOPE_LIMIT and ind["sma_7"] <= ind["sma_28"]:
+        return "Falling"
+    return "Stable"
+
+
+class Partition:
+    """
+    One (crop, market) series: append-only column files plus the rolling
+    window the indicators need.
+    """
+
+    def __init__(self, crop, market, store_dir=STORE_DIR, state=None):
+        self.crop = crop
+        self.market = market
+        self.directory = Path(store_dir) / slug(crop) / slug(market)
+        state = state or {}
+        self.district = state.get("district", "")
+        # = values in each column file
+        self.observations = state.get("observations", 0)
+        self.last_day = state.get("last_day")
+        self.window = state.get("window", [])
+        self.latest = state.get("latest")
+        self._truncate_columns()
+
+    def _truncate_columns(self):
+        """
+        Drops values appended after the last saved state (crash mid-ingest).
+        """
+        for name, itemsize in COLUMN_FILES:
+            path = self.directory / name
+            if path.exists() and path.stat().st_size > self.observations * itemsize:
+                os.truncate(path, self.observations * itemsize)
+
+    def append(self, new_days):
+        """
+        Appends days after last_day in date order; returns (appended, late).
+        Days at or before last_day are already covered and are dropped.
+        """
+        fresh = sorted(d for d in new_days if self.last_day is None or d > self.last_day)
+        late = len(new_days) - len(fresh)
+        if not fresh:
+            return 0, late
+
+        day_col = np.array(fresh, dtype="<i4")
+        price_col = np.array([new_days[d][0] / new_days[d][1] for d in fresh], dtype="<f4")
+        arrivals_col = np.array([new_days[d][2] for d in fresh], dtype="<f4")
+
+        # data first: state only ever describes values already on disk
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for (name, _), col in zip(COLUMN_FILES, (day_col, price_col, arrivals_col)):
+            with open(self.directory / name, "ab") as f:
+                f.write(col.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        for day in fresh:
+            price_sum, n, arrivals, district = new_days[day]
+            if district:
+                self.district = district
+            self.window.append([day, price_sum / n, arrivals])
+            del self.window[:-WINDOW]
+            self.observations += 1
+            self.last_day = day
+
+        if self.observations >= MIN_OBSERVATIONS:
+            ind = indicators(self.window)
+            self.latest = {**ind, "trend": classify_trend(ind), "as_of": day_to_iso(self.last_day)}
+        return len(fresh), late
+
+    def history(self):
+        """
+        Full series as numpy arrays (memory-mapped column files).
+        """
+        return {
+            "day": np.memmap(self.directory / "day.i32", dtype="<i4", mode="r"),
+            "price": np.memmap(self.directory / "price.f32", dtype="<f4", mode="r"),
+            "arrivals": np.memmap(self.directory / "arrivals.f32", dtype="<f4", mode="r"),
+        }
+
+    def zone(self):
+        return get_zone(self.district) or get_zone(self.market)
+
+    def state(self):
+        return {
+            "crop": self.crop,
+            "market": self.market,
+            "district": self.district,
+            "observations": self.observations,
+            "last_day": self.last_day,
+            "window": self.window,
+            "latest": self.latest,
+        }
+
+
+# ==================================================
+# STORE
+# ==================================================
+class MandiStore:
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self.partitions = {}
+        self.manifest = {}
+
+        state_path = self.store_dir / "state.json"
+        if state_path.exists():
+            state = json.loads(state_path.read_text())
+            self.manifest = state.get("manifest", {})
+            for p in state.get("partitions", []):
+                self.partitions[series_key(p["crop"], p["market"])] = Partition(
+                    p["crop"], p["market"], self.store_dir, p
+                )
+
+    def ingest(self, path):
+        days, names, rows, skipped = read_drop(path)
+        appended = late = 0
+        for key, new_days in days.items():
+            partition = self.partitions.get(key)
+            if partition is None:
+                partition = self.partitions[key] = Partition(*names[key], self.store_dir)
+            a, l = partition.append(new_days)
+            appended += a
+            late += l
+        self.manifest[Path(path).name] = file_version(path)
+        return {"rows": rows, "skipped": skipped, "days_appended": appended, "days_late": late}
+
+    def ingest_new(self, drops_dir=DROPS_DIR):
+        """
+        Ingests drops not seen before (or changed since), oldest name first.
+        """
+        reports = {}
+        for path in sorted(Path(drops_dir).glob("*.csv")):
+            if self.manifest.get(path.name) != file_version(path):
+                reports[path.name] = self.ingest(path)
+        return reports
+
+    def save(self):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        state = {
+            "manifest": self.manifest,
+            "partitions": [p.state() for p in self.partitions.values()],
+        }
+        tmp = self.store_dir / "state.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(state))
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(self.store_dir / "state.json")
+
+    def latest_trends(self):
+        """
+        One row per (crop, zone): the market with the most arrivals over the
+        window (then the longest history) represents the zone.
+        """
+        best = {}
+        for p in self.partitions.values():
+            zone = p.zone()
+            if p.latest is None or zone is None:
+                continue
+            volume = (sum(w[2] for w in p.window), p.observations)
+            key = (p.crop.lower(), zone)
+            if key not in best or volume > best[key][0]:
+                best[key] = (volume, p)
+
+        rows = []
+        for (_, zone), (_, p) in sorted(best.items()):
+            latest = p.latest
+            rows.append({
+                "crop": p.crop,
+                "zone": zone,
+                "market": p.market,
+                "trend": latest["trend"],
+                "as_of": latest["as_of"],
+                "sma_7": round(latest["sma_7"], 2),
+                "sma_28": round(latest["sma_28"], 2),
+                "slope_14": round(latest["slope_14"], 4),
+                "volatility_28": round(latest["volatility_28"], 4),
+                "observations": p.observations,
+            })
+        return rows
+
+
+def write_trends(rows, path=TRENDS_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".csv.tmp")
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=TREND_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    # atomic swap: the serving side never sees a half-written file
+    tmp.replace(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drops", default=str(DROPS_DIR))
+    parser.add_argument("--rebuild", action="store_true", help="wipe the store and re-ingest everything")
+    args = parser.parse_args()
+
+    if args.rebuild and STORE_DIR.exists():
+        shutil.rmtree(STORE_DIR)
+
+    start = time.perf_counter()
+    store = MandiStore()
+    reports = store.ingest_new(args.drops)
+    store.save()
+    trends = store.latest_trends()
+    write_trends(trends)
+    elapsed = time.perf_counter() - start
+
+    rows = sum(r["rows"] for r in reports.values())
+    for name, r in reports.items():
+        print(f"📥 {name}: {r['rows']} rows, {r['days_appended']} new days, "
+              f"{r['days_late']} late days dropped, {r['skipped']} rows skipped")
+    print(f"✅ {len(reports)} new drop(s), {rows} rows in {elapsed:.2f}s "
+          f"({rows / elapsed if elapsed else 0:.0f} rows/s); "
+          f"{len(store.partitions)} series, {len(trends)} (crop, zone) trends -> {TRENDS_PATH}")
@@ -1,7 +1,13 @@
+import os
+
 import pandas as pd
 
+from columnar import read_dataset, write_dataset
+
+DISTRICT_FEATURES_PATH = "data/processed/tn_ndvi_district_features.csv"
+
 print("Loading crop + soil data...")
-crop = pd.read_csv("data/processed/tn_crop_with_soil.csv")
+crop = read_dataset("data/processed/tn_crop_with_soil.csv")
 
 print("Loading NDVI features...")
 ndvi = pd.read_csv("data/processed/tn_ndvi_features.csv")
@@ -13,8 +19,21 @@ ndvi["Year"] = ndvi["Year"].astype(int)
 print("Merging crop + soil + NDVI...")
 merged = crop.merge(ndvi, on="Year", how="left")
 
+# District NDVI (src/zonal_ndvi.py) where a district-year has it; the
+# state-wide values stay for the rest
+district = pd.read_csv(DISTRICT_FEATURES_PATH) if os.path.exists(DISTRICT_FEATURES_PATH) else None
+if district is not None and len(district):
+    district["District"] = district["District"].astype(str).str.strip().str.upper()
+    district["Year"] = district["Year"].astype(int)
+
+    keys = merged[["District", "Year"]].assign(District=merged["District"].astype(str).str.strip().str.upper())
+    per_row = keys.merge(district, on=["District", "Year"], how="left")
+    for col in ndvi.columns.drop("Year"):
+        merged[col] = per_row[col].fillna(merged[col]).to_numpy()
+    print(f"District NDVI for {per_row['ndvi_mean'].notna().mean():.1%} of rows")
+
 # Save final ML dataset
-merged.to_csv("data/processed/tn_final_ml_dataset.csv", index=False)
+write_dataset(merged, "data/processed/tn_final_ml_dataset.csv")
 
 print("✅ Final ML dataset saved")
 print("Shape:", merged.shape)
@@ -2,7 +2,8 @@
 """
 src/merge_ndvi.py
 
-- Loads your India crop production dataset (adjust path if needed)
+- Loads the India crop production dataset from its state partitions
+  (src/state_partitions.py splits the national CSV once)
 - Loads processed NDVI aggregation (ndvi_state_year.csv or ndvi_year.csv)
 - Normalizes year and state names and merges NDVI -> produces india_prod_with_ndvi.csv
 """
@@ -11,18 +12,21 @@ from pathlib import Path
 import pandas as pd
 import re
 
+from state_partitions import NATIONAL_CSV, ensure_partitions, read_manifest, read_states
+
 ROOT = Path.cwd()
-PROD_PATH = ROOT / "data" / "raw" / "India Agriculture Crop Production.csv"
+PROD_PATH = NATIONAL_CSV
 NDVI_STATE_PATH = ROOT / "data" / "processed" / "ndvi_state_year.csv"
 NDVI_YEAR_PATH = ROOT / "data" / "processed" / "ndvi_year.csv"
 OUT_PATH = ROOT / "data" / "processed" / "india_prod_with_ndvi.csv"
 
-if not PROD_PATH.exists():
+if not PROD_PATH.exists() and read_manifest() is None:
     print("Cannot find India production CSV at", PROD_PATH)
     print("Please update PROD_PATH in this script to the correct file.")
     raise SystemExit(1)
 
-prod = pd.read_csv(PROD_PATH, low_memory=False)
+ensure_partitions(PROD_PATH)
+prod = read_states()
 print("Loaded production data:", prod.shape)
 print("Columns:", prod.columns.tolist())
 
@@ -1,6 +1,8 @@
 import pandas as pd
 from pathlib import Path
 
+from columnar import write_dataset
+
 ROOT = Path(__file__).resolve().parents[1]
 
 CROP_FILE = ROOT / "data" / "processed" / "india_prod_tn.csv"
@@ -30,7 +32,7 @@ print(f"Missing soil entries: {missing}")
 
 # Save output
 OUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-merged_df.to_csv(OUT_FILE, index=False)
+write_dataset(merged_df, OUT_FILE)
 
 print("✅ Saved merged dataset to:")
 print(OUT_FILE)
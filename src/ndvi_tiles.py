@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+src/ndvi_tiles.py
+
+NDVI computed from local red / NIR band tiles, reduced straight into
+district x month statistics.
+
+    python src/ndvi_tiles.py                                  # data/external/ndvi_tiles/
+    python src/ndvi_tiles.py scenes/2022/ --jobs 4 --block-pixels 2000000
+
+A tile is a pair of bands next to each other, optionally with a cloud /
+quality band and a sidecar JSON:
+
+    <tile>_red.npy  <tile>_nir.npy  [<tile>_qa.npy]  <tile>.json
+    <tile>_red.tif  <tile>_nir.tif  [<tile>_qa.tif]  [<tile>.json]
+
+.npy tiles take their georeferencing from the sidecar, GeoTIFFs from the
+file (north-up EPSG:4326, read with rasterio when it is installed):
+
+    {"date": "2022-03-14",                     # or "year" + "month"
+     "lon0": 78.1, "lat0": 11.9,               # top-left corner
+     "dlon": 0.0001, "dlat": -0.0001,          # pixel size, dlat < 0 north-up
+     "nodata": 0, "scale": 0.0001, "offset": 0,
+     "cloud_bits": 3072}                       # or "cloud_values": [3, 8, 9, 10]
+
+Without cloud_bits / cloud_values any non-zero qa value is cloud. A date
+in the tile name (2022-03-14, 20220314, 2022-03) stands in for a missing
+one in the sidecar.
+
+Each tile is read BLOCK_PIXELS at a time (.npy rows or rasterio
+windows): NDVI = (nir - red) / (nir + red) in float32, with no-data,
+cloud, non-positive and out-of-range pixels masked, then bincount /
+ufunc.at reductions per district (zonal_ndvi.reduce_groups). The district
+of every pixel comes from a district raster per tile geometry
+(zonal_ndvi.raster_districts), built once into data/processed/.zonal/ and
+read block by block alongside the bands, so peak memory is a few blocks
+per worker whatever the scene size, and no full-resolution NDVI is
+written. Tiles run in parallel (one process per tile); their stats merge
+exactly (running_stats.py).
+
+Output: data/processed/tn_ndvi_district_month_tiles.csv (same columns as
+src/zonal_ndvi.py's table; build_ndvi_features.py merges the two)
+    District, year, month, mean_ndvi, min_ndvi, max_ndvi, std_ndvi, observations
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+
+from artifacts import file_digest
+from district_polygons import GEOJSON_PATH, OUTSIDE, district_names, load_district_grid
+from running_stats import STAT_COLUMNS, RunningStats
+from zonal_ndvi import CELL_MAP_DIR, raster_districts, reduce_groups
+
+TILE_DIR = "data/external/ndvi_tiles"
+OUT_PATH = "data/processed/tn_ndvi_district_month_tiles.csv"
+
+# pixels per block; a block costs ~40 bytes per pixel of temporaries
+BLOCK_PIXELS = 1_000_000
+
+BANDS = ("red", "nir", "qa")
+RASTER_SUFFIXES = (".npy", ".tif", ".tiff")
+DATE_PATTERN = re.compile(r"((?:19|20)\d{2})-?(0[1-9]|1[0-2])(?:-?(?:0[1-9]|[12]\d|3[01]))?(?!\d)")
+
+
+def rasterio_available():
+    try:
+        import rasterio  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# ==================================================
+# TILES
+# ==================================================
+def find_tiles(paths):
+    """
+    One dict per tile (id, band paths, sidecar) under `paths` (folders or
+    *_red files), sorted by path.
+    """
+    reds = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            reds.extend(p for p in path.rglob("*_red.*") if p.suffix.lower() in RASTER_SUFFIXES)
+        elif path.name.rsplit(".", 1)[0].endswith("_red"):
+            reds.append(path)
+
+    tiles = []
+    for red in sorted(set(reds)):
+        tile_id = red.name[: -len("_red" + red.suffix)]
+        bands = {b: red.with_name(f"{tile_id}_{b}{red.suffix}") for b in BANDS}
+        sidecar = red.with_name(f"{tile_id}.json")
+        tiles.append({
+            "id": tile_id,
+            "path": str(red.parent / tile_id),
+            "bands": {b: str(p) for b, p in bands.items() if p.exists()},
+            "sidecar": str(sidecar) if sidecar.exists() else None,
+        })
+    return tiles
+
+
+def tile_period(tile, meta):
+    """
+    (year, month) of a tile from its sidecar, else from its name.
+    """
+    if "date" in meta:
+        match = DATE_PATTERN.search(str(meta["date"]))
+    elif "year" in meta and "month" in meta:
+        return int(meta["year"]), int(meta["month"])
+    else:
+        match = DATE_PATTERN.search(tile["id"])
+    if match is None:
+        raise ValueError("no date in the sidecar or the tile name")
+    return int(match.group(1)), int(match.group(2))
+
+
+class NpyRows:
+    """
+    Rows of a 2-D .npy read on demand: band[r0:r1] reads just those rows
+    (no memory map, so pages already reduced do not stay resident).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                self.shape, fortran, self.dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                self.shape, fortran, self.dtype = np.lib.format.read_array_header_2_0(f)
+            self.offset = f.tell()
+        if fortran or len(self.shape) != 2:
+            raise ValueError(f"{path}: expected a 2-D C-order array, got {self.shape}")
+
+    def __getitem__(self, rows):
+        r0, r1, _ = rows.indices(self.shape[0])
+        row_bytes = self.shape[1] * self.dtype.itemsize
+        with open(self.path, "rb") as f:
+            f.seek(self.offset + r0 * row_bytes)
+            block = np.fromfile(f, dtype=self.dtype, count=(r1 - r0) * self.shape[1])
+        return block.reshape(r1 - r0, self.shape[1])
+
+
+class WindowedBand:
+    """
+    Rows of a rasterio band read on demand: band[r0:r1] reads one window.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.shape = (dataset.height, dataset.width)
+
+    def __getitem__(self, rows):
+        from rasterio.windows import Window
+
+        r0, r1, _ = rows.indices(self.shape[0])
+        return self.dataset.read(1, window=Window(0, r0, self.shape[1], r1 - r0))
+
+
+def open_tile(tile, stack):
+    """
+    ({band: row-sliceable band}, geo) for a tile. Bands are read a block
+    of rows at a time (NpyRows / WindowedBand); nothing is read yet.
+    Datasets opened here are closed with `stack`.
+    """
+    meta = {}
+    if tile["sidecar"]:
+        with open(tile["sidecar"], encoding="utf-8") as f:
+            meta = json.load(f)
+    missing = {"red", "nir"} - set(tile["bands"])
+    if missing:
+        raise FileNotFoundError(f"no {'/'.join(sorted(missing))} band")
+
+    bands = {}
+    geo = {}
+    for band, path in tile["bands"].items():
+        if path.endswith(".npy"):
+            bands[band] = NpyRows(path)
+            continue
+        if not rasterio_available():
+            raise ImportError("GeoTIFF tiles need rasterio (pip install rasterio)")
+        import rasterio
+
+        dataset = stack.enter_context(rasterio.open(path))
+        bands[band] = WindowedBand(dataset)
+        if band == "red":
+            t = dataset.transform
+            if t.b != 0 or t.d != 0:
+                raise ValueError("rotated GeoTIFF; warp it north-up first")
+            if dataset.crs is not None and dataset.crs.to_epsg() != 4326:
+                raise ValueError(f"CRS {dataset.crs} is not EPSG:4326; reproject the tile first")
+            geo.update(lon0=t.c, lat0=t.f, dlon=t.a, dlat=t.e, nodata=dataset.nodata)
+
+    # sidecar values win over the file's own
+    geo.update({k: meta[k] for k in ("lon0", "lat0", "dlon", "dlat", "nodata") if k in meta})
+    geo.setdefault("nodata", None)
+    missing = {"lon0", "lat0", "dlon", "dlat"} - set(geo)
+    if missing:
+        raise ValueError(f"no {', '.join(sorted(missing))} (put them in {tile['id']}.json)")
+
+    shape = bands["red"].shape
+    for band, array in bands.items():
+        if array.shape != shape:
+            raise ValueError(f"{band} band is {array.shape}, red is {shape}")
+    geo.update(
+        shape=tuple(int(n) for n in shape),
+        period=tile_period(tile, meta),
+        scale=float(meta.get("scale", 1.0)),
+        offset=float(meta.get("offset", 0.0)),
+        cloud_bits=meta.get("cloud_bits"),
+        cloud_values=meta.get("cloud_values"),
+    )
+    return bands, geo
+
+
+# ==================================================
+# DISTRICT RASTERS (ONE PER TILE GEOMETRY)
+# ==================================================
+def geometry_key(geo, geojson_digest):
+    blob = json.dumps([geojson_digest, geo["lon0"], geo["lat0"], geo["dlon"], geo["dlat"], geo["shape"]])
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+def district_raster_path(geo, geojson_digest, cache_dir=CELL_MAP_DIR):
+    return Path(cache_dir) / f"tile_{geometry_key(geo, geojson_digest)}.npy"
+
+
+def build_district_raster(geo, geojson_path=GEOJSON_PATH, cache_dir=CELL_MAP_DIR):
+    """
+    District index per pixel of a tile geometry, written row by row into
+    an .npy memmap (no-op when it exists). Returns its path.
+    """
+    path = district_raster_path(geo, file_digest(geojson_path), cache_dir)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.int16, shape=geo["shape"])
+    raster_districts(load_district_grid(geojson_path), geo["lon0"], geo["lat0"],
+                     geo["dlon"], geo["dlat"], geo["shape"], out=out)
+    out.flush()
+    del out
+    os.replace(tmp, path)
+    return path
+
+
+# ==================================================
+# NDVI + REDUCTION (WORKER)
+# ==================================================
+def cloud_mask(qa, geo):
+    if geo["cloud_bits"] is not None:
+        return (qa.astype(np.int64) & int(geo["cloud_bits"])) != 0
+    if geo["cloud_values"] is not None:
+        return np.isin(qa, geo["cloud_values"])
+    return qa != 0
+
+
+def block_ndvi(red, nir, geo, qa=None):
+    """
+    (ndvi float32, valid mask, cloudy mask) of one block of raw band rows.
+    """
+    valid = np.ones(red.shape, dtype=bool)
+    if geo["nodata"] is not None:
+        valid &= (red != geo["nodata"]) & (nir != geo["nodata"])
+    cloudy = np.zeros(red.shape, dtype=bool)
+    if qa is not None:
+        cloudy = cloud_mask(qa, geo) & valid
+        valid &= ~cloudy
+
+    scale, offset = np.float32(geo["scale"]), np.float32(geo["offset"])
+    r = red.astype(np.float32) * scale + offset
+    n = nir.astype(np.float32) * scale + offset
+    total = n + r
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ndvi = (n - r) / total
+    # NaN fails both comparisons
+    valid &= (total > 0) & (ndvi >= -1) & (ndvi <= 1)
+    return ndvi, valid, cloudy
+
+
+def merge_reduced(a, b):
+    if a is None:
+        return b
+    out = {c: a[c] + b[c] for c in ("sum", "count", "sumsq")}
+    out["min"] = np.minimum(a["min"], b["min"])
+    out["max"] = np.maximum(a["max"], b["max"])
+    return out
+
+
+def tile_stats(tile, names, geojson_path=GEOJSON_PATH, block_pixels=BLOCK_PIXELS, cache_dir=CELL_MAP_DIR):
+    """
+    Worker: one tile into per-district stats for its month, BLOCK_PIXELS
+    at a time. Returns a small dict (stats, pixel counts, error).
+    """
+    import pandas as pd
+
+    start = time.perf_counter()
+    result = {"name": tile["id"], "stats": None, "pixels": 0, "valid": 0, "cloudy": 0, "error": None}
+    try:
+        with ExitStack() as stack:
+            bands, geo = open_tile(tile, stack)
+            districts = NpyRows(build_district_raster(geo, geojson_path, cache_dir))
+            rows, cols = geo["shape"]
+            block_rows = max(1, block_pixels // max(cols, 1))
+
+            reduced = None
+            for r0 in range(0, rows, block_rows):
+                r1 = min(rows, r0 + block_rows)
+                qa = bands["qa"][r0:r1] if "qa" in bands else None
+                ndvi, valid, cloudy = block_ndvi(np.asarray(bands["red"][r0:r1]),
+                                                 np.asarray(bands["nir"][r0:r1]), geo, qa)
+                d = districts[r0:r1]
+                valid &= d != OUTSIDE
+                v = ndvi[valid].astype(np.float64)
+                # plain pixels: each counts once
+                pixels = {"sum": v, "count": np.ones(len(v)), "sumsq": v * v, "min": v, "max": v}
+                part = reduce_groups(d[valid].astype(np.int64), pixels, len(names))
+                reduced = merge_reduced(reduced, part)
+                result["pixels"] += ndvi.size
+                result["valid"] += int(valid.sum())
+                result["cloudy"] += int(cloudy.sum())
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    stats = RunningStats(["District", "year", "month"])
+    seen = np.flatnonzero(reduced["count"] > 0) if reduced is not None else []
+    if len(seen):
+        year, month = geo["period"]
+        table = pd.DataFrame({c: reduced[c][seen] for c in STAT_COLUMNS})
+        table.index = pd.MultiIndex.from_arrays(
+            [[names[i].upper() for i in seen.tolist()], [year] * len(seen), [month] * len(seen)],
+            names=["District", "year", "month"],
+        )
+        stats.merge_table(table)
+    result.update(stats=stats, seconds=time.perf_counter() - start)
+    return result
+
+
+def tile_geometry(tile):
+    """
+    Worker: the tile's geometry (for building its district raster).
+    """
+    with ExitStack() as stack:
+        return open_tile(tile, stack)[1]
+
+
+# ==================================================
+# CLI
+# ==================================================
+def main():
+    parser = argparse.ArgumentParser(description="District x month NDVI from red/NIR band tiles")
+    parser.add_argument("inputs", nargs="*", default=[TILE_DIR], help="tile folders or *_red files")
+    parser.add_argument("--out", default=OUT_PATH)
+    parser.add_argument("--geojson", default=GEOJSON_PATH)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (1 = in-process)")
+    parser.add_argument("--block-pixels", type=int, default=BLOCK_PIXELS)
+    args = parser.parse_args()
+
+    tiles = find_tiles([p for p in args.inputs if Path(p).exists()])
+    if not tiles:
+        print("No *_red/*_nir tiles found in", args.inputs)
+        sys.exit(1)
+    print(f"Found {len(tiles)} tiles")
+
+    names = district_names(args.geojson)
+    start = time.perf_counter()
+    jobs = max(1, min(args.jobs, len(tiles)))
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        run = pool.map if pool else map
+
+        # district rasters first, one build per distinct geometry (tiles of
+        # the same footprint in other months share it)
+        digest = file_digest(args.geojson)
+        geometries = {}
+        for tile in tiles:
+            try:
+                geo = tile_geometry(tile)
+            except Exception:
+                continue  # reported by the tile pass
+            geometries.setdefault(geometry_key(geo, digest), geo)
+        built = list(run(build_district_raster, geometries.values(),
+                         [args.geojson] * len(geometries)))
+        # map keeps tile order, so merges are reproducible
+        results = list(run(tile_stats, tiles, [names] * len(tiles), [args.geojson] * len(tiles),
+                           [args.block_pixels] * len(tiles)))
+    finally:
+        if pool:
+            pool.shutdown()
+    seconds = time.perf_counter() - start
+
+    stats = RunningStats(["District", "year", "month"])
+    pixels = valid = cloudy = 0
+    for r in results:
+        if r["error"]:
+            print("Skipping", r["name"], "-", r["error"])
+            continue
+        pixels += r["pixels"]
+        valid += r["valid"]
+        cloudy += r["cloudy"]
+        stats.merge(r["stats"])
+
+    print(f"District rasters: {len(built)} tile geometries")
+    print(f"Reduced {pixels:,} pixels ({valid:,} valid, {cloudy:,} cloudy) in {seconds:.2f}s "
+          f"with {jobs} worker(s): {pixels / max(seconds, 1e-9):,.0f} pixels/sec")
+    if not len(stats):
+        print("No valid pixels inside any district.")
+        sys.exit(1)
+
+    result = stats.result(suffix="_ndvi")
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    result.to_csv(args.out, index=False)
+    print(f"✅ {len(result)} district-month rows "
+          f"({result['District'].nunique()} districts) saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
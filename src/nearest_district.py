@@ -0,0 +1,96 @@
+# nearest_district.py
+# Nearest-district search over data/processed/tn_district_centroids.csv.
+#
+# Centroids are stored as unit vectors on the sphere and indexed with a
+# scipy cKDTree: the straight-line (chord) distance between unit vectors
+# orders points exactly like great-circle distance, so a Euclidean KD-tree
+# answers geographic k-nearest queries and the chord converts back to km.
+import csv
+
+import numpy as np
+
+CENTROIDS_PATH = "data/processed/tn_district_centroids.csv"
+
+EARTH_RADIUS_KM = 6371.0088
+K_NEAREST = 3
+
+
+def unit_vectors(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    return np.stack([
+        np.cos(lat) * np.cos(lon),
+        np.cos(lat) * np.sin(lon),
+        np.sin(lat)
+    ], axis=-1)
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+def read_centroids(path=CENTROIDS_PATH):
+    """
+    {district_norm: (lat, lon)}; the first row wins for duplicate names.
+    """
+    centroids = {}
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                name = " ".join(row["District"].lower().split())
+                centroids.setdefault(name, (float(row["lat"]), float(row["lon"])))
+    except (OSError, KeyError, ValueError):
+        pass
+    return centroids
+
+
+class CentroidIndex:
+    """
+    KD-tree over the centroids of the districts in `searchable`; centroid()
+    also knows districts outside it (e.g. ones with no data of their own),
+    so they can be used as query points.
+    """
+
+    def __init__(self, centroids, searchable=None):
+        from scipy.spatial import cKDTree
+
+        self.centroids = dict(centroids)
+        self.names = [
+            name for name in self.centroids
+            if searchable is None or name in searchable
+        ]
+        points = np.array([self.centroids[n] for n in self.names], dtype=float).reshape(-1, 2)
+        self.tree = cKDTree(unit_vectors(points[:, 0], points[:, 1])) if self.names else None
+
+        # Spread of the searchable districts: distance from their mean
+        # centre to the farthest one
+        if self.names:
+            centre = unit_vectors(points[:, 0], points[:, 1]).mean(axis=0)
+            centre /= np.linalg.norm(centre)
+            chords = np.linalg.norm(unit_vectors(points[:, 0], points[:, 1]) - centre, axis=1)
+            self.spread_km = float(chord_to_km(chords).max())
+        else:
+            self.spread_km = 0.0
+
+    def __len__(self):
+        return len(self.names)
+
+    def centroid(self, district):
+        return self.centroids.get(district)
+
+    def query(self, points, k=K_NEAREST):
+        """
+        k nearest searchable districts for each (lat, lon).
+        Returns (distances_km, names), both shaped (N, k), nearest first.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        k = min(k, len(self.names))
+        chords, idx = self.tree.query(unit_vectors(points[:, 0], points[:, 1]), k=k)
+        chords = np.asarray(chords).reshape(len(points), k)
+        idx = np.asarray(idx).reshape(len(points), k)
+        names = np.array(self.names, dtype=object)[idx]
+        return chord_to_km(chords), names
+
+
+def load_centroid_index(searchable=None, path=CENTROIDS_PATH):
+    return CentroidIndex(read_centroids(path), searchable)
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+src/pipeline.py
+
+Declarative, incremental runner for the TN data-prep scripts.
+
+    python src/pipeline.py                  # bring every stage up to date
+    python src/pipeline.py ml_dataset       # only that stage and its upstream
+    python src/pipeline.py --dry-run        # show what would run and why
+    python src/pipeline.py --force ndvi_features
+    python src/pipeline.py --jobs 1         # no parallelism
+
+Each stage declares the scripts it runs (in order, from the repo root),
+the files it reads and the files it writes; the dependency graph follows
+from which stage writes which input. A stage is skipped when the content
+hashes of its scripts, extra code and inputs match its last successful
+run and its outputs are still the files it wrote. A stage that rebuilds
+byte-identical outputs therefore stops the rebuild from going further
+downstream. Stages whose upstream is done run in parallel.
+
+A stage whose inputs are missing but whose outputs exist (e.g. the Kaggle
+download on a fresh clone) keeps those outputs, so downstream stages can
+still run.
+
+State (hashes, last run) and per-stage logs live in data/processed/.pipeline/.
+Hashes are cached by file size + mtime, so unchanged files are not re-read.
+"""
+import argparse
+import concurrent.futures
+import csv
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from artifacts import file_digest, file_version
+
+ROOT = Path(__file__).resolve().parents[1]
+STATE_DIR = ROOT / "data" / "processed" / ".pipeline"
+STATE_PATH = STATE_DIR / "state.json"
+
+# Bumped when the fingerprint recipe changes, so every stage reruns once
+STATE_FORMAT = 1
+
+
+class Stage:
+
+    def __init__(self, name, scripts, inputs, outputs, deps=(), optional=()):
+        self.name = name
+        self.scripts = list(scripts)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        # code the scripts import, hashed like the scripts themselves
+        self.deps = list(deps)
+        # inputs the scripts use when they exist; hashed, but not required
+        self.optional = list(optional)
+
+    @property
+    def code(self):
+        return self.scripts + self.deps
+
+    @property
+    def sources(self):
+        return self.code + self.inputs + self.optional
+
+
+STAGES = [
+    Stage(
+        "india_prod_tn",
+        scripts=["src/prepare_tn_from_kaggle.py"],
+        inputs=["data/external/india_prod/India Agriculture Crop Production.csv"],
+        outputs=["data/processed/india_prod_tn.csv"],
+        deps=["src/state_partitions.py", "src/columnar.py", "src/artifacts.py"],
+    ),
+    Stage(
+        # fix_district_aliases rewrites the merge output in place
+        "crop_with_soil",
+        scripts=["src/merge_tn_crop_soil.py", "src/fix_district_aliases.py"],
+        inputs=["data/processed/india_prod_tn.csv", "data/external/tn_soil_types.csv"],
+        outputs=["data/processed/tn_crop_with_soil.csv"],
+        deps=["src/columnar.py", "src/artifacts.py"],
+    ),
+    Stage(
+        "ndvi_clean",
+        scripts=["src/clean_ndvi_state.py"],
+        inputs=["data/external/ndvi_monthly_Tamil_Nadu_2018_2023.csv"],
+        outputs=["data/processed/tn_ndvi_clean.csv"],
+    ),
+    Stage(
+        "ndvi_features",
+        scripts=["src/build_ndvi_features.py"],
+        inputs=["data/processed/tn_ndvi_clean.csv"],
+        outputs=["data/processed/tn_ndvi_features.csv", "data/processed/tn_ndvi_district_features.csv"],
+        # written by src/zonal_ndvi.py / src/ndvi_tiles.py when lat/lon NDVI
+        # or red/NIR tiles are available
+        optional=[
+            "data/processed/tn_ndvi_district_month.csv",
+            "data/processed/tn_ndvi_district_month_tiles.csv",
+        ],
+    ),
+    Stage(
+        "final_dataset",
+        scripts=["src/merge_crop_soil_ndvi.py"],
+        inputs=[
+            "data/processed/tn_crop_with_soil.csv",
+            "data/processed/tn_ndvi_features.csv",
+        ],
+        # untracked ndvi_features output; only district-year overrides
+        optional=["data/processed/tn_ndvi_district_features.csv"],
+        outputs=["data/processed/tn_final_ml_dataset.csv"],
+        deps=["src/columnar.py", "src/artifacts.py"],
+    ),
+    Stage(
+        "ml_dataset",
+        scripts=["src/filter_ndvi_years.py"],
+        inputs=["data/processed/tn_final_ml_dataset.csv"],
+        outputs=["data/processed/tn_ml_ndvi_only.csv"],
+        deps=["src/columnar.py", "src/artifacts.py"],
+    ),
+    Stage(
+        "train",
+        scripts=["src/train_catboost_top3.py"],
+        inputs=["data/processed/tn_ml_ndvi_only.csv"],
+        outputs=[
+            "models/catboost_tn_top3.joblib",
+            "models/feature_schema_catboost.joblib",
+            "models/catboost_tn_top3_explanations.joblib",
+        ],
+        deps=["src/explanation_bundle.py", "src/columnar.py", "src/artifacts.py"],
+    ),
+]
+
+
+# ==================================================
+# HASHING
+# ==================================================
+class HashCache:
+    """
+    Content hashes keyed by path, reused while the file's size + mtime
+    stamp is unchanged.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+
+    def digest(self, path):
+        stamp = file_version(ROOT / path)
+        if stamp is None:
+            return None
+        cached = self.entries.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        digest = file_digest(ROOT / path)
+        self.entries[path] = [stamp, digest]
+        return digest
+
+
+def fingerprint(stage, hashes):
+    """
+    Hash of everything a stage's outputs are a function of, or None when
+    an input or script is missing.
+    """
+    parts = {p: hashes.digest(p) for p in stage.code + stage.inputs}
+    if None in parts.values():
+        return None
+    parts.update({p: hashes.digest(p) for p in stage.optional})
+    blob = json.dumps([STATE_FORMAT, stage.scripts, parts], sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def count_rows(path):
+    """
+    Data rows of a CSV output (quoted newlines handled), None otherwise.
+    """
+    if not str(path).endswith(".csv"):
+        return None
+    with open(ROOT / path, newline="", encoding="utf-8", errors="replace") as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+
+# ==================================================
+# GRAPH
+# ==================================================
+def upstream_of(stages):
+    """
+    {stage name: names of the stages that write its inputs}
+    """
+    writers = {}
+    for stage in stages:
+        for out in stage.outputs:
+            writers[out] = stage.name
+    return {
+        stage.name: {
+            writers[i] for i in stage.inputs + stage.optional
+            if i in writers and writers[i] != stage.name
+        }
+        for stage in stages
+    }
+
+
+def select(stages, targets):
+    """
+    The target stages plus everything upstream of them, in declared order.
+    """
+    if not targets:
+        return list(stages)
+    by_name = {s.name: s for s in stages}
+    unknown = [t for t in targets if t not in by_name]
+    if unknown:
+        raise SystemExit(f"❌ Unknown stage(s): {', '.join(unknown)} (have: {', '.join(by_name)})")
+
+    upstream = upstream_of(stages)
+    wanted, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(upstream[name])
+    return [s for s in stages if s.name in wanted]
+
+
+# ==================================================
+# RUNNER
+# ==================================================
+def run_scripts(stage, log_path):
+    """
+    Runs the stage's scripts in order from the repo root (worker thread).
+    Returns (ok, seconds).
+    """
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        for script in stage.scripts:
+            log.write(f"$ python {script}\n")
+            log.flush()
+            proc = subprocess.run(
+                [sys.executable, script],
+                cwd=ROOT, stdout=log, stderr=subprocess.STDOUT,
+                env={**os.environ, "PYTHONUNBUFFERED": "1"}
+            )
+            if proc.returncode != 0:
+                log.write(f"\n[exit {proc.returncode}]\n")
+                return False, time.perf_counter() - start
+    return True, time.perf_counter() - start
+
+
+class Pipeline:
+
+    def __init__(self, stages, state_path=STATE_PATH, jobs=None, force=(), dry_run=False):
+        self.stages = list(stages)
+        self.state_path = Path(state_path)
+        self.jobs = jobs or min(4, os.cpu_count() or 1)
+        self.force = set(force)
+        self.dry_run = dry_run
+
+        state = self._read_state()
+        self.records = state.get("stages", {})
+        self.hashes = HashCache(state.get("hashes"))
+        self.report = {}
+
+    def _read_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state if state.get("format") == STATE_FORMAT else {}
+
+    def _write_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": STATE_FORMAT,
+                "stages": self.records,
+                "hashes": self.hashes.entries,
+                "last_run": self.report,
+            }, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def decide(self, stage):
+        """
+        ("run" | "skip" | "keep" | "fail", reason) for a stage whose
+        upstream is done.
+        """
+        missing = [p for p in stage.code + stage.inputs if not (ROOT / p).exists()]
+        if missing:
+            if all((ROOT / p).exists() for p in stage.outputs):
+                return "keep", f"missing {missing[0]}; keeping existing outputs"
+            return "fail", f"missing {missing[0]}"
+
+        if stage.name in self.force:
+            return "run", "forced"
+
+        record = self.records.get(stage.name)
+        if record is None:
+            return "run", "never built"
+        if record["fingerprint"] != fingerprint(stage, self.hashes):
+            changed = [
+                p for p in stage.sources
+                if record["sources"].get(p) != self.hashes.digest(p)
+            ]
+            return "run", f"changed: {', '.join(changed) or 'stage definition'}"
+        for p in stage.outputs:
+            if record["outputs"].get(p) != self.hashes.digest(p):
+                return "run", f"output modified or missing: {p}"
+        return "skip", "up to date"
+
+    def _finish(self, stage, ok, seconds):
+        entry = self.report[stage.name]
+        entry["seconds"] = round(seconds, 3)
+        if not ok:
+            entry.update(status="failed", reason=f"see {STATE_DIR.relative_to(ROOT) / (stage.name + '.log')}")
+            return False
+
+        missing = [p for p in stage.outputs if not (ROOT / p).exists()]
+        if missing:
+            entry.update(status="failed", reason=f"did not write {missing[0]}")
+            return False
+
+        self.records[stage.name] = {
+            "fingerprint": fingerprint(stage, self.hashes),
+            "sources": {p: self.hashes.digest(p) for p in stage.sources},
+            "outputs": {p: self.hashes.digest(p) for p in stage.outputs},
+        }
+        entry["status"] = "ran"
+        return True
+
+    def run(self):
+        upstream = upstream_of(self.stages)
+        names = {s.name for s in self.stages}
+        pending = list(self.stages)
+        done, failed = set(), set()
+        stale = set()  # dry run: stages that would rebuild
+        running = {}
+
+        STATE_DIR.mkdir(parents=True, exist_ok=True)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                for stage in list(pending):
+                    deps = upstream[stage.name] & names
+                    if deps & failed:
+                        pending.remove(stage)
+                        failed.add(stage.name)
+                        self.report[stage.name] = {"status": "blocked", "reason": f"upstream failed: {', '.join(sorted(deps & failed))}"}
+                        continue
+                    if not deps <= done:
+                        continue
+
+                    pending.remove(stage)
+                    action, reason = self.decide(stage)
+                    if self.dry_run and action == "skip" and deps & stale:
+                        action, reason = "run", f"upstream rebuilds: {', '.join(sorted(deps & stale))}"
+                    if action == "run":
+                        stale.add(stage.name)
+                    self.report[stage.name] = {"status": action, "reason": reason}
+                    if action == "fail":
+                        self.report[stage.name]["status"] = "failed"
+                        failed.add(stage.name)
+                    elif action == "run" and not self.dry_run:
+                        print(f"▶️  {stage.name}: {reason}", flush=True)
+                        log_path = STATE_DIR / f"{stage.name}.log"
+                        running[pool.submit(run_scripts, stage, log_path)] = stage
+                    else:
+                        # skipped, kept, or a dry run: downstream decides on current files
+                        done.add(stage.name)
+
+                if not running:
+                    if pending and not any(
+                        (upstream[s.name] & names) <= (done | failed) for s in pending
+                    ):
+                        raise SystemExit("❌ Stage graph has a cycle")
+                    continue
+
+                finished, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in finished:
+                    stage = running.pop(future)
+                    ok, seconds = future.result()
+                    if self._finish(stage, ok, seconds):
+                        done.add(stage.name)
+                    else:
+                        failed.add(stage.name)
+
+        for stage in self.stages:
+            entry = self.report[stage.name]
+            if entry["status"] in ("ran", "skip", "keep"):
+                entry["rows"] = {
+                    p: count_rows(p) for p in stage.outputs if (ROOT / p).exists()
+                }
+
+        if not self.dry_run:
+            self._write_state()
+        return not failed
+
+
+def print_report(report):
+    icons = {"ran": "✅", "skip": "⏭️ ", "keep": "📦", "run": "🔜", "failed": "❌", "blocked": "⛔"}
+    print()
+    for name, entry in report.items():
+        seconds = f"{entry['seconds']:.2f}s" if "seconds" in entry else "-"
+        rows = ", ".join(
+            f"{Path(p).name}={n}" for p, n in entry.get("rows", {}).items() if n is not None
+        )
+        print(f"{icons.get(entry['status'], '  ')} {name:<16} {entry['status']:<8} {seconds:>8}  {rows}")
+        if entry["status"] not in ("ran", "skip"):
+            print(f"   {entry['reason']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental TN data-prep pipeline")
+    parser.add_argument("targets", nargs="*", help="stages to bring up to date (default: all)")
+    parser.add_argument("--jobs", type=int, default=None, help="stages run in parallel")
+    parser.add_argument("--force", action="append", default=[], help="rerun this stage even if up to date")
+    parser.add_argument("--dry-run", action="store_true", help="report what would run")
+    parser.add_argument("--report", help="also write the run report as JSON here")
+    args = parser.parse_args()
+
+    stages = select(STAGES, args.targets)
+    for name in args.force:
+        select(STAGES, [name])  # validates the name
+
+    pipeline = Pipeline(stages, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    ok = pipeline.run()
+    print_report(pipeline.report)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(pipeline.report, f, indent=2)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,41 @@
-import joblib
-import pandas as pd
+import datetime
+import threading
+import time
+
 import numpy as np
-from catboost import Pool
 
-from soil_health import estimate_soil_health
 from agro_zones import get_zone
-from rules.fertilizer_engine import recommend_fertilizer
-from rules.market_engine import get_market_info
-from soil_behavior import infer_soil_behavior
-from location_resolver import resolve_location
+from rules.fertilizer_engine import fertilizer_version, recommend_fertilizer, recommend_fertilizer_batch
+from rules.market_engine import get_market_info, get_market_info_batch, market_version
+from soil_behavior import infer_soil_behavior, infer_soil_behavior_batch
+from location_resolver import resolve_coordinates_batch, resolve_locations
+from district_profiles import blend_profiles, load_district_profiles, lookup_profile
+from nearest_district import K_NEAREST, load_centroid_index
+from advisory_cache import AdvisoryCache, copy_advisory
+from artifacts import file_version
+from instrumentation import timed
+from xai_explain import SHAP_BUDGET_MS, ShapExplainer
+from explanation_bundle import EXPLANATIONS_PATH, ExplanationStore
 
 # ==================================================
-# LOAD MODELS & DATA (ONCE)
+# ARTIFACTS
 # ==================================================
+# Nothing heavy happens at import time: joblib, pandas and catboost are
+# imported and the artifacts are read by Predictor.load() (explicitly,
+# or lazily on the first prediction).
 MODEL_PATH = "models/catboost_tn_top3.joblib"
 SCHEMA_PATH = "models/feature_schema_catboost.joblib"
 DATA_PATH = "data/processed/tn_ml_ndvi_only.csv"
 
-model = joblib.load(MODEL_PATH)
-schema = joblib.load(SCHEMA_PATH)
-
-features = schema["features"]
-cat_features = schema["cat_features"]
-
-data = pd.read_csv(DATA_PATH)
-data["District_norm"] = data["District"].str.strip().str.lower()
+# GPS points used for a nearest-district search are rounded to this many
+# decimals (~1 km) so nearby requests share one advisory
+ANCHOR_DECIMALS = 2
 
 # ==================================================
 # HELPERS
 # ==================================================
 def infer_season():
-    m = pd.Timestamp.now().month
+    m = datetime.date.today().month
     if m in [6,7,8,9]:
         return "Kharif"
     elif m in [10,11,12,1]:
@@ -44,6 +49,14 @@ def confidence_band_relative(p1, p2):
         return "MEDIUM"
     return "LOW"
 
+ZONE_PRIORITY = {
+    "DELTA": ["paddy", "rice"],
+    "DRY": ["millet", "groundnut"],
+    "SOUTH": ["millet", "pulse"],
+    "NE": ["paddy", "groundnut"],
+    "WEST": ["cotton", "maize"]
+}
+
 def diversify_ranking(crops, probs, zone):
     """
     Keeps ML honest but avoids monoculture dominance
@@ -51,136 +64,109 @@ def diversify_ranking(crops, probs, zone):
     if probs[0] - probs[1] >= 0.15:
         return crops, probs
 
-    zone_priority = {
-        "DELTA": ["paddy", "rice"],
-        "DRY": ["millet", "groundnut"],
-        "SOUTH": ["millet", "pulse"],
-        "NE": ["paddy", "groundnut"],
-        "WEST": ["cotton", "maize"]
-    }.get(zone, [])
+    zone_priority = ZONE_PRIORITY.get(zone, [])
 
     ranked = list(zip(crops, probs))
     ranked.sort(key=lambda x: (x[0].lower() not in zone_priority, -x[1]))
 
     return [c for c,_ in ranked], [p for _,p in ranked]
 
+def input_coordinates(farmer_input):
+    """
+    (lat, lon) when the request carries GPS coordinates, else None.
+    """
+    lat, lon = farmer_input.get("lat"), farmer_input.get("lon")
+    if lat is None or lon is None:
+        return None
+    return float(lat), float(lon)
+
 # ==================================================
-# MAIN PREDICTION FUNCTION
+# ARRAY VERSIONS (BATCH PATH)
 # ==================================================
-def predict_crop(farmer_input: dict):
-
-    # --------------------------
-    # INPUT NORMALIZATION
-    # --------------------------
-    input_place = farmer_input["District"]
-    district, location_mode = resolve_location(input_place)
-
-    season = infer_season()
-
-    district_rows = data[data["District_norm"] == district]
-    fallback_level = "DISTRICT"
-
-    if district_rows.empty:
-        fallback_level = "NEAREST_DISTRICT"
-        district_rows = data.copy()
-
-    # --------------------------
-    # NDVI SELECTION
-    # --------------------------
-    ndvi_col = (
-        "ndvi_kharif_mean" if season == "Kharif"
-        else "ndvi_rabi_mean" if season == "Rabi"
-        else "ndvi_mean"
-    )
-    ndvi_value = float(district_rows[ndvi_col].mean())
-
-    # --------------------------
-    # FEATURE VECTOR
-    # --------------------------
-    row = {}
-    for f in features:
-        if f in cat_features:
-            row[f] = (
-                district_rows[f].mode().iloc[0]
-                if f in district_rows.columns and not district_rows[f].dropna().empty
-                else ""
-            )
-        else:
-            row[f] = (
-                float(district_rows[f].mean())
-                if f in district_rows.columns and not district_rows[f].dropna().empty
-                else 0.0
-            )
+ZONES = sorted(ZONE_PRIORITY)
+ZONE_INDEX = {z: i for i, z in enumerate(ZONES)}
 
-    row["District"] = farmer_input["District"]
-    row["Season"] = season
-    row[ndvi_col] = ndvi_value
-
-    X = pd.DataFrame([row])
-    pool = Pool(X, cat_features=cat_features)
-
-    # --------------------------
-    # ML INFERENCE
-    # --------------------------
-    probs = model.predict_proba(pool)[0]
-    classes = model.classes_
-
-    idx = np.argsort(probs)[::-1][:3]
-    top3_crops = classes[idx].tolist()
-    top3_probs = probs[idx].tolist()
-
-    # --------------------------
-    # AGRO-CLIMATIC INTELLIGENCE
-    # --------------------------
-    zone = get_zone(district)
-    top3_crops, top3_probs = diversify_ranking(top3_crops, top3_probs, zone)
-
-    # --------------------------
-    # CONFIDENCE & SAFE MODE
-    # --------------------------
-    top1_conf = confidence_band_relative(top3_probs[0], top3_probs[1])
-    safe_mode = bool(top1_conf == "LOW" or ndvi_value < 0.28)
-
-    # --------------------------
-    # SOIL INTELLIGENCE (NO SOIL TYPE ASSUMED)
-    # --------------------------
-    soil_health = estimate_soil_health(district_rows)
-    soil_behavior = infer_soil_behavior(
-        soil_health=soil_health,
-        ndvi=ndvi_value,
-        zone=zone
-    )
+def build_priority_matrix(classes):
+    """
+    priority_matrix[zone, class] -> crop is preferred in that zone.
+    The extra last row is for districts without a known zone.
+    """
+    classes_lower = [str(c).lower() for c in classes]
+    priority_matrix = np.zeros((len(ZONES) + 1, len(classes)), dtype=bool)
+    for z, preferred in ZONE_PRIORITY.items():
+        priority_matrix[ZONE_INDEX[z]] = [c in preferred for c in classes_lower]
+    return priority_matrix
 
-    # --------------------------
-    # FERTILIZER (RULE-BASED, SAFE)
-    # --------------------------
-    fertilizer = recommend_fertilizer(
-        crop=top3_crops[0],
-        soil_behavior=soil_behavior
+def diversify_ranking_batch(order, top_probs, zone_idx, priority_matrix):
+    """
+    Array version of diversify_ranking over (N, 3) top-k class indices.
+    A stable sort on "not preferred" gives the same order as the scalar
+    sort key, since the top-k probabilities are already descending.
+    """
+    keep = (top_probs[:, 0] - top_probs[:, 1]) >= 0.15
+    preferred = priority_matrix[zone_idx[:, None], order]
+    rerank = np.argsort(~preferred, axis=1, kind="stable")
+    rerank[keep] = np.arange(order.shape[1])
+    return (
+        np.take_along_axis(order, rerank, axis=1),
+        np.take_along_axis(top_probs, rerank, axis=1)
     )
 
-    # --------------------------
-    # MARKET AWARENESS (ZONE-SPECIFIC)
-    # --------------------------
-    market = get_market_info(
-        crop=top3_crops[0],
-        zone=zone
+def confidence_band_relative_batch(p1, p2):
+    margin = p1 - p2
+    return np.select(
+        [margin >= 0.25, margin >= 0.12],
+        ["HIGH", "MEDIUM"],
+        default="LOW"
     )
 
-    # --------------------------
-    # TRUST LOGIC
-    # --------------------------
+# ==================================================
+# ADVISORY STAGE (AFTER THE MODEL)
+# ==================================================
+SOIL_HEALTH_KEYS = ["nitrogen", "phosphorus", "potassium", "overall"]
+
+DECISION_REASONING = {
+    "ml_role": "Primary crop suitability ranking",
+    "zone_role": "Risk-aware adjustment using {zone} agro-climatic zone",
+    "soil_role": "Soil behavior inferred from nutrients and vegetation",
+    "fertilizer_role": "Conservative agronomy rules (not ML)",
+    "market_role": "Awareness only, no price prediction",
+    "fallback_role": "{fallback_level} data used to avoid false precision"
+}
+
+def trust_level(fallback_level, radius_km):
     if fallback_level == "DISTRICT":
-        trust, radius = "MEDIUM", 30
-    else:
-        trust, radius = "LOW", 60
+        return "MEDIUM", 30
+    # farthest district blended in, or the state's spread
+    return "LOW", round(radius_km)
+
+def decision_reasoning(zone, fallback_level):
+    return {
+        role: text.format(zone=zone, fallback_level=fallback_level)
+        for role, text in DECISION_REASONING.items()
+    }
 
-    # --------------------------
-    # FINAL OUTPUT (SYSTEM CONTRACT)
-    # --------------------------
+def round_batch(x, ndigits):
+    """
+    round(x, ndigits) over an array. np.round agrees with the scalar round
+    except within float error of a .5 tie; those few use the scalar one.
+    """
+    x = np.asarray(x, dtype=float)
+    scaled = x * 10.0 ** ndigits
+    out = np.round(scaled) / 10.0 ** ndigits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie).tolist():
+        out.flat[i] = round(float(x.flat[i]), ndigits)
+    return out
+
+def advisory_dict(top3_crops, top3_probs, top1_conf, safe_mode, soil_health, soil_behavior,
+                  fertilizer, market, fallback_level, season, ndvi_value, zone, trust, radius, reasoning):
+    """
+    The advisory contract. Probabilities and NDVI arrive rounded.
+    """
     return {
         "top3_crops": top3_crops,
-        "top3_probs": [round(p, 3) for p in top3_probs],
+        "top3_probs": top3_probs,
         "top1_confidence": top1_conf,
         "safe_mode": safe_mode,
 
@@ -192,7 +178,7 @@ def predict_crop(farmer_input: dict):
 
         "fallback_level": fallback_level,
         "season": season,
-        "ndvi_value": round(ndvi_value, 3),
+        "ndvi_value": ndvi_value,
         "agro_climatic_zone": zone,
 
         "data_trust_level": {
@@ -201,17 +187,482 @@ def predict_crop(farmer_input: dict):
             "radius_km": radius
         },
 
-        "decision_reasoning": {
-            "ml_role": "Primary crop suitability ranking",
-            "zone_role": f"Risk-aware adjustment using {zone} agro-climatic zone",
-            "soil_role": "Soil behavior inferred from nutrients and vegetation",
-            "fertilizer_role": "Conservative agronomy rules (not ML)",
-            "market_role": "Awareness only, no price prediction",
-            "fallback_role": f"{fallback_level} data used to avoid false precision"
-        },
-        "location_resolution": {
-            "input": input_place,
-            "resolved_district": district,
-            "method": location_mode
-        }
+        "decision_reasoning": reasoning
     }
+
+def advise(top3_crops, top3_probs, top1_conf, safe_mode, soil_health, ndvi_value, zone,
+           fallback_level, radius_km, season):
+    """
+    Scalar post-model chain for one farmer: soil behavior, fertilizer,
+    market and trust on top of the ranked crops. Reference for advise_batch.
+    """
+    soil_behavior = infer_soil_behavior(soil_health=soil_health, ndvi=ndvi_value, zone=zone)
+    fertilizer = recommend_fertilizer(crop=top3_crops[0], soil_behavior=soil_behavior)
+    market = get_market_info(top3_crops[0], zone)
+    trust, radius = trust_level(fallback_level, radius_km)
+
+    return advisory_dict(
+        list(top3_crops), [round(p, 3) for p in top3_probs], top1_conf, safe_mode,
+        dict(soil_health), soil_behavior, fertilizer, market, fallback_level, season,
+        round(ndvi_value, 3), zone, trust, radius, decision_reasoning(zone, fallback_level)
+    )
+
+def advise_batch(top3_crops, top3_probs, top1_conf, safe_mode, soil_health, ndvi_value, zone,
+                 fallback_level, radius_km, season):
+    """
+    advise() over columns for N farmers; returns N advisories equal to
+    calling advise() per row. soil_health is {band name: (N,) column}.
+    Soil behavior and trust are masked rule selections over the arrays;
+    fertilizer, market and reasoning text are built once per distinct pair.
+    """
+    top3_crops = np.asarray(top3_crops, dtype=object)
+    top_crop = top3_crops[:, 0].tolist()
+    zone = list(zone)
+    fallback_level = np.asarray(fallback_level, dtype=object)
+
+    with timed("infer_soil_behavior"):
+        soil_behavior = infer_soil_behavior_batch(soil_health["nitrogen"], ndvi_value, zone).tolist()
+
+    with timed("recommend_fertilizer"):
+        pairs = list(dict.fromkeys(zip(top_crop, soil_behavior)))
+        fertilizers = dict(zip(pairs, recommend_fertilizer_batch(pairs)))
+
+    with timed("get_market_info"):
+        pairs = list(dict.fromkeys(zip(top_crop, zone)))
+        markets = dict(zip(pairs, get_market_info_batch(pairs)))
+
+    with timed("assemble"):
+        district_level = fallback_level == "DISTRICT"
+        trust = np.where(district_level, "MEDIUM", "LOW").tolist()
+        radius = np.where(
+            district_level, 30, round_batch(radius_km, 0)
+        ).astype(int).tolist()
+
+        fallback_level = fallback_level.tolist()
+        reasoning = {
+            pair: decision_reasoning(*pair)
+            for pair in dict.fromkeys(zip(zone, fallback_level))
+        }
+        soil_rows = [
+            dict(zip(SOIL_HEALTH_KEYS, bands))
+            for bands in zip(*(soil_health[k] for k in SOIL_HEALTH_KEYS))
+        ]
+        top3_crops = top3_crops.tolist()
+        top3_probs = round_batch(top3_probs, 3).tolist()
+        ndvi_value = round_batch(ndvi_value, 3).tolist()
+        top1_conf = list(top1_conf)
+        safe_mode = np.asarray(safe_mode, dtype=bool).tolist()
+
+        return [
+            advisory_dict(
+                top3_crops[i], top3_probs[i], top1_conf[i], safe_mode[i], soil_rows[i],
+                soil_behavior[i], dict(fertilizers[(top_crop[i], soil_behavior[i])]),
+                dict(markets[(top_crop[i], zone[i])]), fallback_level[i], season,
+                ndvi_value[i], zone[i], trust[i], radius[i],
+                dict(reasoning[(zone[i], fallback_level[i])])
+            )
+            for i in range(len(top_crop))
+        ]
+
+def location_resolution(key, resolved):
+    """
+    How one request's location was read; not part of the cached advisory,
+    since a place name and a GPS point can share everything else.
+    """
+    district, method = resolved
+    return {"input": key[0], "resolved_district": district, "method": method}
+
+# ==================================================
+# PREDICTOR
+# ==================================================
+class Predictor:
+    """
+    Owns the model, feature schema and district profiles.
+    Call load() at startup to pay the cost up front; otherwise the first
+    prediction loads everything.
+
+    With a cache (advisory_cache.AdvisoryCache), full advisories are reused
+    per (district, season, place, GPS point, artifact versions). The raw
+    place string is part of the key because it is fed to the model as the
+    District feature; the (rounded) point only when it picked the nearest
+    districts. location_resolution is attached per request after the
+    lookup, so a name and a GPS request for the same place share an entry
+    but each reports its own method. Artifact files are re-checked every
+    VERSION_CHECK_SECONDS and the predictor reloads itself when one changes,
+    so stale entries stop matching without an explicit flush.
+
+    top_factors in each advisory are the top crop's local SHAP contributions
+    (xai_explain.ShapExplainer), cached per location and model version and
+    limited to shap_budget_ms of work per batch. Over budget, the
+    training-time district/season summary is used when its bundle matches
+    the model, else None (top_factors_scope says which); such advisories
+    are cached for PROVISIONAL_TTL_SECONDS only, and the entry is replaced
+    by the SHAP-explained one once that key is rescored within budget.
+    """
+
+    VERSION_CHECK_SECONDS = 5.0
+    PROVISIONAL_TTL_SECONDS = 30.0
+
+    def __init__(self, model_path=MODEL_PATH, schema_path=SCHEMA_PATH, data_path=DATA_PATH, cache=None,
+                 explanations_path=EXPLANATIONS_PATH):
+        self.model_path = model_path
+        self.schema_path = schema_path
+        self.data_path = data_path
+        self.explanations_path = explanations_path
+        self.cache = cache
+        # CatBoost threads per predict_proba call (-1 = all cores)
+        self.thread_count = -1
+        # SHAP work allowed per batch (None = unbounded, 0 = cached only)
+        self.shap_budget_ms = SHAP_BUDGET_MS
+
+        self.model = None
+        self.features = None
+        self.cat_features = None
+        self.profiles = None
+        self.classes = None
+        self.priority_matrix = None
+        self.explainer = None
+        self.versions = None
+        self.load_seconds = None
+
+        self._lock = threading.Lock()
+        self._versions_checked_at = 0.0
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def artifact_versions(self):
+        return (
+            file_version(self.model_path),
+            file_version(self.schema_path),
+            file_version(self.data_path)
+        )
+
+    def load(self):
+        with self._lock:
+            if not self.loaded:
+                self._load()
+            return self
+
+    def reload(self):
+        with self._lock:
+            self._load()
+            return self
+
+    def _load(self):
+        start = time.perf_counter()
+
+        import joblib
+
+        versions = self.artifact_versions()
+        model = joblib.load(self.model_path)
+        schema = joblib.load(self.schema_path)
+
+        features = schema["features"]
+        cat_features = schema["cat_features"]
+
+        # {(district_norm, season): profile} -> O(1) feature building per request
+        profiles = load_district_profiles(features, cat_features, self.data_path)
+        districts = {d for d, _ in profiles if d is not None}
+
+        self.features = features
+        self.cat_features = cat_features
+        self.profiles = profiles
+        self.districts = districts
+        # KD-tree over the centroids of districts that have a profile
+        self.nearest = load_centroid_index(districts)
+        self.classes = model.classes_
+        self.priority_matrix = build_priority_matrix(self.classes)
+        # per-prediction explanations, cached per location + model version
+        # with the training-time bundle as the over-budget fallback
+        self.explainer = ShapExplainer(
+            model, features, cat_features, budget_ms=self.shap_budget_ms,
+            summary=ExplanationStore(self.explanations_path, self.model_path, features)
+        )
+        self.versions = versions
+        self.model = model
+
+        self._versions_checked_at = time.monotonic()
+        self.load_seconds = time.perf_counter() - start
+
+    def check_artifacts(self):
+        """
+        Reloads when a model/schema/data file changed on disk.
+        Rate-limited to one stat() round per VERSION_CHECK_SECONDS.
+        """
+        now = time.monotonic()
+        if now - self._versions_checked_at < self.VERSION_CHECK_SECONDS:
+            return False
+        self._versions_checked_at = now
+
+        versions = self.artifact_versions()
+        if versions == self.versions or None in versions:
+            return False
+
+        self.reload()
+        return True
+
+    def predict_crop(self, farmer_input: dict):
+        return self.predict_crops_batch([farmer_input])[0]
+
+    def predict_crops_batch(self, farmer_inputs):
+        """
+        Scores many farmers with one CatBoost call.
+        Output matches calling predict_crop once per input, except for
+        top_factors: SHAP work is budgeted per batch (shap_budget_ms), so
+        rows past the budget get the training summary or None
+        (top_factors_scope) where a single call would get its own SHAP.
+        Each input has a "District" place name, "lat"/"lon" GPS
+        coordinates, or both.
+        """
+        if not farmer_inputs:
+            return []
+
+        with timed("total"):
+            return self._predict_crops_batch(farmer_inputs)
+
+    def _predict_crops_batch(self, farmer_inputs):
+
+        if not self.loaded:
+            self.load()
+        elif self.cache is not None:
+            self.check_artifacts()
+
+        season = infer_season()
+
+        # --------------------------
+        # INPUT NORMALIZATION
+        # --------------------------
+        # The advisory depends only on (place, district, point, season,
+        # artifacts), so each unique location key is scored once and the
+        # result is shared. With lat/lon the district polygon decides the
+        # district; the place name (or that district when no name is sent)
+        # is still what the model sees as the District feature.
+        with timed("resolve_location"):
+            keys = self._location_keys(farmer_inputs)
+            unique = list(dict.fromkeys(keys))
+            names = [place for place, gps_district, _ in unique if gps_district is None and place]
+            by_name = dict(zip(names, resolve_locations(names)))
+            resolved = {}
+            for key in unique:
+                place, gps_district, _ = key
+                if gps_district is not None:
+                    resolved[key] = (gps_district, "COORDINATE_MATCH")
+                elif place:
+                    resolved[key] = by_name[place]
+                elif key[2] is not None:
+                    resolved[key] = ("", "OUTSIDE_COVERAGE")
+                else:
+                    resolved[key] = ("", "NO_LOCATION")
+
+        # --------------------------
+        # RESPONSE CACHE
+        # --------------------------
+        by_key = {}
+        if self.cache is not None:
+            with timed("cache_lookup"):
+                cache_keys = {
+                    key: (district, season, key[0], key[2]) + self.versions + (market_version(), fertilizer_version())
+                    for key, (district, _) in resolved.items()
+                }
+                for key, cache_key in cache_keys.items():
+                    advisory = self.cache.get(cache_key)
+                    if advisory is not None:
+                        by_key[key] = advisory
+
+        misses = [key for key in resolved if key not in by_key]
+        if misses:
+            scored = self._score_places(misses, resolved, season)
+            for key, advisory in zip(misses, scored):
+                by_key[key] = advisory
+                # advisories without their own explanation expire soon, so
+                # the key is rescored (and upgraded) when SHAP fits the budget
+                if self.cache is not None:
+                    provisional = advisory["top_factors_scope"] != "PREDICTION"
+                    self.cache.put(cache_keys[key], advisory,
+                                   self.PROVISIONAL_TTL_SECONDS if provisional else None)
+
+        # cached advisories are location-independent: how this request's
+        # location was resolved (name vs GPS) is attached per key
+        out = []
+        for key in keys:
+            advisory = copy_advisory(by_key[key])
+            advisory["location_resolution"] = location_resolution(key, resolved[key])
+            out.append(advisory)
+        return out
+
+    def has_location(self, district):
+        return district in self.districts or self.nearest.centroid(district) is not None
+
+    def _location_keys(self, farmer_inputs):
+        """
+        (place, district from lat/lon or None, point or None) per input.
+        The GPS point is kept only when the nearest-district search needs
+        it: outside every polygon, or in a district with neither data nor
+        a centroid.
+        """
+        coords = [input_coordinates(farmer_input) for farmer_input in farmer_inputs]
+        with_coords = [i for i, c in enumerate(coords) if c is not None]
+        gps = dict(zip(
+            with_coords,
+            resolve_coordinates_batch([coords[i] for i in with_coords])
+        ))
+
+        keys = []
+        for i, farmer_input in enumerate(farmer_inputs):
+            if i in gps:
+                district = gps[i][0]
+                point = None
+                if not self.has_location(district):
+                    point = tuple(round(v, ANCHOR_DECIMALS) for v in coords[i])
+                keys.append((farmer_input.get("District") or district or "", district, point))
+            else:
+                keys.append((farmer_input["District"], None, None))
+        return keys
+
+    def _profiles_for(self, keys, resolved, season):
+        """
+        Profile per location key. A district with data uses its own profile.
+        Otherwise the K_NEAREST districts around the GPS point (or the
+        district's centroid) are blended, with one KD-tree query per batch.
+        With no location at all the state-wide profile is used.
+        """
+        profiles = [None] * len(keys)
+        anchors = {}
+        for i, key in enumerate(keys):
+            district = resolved[key][0]
+            if district in self.districts:
+                profiles[i] = self.profiles[(district, season)]
+                continue
+            anchor = key[2] or self.nearest.centroid(district)
+            if anchor is None or not len(self.nearest):
+                profiles[i] = lookup_profile(self.profiles, None, season)
+            else:
+                anchors.setdefault(anchor, []).append(i)
+
+        if anchors:
+            points = list(anchors)
+            distances, names = self.nearest.query(points, K_NEAREST)
+            for point, dist_km, near in zip(points, distances.tolist(), names.tolist()):
+                blended = blend_profiles(
+                    [self.profiles[(d, season)] for d in near], near, dist_km
+                )
+                for i in anchors[point]:
+                    profiles[i] = blended
+        return profiles
+
+    def _score_places(self, keys, resolved, season):
+        """
+        Full advisory for each (unique) location key, with one predict_proba call.
+        """
+        import pandas as pd
+        from catboost import Pool
+
+        # district rows, NDVI and soil health are precomputed per profile
+        with timed("district_profile"):
+            key_profiles = self._profiles_for(keys, resolved, season)
+
+        # --------------------------
+        # FEATURE MATRIX
+        # --------------------------
+        with timed("build_pool"):
+            rows = []
+            for key, profile in zip(keys, key_profiles):
+                row = dict(profile["row"])
+                row["District"] = key[0]
+                rows.append(row)
+
+            X = pd.DataFrame(rows, columns=self.features)
+            pool = Pool(X, cat_features=self.cat_features)
+
+        # --------------------------
+        # ML INFERENCE
+        # --------------------------
+        with timed("predict_proba"):
+            probs = self.model.predict_proba(pool, thread_count=self.thread_count)
+
+        # --------------------------
+        # AGRO-CLIMATIC INTELLIGENCE
+        # --------------------------
+        with timed("get_zone"):
+            districts = [resolved[key][0] for key in keys]
+            zones = [get_zone(d) for d in districts]
+            zone_idx = np.array([ZONE_INDEX.get(z, len(ZONES)) for z in zones])
+
+        # --------------------------
+        # RANKING, CONFIDENCE & SAFE MODE (one sample per batch)
+        # --------------------------
+        with timed("rank"):
+            order = np.argsort(probs, axis=1)[:, ::-1][:, :3]
+            top3_probs = np.take_along_axis(probs, order, axis=1)
+            order, top3_probs = diversify_ranking_batch(
+                order, top3_probs, zone_idx, self.priority_matrix
+            )
+            top3_crops = self.classes[order]
+
+            ndvi_values = np.array([profile["ndvi_value"] for profile in key_profiles])
+            top1_conf = confidence_band_relative_batch(top3_probs[:, 0], top3_probs[:, 1])
+            safe_mode = (top1_conf == "LOW") | (ndvi_values < 0.28)
+
+        # --------------------------
+        # ADVISORY (ARRAY RULES OVER THE BATCH)
+        # --------------------------
+        spread_km = self.nearest.spread_km
+        advisories = advise_batch(
+            top3_crops, top3_probs, top1_conf, safe_mode,
+            {k: [profile["soil_health"][k] for profile in key_profiles] for k in SOIL_HEALTH_KEYS},
+            ndvi_values, zones,
+            [profile["fallback_level"] for profile in key_profiles],
+            [profile.get("radius_km", spread_km) for profile in key_profiles],
+            season
+        )
+
+        # --------------------------
+        # LOCAL EXPLANATIONS (SHAP, CACHED, LATENCY-BUDGETED)
+        # --------------------------
+        with timed("explain"):
+            factors, scopes = self.explainer.explain(
+                [(resolved[key][0], season, key[0], key[2]) + self.versions for key in keys],
+                X, order[:, 0].tolist(), self.thread_count,
+                [(resolved[key][0], season, a["top3_crops"][0]) for key, a in zip(keys, advisories)]
+            )
+
+        # --------------------------
+        # FINAL OUTPUT (SYSTEM CONTRACT)
+        # --------------------------
+        for key, advisory, top_factors, scope in zip(keys, advisories, factors, scopes):
+            advisory["top_factors"] = (
+                None if top_factors is None else [dict(f) for f in top_factors]
+            )
+            advisory["top_factors_scope"] = scope
+            advisory["location_resolution"] = location_resolution(key, resolved[key])
+
+        return advisories
+
+# ==================================================
+# MODULE-LEVEL API (DEFAULT PREDICTOR)
+# ==================================================
+_default_predictor = None
+_default_lock = threading.Lock()
+
+def get_predictor():
+    global _default_predictor
+    with _default_lock:
+        if _default_predictor is None:
+            _default_predictor = Predictor(cache=AdvisoryCache())
+    return _default_predictor
+
+def predict_crop(farmer_input: dict):
+    return get_predictor().predict_crop(farmer_input)
+
+def predict_crops_batch(farmer_inputs):
+    return get_predictor().predict_crops_batch(farmer_inputs)
+
+def cache_stats():
+    cache = get_predictor().cache
+    return cache.stats() if cache is not None else None
+
+def explanation_stats():
+    explainer = get_predictor().explainer
+    return explainer.stats() if explainer is not None else None
@@ -1,6 +1,7 @@
-import pandas as pd
 from pathlib import Path
 
+from state_partitions import ensure_partitions, read_state
+
 # ROOT = zenith_project folder
 ROOT = Path(__file__).resolve().parents[1]
 
@@ -12,14 +13,13 @@ OUT = ROOT / "data" / "processed" / "india_prod_tn.csv"
 
 print("Loading:", KAG)
 
-df = pd.read_csv(KAG, low_memory=False)
-print("Total rows loaded:", df.shape)
-
-# Normalize State column
-df["State_clean"] = df["State"].astype(str).str.strip().str.lower()
+# One streaming pass splits the national file by state (State_clean =
+# stripped, lower-case State); later runs reuse the partitions
+manifest = ensure_partitions(KAG)
+print("Total rows in national file:", manifest["source_rows"])
 
-# Filter only Tamil Nadu
-tn = df[df["State_clean"] == "tamil nadu"]
+# Only Tamil Nadu
+tn = read_state("tamil nadu", manifest=manifest)
 
 print("Tamil Nadu rows:", tn.shape)
 
@@ -1,35 +1,141 @@
+import csv
+import threading
+
+from artifacts import FileWatch
+
+FERTILIZER_RULES_PATH = "data/fertilizer_rules.csv"
+
+# Matches any crop / soil behavior in the rules file
+WILDCARD = "*"
+
+# Used only if the rules file is missing or has no catch-all row
+DEFAULT_RULE = {
+    "status": "OK",
+    "fertilizer": "Urea",
+    "rate_kg_acre": 25,
+    "logic": "Maintenance dose only"
+}
+
+REQUIRED_COLUMNS = ("crop", "soil_behavior", "fertilizer", "rate_kg_acre", "logic_note")
+
+
+class FertilizerRules:
+    """
+    fertilizer_rules.csv compiled into a decision table keyed by
+    (crop, soil_behavior), where either side may be WILDCARD.
+
+    A request probes at most four keys - (crop, behavior), (crop, *),
+    (*, behavior), (*, *) - so lookups stay O(1) however many rows the
+    file has. When several rows match, the highest `priority` wins
+    (blank = 0), then the more specific row (crop beats behavior), then
+    the earlier row. The file is re-checked at most every
+    RELOAD_CHECK_SECONDS and recompiled when it changed.
+    """
+
+    RELOAD_CHECK_SECONDS = 1.0
+
+    def __init__(self, path=FERTILIZER_RULES_PATH):
+        self.path = path
+        self.table = {}
+        self.reloads = 0
+        self.watch = FileWatch(path, interval=self.RELOAD_CHECK_SECONDS)
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.watch.version
+
+    def _load(self):
+        """
+        Recompiles the table. Malformed rows (e.g. a blank rate_kg_acre)
+        are skipped with a warning; a file that cannot be read as rules at
+        all leaves the last good table in place. Only a missing file falls
+        back to DEFAULT_RULE.
+        """
+        table = {}
+        try:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                missing = set(REQUIRED_COLUMNS) - set(reader.fieldnames or [])
+                if missing:
+                    raise ValueError(f"missing columns {sorted(missing)}")
+                for order, row in enumerate(reader):
+                    try:
+                        crop = row["crop"].strip().lower() or WILDCARD
+                        behavior = row["soil_behavior"].strip().upper() or WILDCARD
+                        rank = (
+                            int(row.get("priority") or 0),
+                            (crop != WILDCARD) * 2 + (behavior != WILDCARD),
+                            -order
+                        )
+                        result = {
+                            "status": "OK",
+                            "fertilizer": row["fertilizer"],
+                            "rate_kg_acre": int(float(row["rate_kg_acre"])),
+                            "logic": row["logic_note"]
+                        }
+                    except (AttributeError, TypeError, ValueError, OverflowError) as e:
+                        print(f"⚠️ Skipping {self.path} line {reader.line_num}: {e}")
+                        continue
+                    key = (crop, behavior)
+                    if key not in table or rank > table[key][0]:
+                        table[key] = (rank, result)
+        except FileNotFoundError:
+            table = {}  # serve the built-in default
+        except (OSError, UnicodeDecodeError, csv.Error, ValueError) as e:
+            print(f"⚠️ Keeping previous fertilizer rules, cannot load {self.path}: {e}")
+            return
+        self.table = table
+        self.reloads += 1
+
+    def refresh(self):
+        with self._lock:
+            if self.watch.poll():
+                self._load()
+        return self.version
+
+    def lookup(self, crop, soil_behavior):
+        crop = str(crop).lower()
+        behavior = str(soil_behavior).upper()
+
+        best = None
+        for key in ((crop, behavior), (crop, WILDCARD), (WILDCARD, behavior), (WILDCARD, WILDCARD)):
+            hit = self.table.get(key)
+            if hit is not None and (best is None or hit[0] > best[0]):
+                best = hit
+        return dict(best[1] if best is not None else DEFAULT_RULE)
+
+    def recommend(self, crop, soil_behavior):
+        self.refresh()
+        return self.lookup(crop, soil_behavior)
+
+    def recommend_batch(self, pairs):
+        """
+        [(crop, soil_behavior), ...] -> guidance per pair, one reload check.
+        """
+        self.refresh()
+        memo = {}
+        out = []
+        for pair in pairs:
+            if pair not in memo:
+                memo[pair] = self.lookup(*pair)
+            out.append(dict(memo[pair]))
+        return out
+
+
+fertilizer_rules = FertilizerRules()
+
+
 def recommend_fertilizer(crop, soil_behavior):
     """
     Conservative, rule-based fertilizer guidance
     """
+    return fertilizer_rules.recommend(crop, soil_behavior)
+
+
+def recommend_fertilizer_batch(pairs):
+    return fertilizer_rules.recommend_batch(pairs)
+
 
-    if soil_behavior == "MOISTURE_STRESSED":
-        return {
-            "status": "OK",
-            "fertilizer": "Urea",
-            "rate_kg_acre": 20,
-            "logic": "Lower dose due to moisture stress"
-        }
-
-    if soil_behavior == "LOW_RETENTION":
-        return {
-            "status": "OK",
-            "fertilizer": "DAP",
-            "rate_kg_acre": 25,
-            "logic": "Phosphorus support for weak retention soils"
-        }
-
-    if soil_behavior == "RESPONSIVE_BUT_DEPLETING":
-        return {
-            "status": "OK",
-            "fertilizer": "Urea",
-            "rate_kg_acre": 30,
-            "logic": "Soil shows response but nutrients depleting"
-        }
-
-    return {
-        "status": "OK",
-        "fertilizer": "Urea",
-        "rate_kg_acre": 25,
-        "logic": "Maintenance dose only"
-    }
+def fertilizer_version():
+    return fertilizer_rules.refresh()
@@ -1,6 +1,11 @@
-import pandas as pd
+import csv
+import threading
+
+from artifacts import FileWatch
 
 MARKET_DATA_PATH = "data/market_reference.csv"
+# Written by src/market_trends.py from daily mandi prices (optional)
+MARKET_TRENDS_PATH = "data/processed/market_trends.csv"
 
 # Fallback mapping by agro-climatic zone
 ZONE_REFERENCE_MARKETS = {
@@ -11,38 +16,149 @@ ZONE_REFERENCE_MARKETS = {
     "DRY": "Salem"
 }
 
-def get_market_info(crop: str, zone: str):
+ZONE_MARKET_NOTE = (
+    "Reference market for this crop in the {zone} agro-climatic zone. "
+    "Shown for awareness only, not local pricing."
+)
+CROP_MARKET_NOTE = (
+    "Reference market based on crop trade volume. "
+    "Shown for awareness only, not local pricing."
+)
+SERIES_MARKET_NOTE = (
+    "Trend from daily mandi prices up to {as_of} in the {zone} agro-climatic zone. "
+    "Shown for awareness only, not local pricing."
+)
+ZONE_FALLBACK_NOTE = (
+    "Reference market inferred using {zone} agro-climatic zone. "
+    "Used only to show general trend, not local price."
+)
+
+
+class MarketStore:
     """
-    Returns a nearby high-volume reference market.
-    Never returns NO_DATA.
+    market_reference.csv held in memory as a (crop, zone) index plus a
+    crop-only index (first row per crop), overlaid with the latest computed
+    price trend per (crop, zone) from market_trends.csv when that exists.
+    The files' size/mtime is re-checked at most every RELOAD_CHECK_SECONDS
+    and the indexes rebuilt when one changed, so edits and new trend runs
+    go live without a restart.
     """
 
-    df = pd.read_csv(MARKET_DATA_PATH)
-    crop = crop.lower()
+    RELOAD_CHECK_SECONDS = 1.0
+
+    def __init__(self, path=MARKET_DATA_PATH, trends_path=MARKET_TRENDS_PATH):
+        self.path = path
+        self.trends_path = trends_path
+        self.by_crop_zone = {}
+        self.by_crop = {}
+        self.trends = {}
+        self.reloads = 0
+        self.watch = FileWatch(path, trends_path, interval=self.RELOAD_CHECK_SECONDS)
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.watch.version
+
+    def _load(self):
+        by_crop_zone, by_crop, trends = {}, {}, {}
+        try:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    crop = row["crop"].strip().lower()
+                    zone = (row.get("zone") or "").strip().upper()
+                    entry = {"market": row["market"], "trend": row["trend"]}
+                    by_crop_zone.setdefault((crop, zone), entry)
+                    by_crop.setdefault(crop, entry)
+        except (OSError, KeyError):
+            pass  # keep serving with zone fallbacks only
+
+        try:
+            with open(self.trends_path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    trends[(row["crop"].strip().lower(), row["zone"].strip().upper())] = {
+                        "market": row["market"], "trend": row["trend"], "as_of": row["as_of"]
+                    }
+        except (OSError, KeyError):
+            pass  # no price series ingested yet
+
+        self.by_crop_zone, self.by_crop, self.trends = by_crop_zone, by_crop, trends
+        self.reloads += 1
+
+    def refresh(self):
+        """
+        Reloads if either file changed since the last check. Returns the
+        version stamp of the data now being served.
+        """
+        with self._lock:
+            if self.watch.poll():
+                self._load()
+        return self.version
+
+    def lookup(self, crop, zone):
+        crop = str(crop).lower()
+        key = (crop, str(zone).upper())
+
+        # 1️⃣ Latest price trend for the crop in the farmer's zone
+        series = self.trends.get(key)
+        if series is not None:
+            return {
+                "status": "OK",
+                "market": series["market"],
+                "trend": series["trend"],
+                "note": SERIES_MARKET_NOTE.format(as_of=series["as_of"], zone=zone)
+            }
+
+        # 2️⃣ Reference market for the crop in the farmer's zone
+        entry = self.by_crop_zone.get(key)
+        if entry is not None:
+            return {"status": "OK", **entry, "note": ZONE_MARKET_NOTE.format(zone=zone)}
 
-    # 1️⃣ Try crop-specific market
-    crop_match = df[df["crop"].str.lower() == crop]
-    if not crop_match.empty:
-        row = crop_match.iloc[0]
+        # 3️⃣ Crop-specific market anywhere
+        entry = self.by_crop.get(crop)
+        if entry is not None:
+            return {"status": "OK", **entry, "note": CROP_MARKET_NOTE}
+
+        # 4️⃣ Zone-based fallback market
         return {
             "status": "OK",
-            "market": row["market"],
-            "trend": row["trend"],
-            "note": (
-                "Reference market based on crop trade volume. "
-                "Shown for awareness only, not local pricing."
-            )
+            "market": ZONE_REFERENCE_MARKETS.get(zone, "State Market"),
+            "trend": "Stable",
+            "note": ZONE_FALLBACK_NOTE.format(zone=zone)
         }
 
-    # 2️⃣ Zone-based fallback market
-    reference_market = ZONE_REFERENCE_MARKETS.get(zone, "State Market")
-
-    return {
-        "status": "OK",
-        "market": reference_market,
-        "trend": "Stable",
-        "note": (
-            f"Reference market inferred using {zone} agro-climatic zone. "
-            "Used only to show general trend, not local price."
-        )
-    }
+    def get(self, crop, zone=None):
+        self.refresh()
+        return self.lookup(crop, zone)
+
+    def get_batch(self, pairs):
+        """
+        [(crop, zone), ...] -> market info per pair, one reload check.
+        """
+        self.refresh()
+        memo = {}
+        out = []
+        for pair in pairs:
+            if pair not in memo:
+                memo[pair] = self.lookup(*pair)
+            out.append(dict(memo[pair]))
+        return out
+
+
+market_store = MarketStore()
+
+
+def get_market_info(crop: str, zone: str = None):
+    """
+    Returns a nearby high-volume reference market.
+    Never returns NO_DATA.
+    """
+    return market_store.get(crop, zone)
+
+
+def get_market_info_batch(pairs):
+    return market_store.get_batch(pairs)
+
+
+def market_version():
+    return market_store.refresh()
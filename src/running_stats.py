@@ -0,0 +1,109 @@
+# running_stats.py
+# Mergeable per-group aggregates of one numeric value: sum, count, min, max
+# and sum of squares. Memory is one row per group whatever the number of
+# rows added, and two RunningStats built from disjoint rows (chunks, files,
+# worker processes) merge into exactly the stats of all the rows together,
+# so means and standard deviations are never averaged from partial results.
+import numpy as np
+
+STAT_COLUMNS = ["sum", "count", "min", "max", "sumsq"]
+MERGE_RULES = {"sum": "sum", "count": "sum", "min": "min", "max": "max", "sumsq": "sum"}
+
+
+class RunningStats:
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        # DataFrame indexed by the keys, columns STAT_COLUMNS
+        self.table = None
+
+    @classmethod
+    def from_result(cls, frame, keys, suffix=""):
+        """
+        Stats back from a result() table, so saved tables merge exactly
+        (sums are rebuilt from mean, sample std and observations).
+        """
+        import pandas as pd
+
+        stats = cls(keys)
+        if frame.empty:
+            return stats
+        n = frame["observations"].to_numpy(dtype="float64")
+        mean = frame[f"mean{suffix}"].to_numpy(dtype="float64")
+        std = np.nan_to_num(frame[f"std{suffix}"].to_numpy(dtype="float64"))
+        table = pd.DataFrame({
+            "sum": mean * n,
+            "count": n,
+            "min": frame[f"min{suffix}"].to_numpy(dtype="float64"),
+            "max": frame[f"max{suffix}"].to_numpy(dtype="float64"),
+            "sumsq": np.maximum(n - 1, 0) * std * std + n * mean * mean,
+        }, index=pd.MultiIndex.from_frame(frame[stats.keys]))
+        return stats.merge_table(table)
+
+    def __len__(self):
+        return 0 if self.table is None else len(self.table)
+
+    def add(self, frame, value):
+        """
+        Folds the rows of `frame` into the running stats of column `value`.
+        Rows with a missing key or value are ignored.
+        """
+        frame = frame.dropna(subset=self.keys + [value])
+        if frame.empty:
+            return self
+        v = frame[value].astype("float64")
+        part = frame[self.keys].assign(_v=v, _v2=v * v).groupby(self.keys, sort=False).agg(
+            sum=("_v", "sum"),
+            count=("_v", "count"),
+            min=("_v", "min"),
+            max=("_v", "max"),
+            sumsq=("_v2", "sum"),
+        )
+        return self.merge_table(part)
+
+    def merge(self, other):
+        """
+        Merges another RunningStats over the same keys (disjoint rows).
+        """
+        if other.keys != self.keys:
+            raise ValueError(f"cannot merge stats keyed by {other.keys} into {self.keys}")
+        return self.merge_table(other.table)
+
+    def merge_table(self, part):
+        import pandas as pd
+
+        if part is None or part.empty:
+            return self
+        if self.table is None:
+            self.table = part[STAT_COLUMNS]
+        else:
+            both = pd.concat([self.table, part[STAT_COLUMNS]])
+            self.table = both.groupby(level=list(range(len(self.keys))), sort=False).agg(MERGE_RULES)
+        return self
+
+    def result(self, suffix=""):
+        """
+        One row per group, sorted by key: the keys, then mean, min, max,
+        std (sample, like pandas .std()) with `suffix` appended, then the
+        row count as observations.
+        """
+        import pandas as pd
+
+        if self.table is None:
+            columns = self.keys + [f"{c}{suffix}" for c in ("mean", "min", "max", "std")] + ["observations"]
+            return pd.DataFrame(columns=columns)
+
+        t = self.table.sort_index()
+        n = t["count"].to_numpy(dtype="float64")
+        mean = t["sum"].to_numpy() / n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (t["sumsq"].to_numpy() - n * mean * mean) / (n - 1)
+        std = np.where(n > 1, np.sqrt(np.clip(var, 0.0, None)), np.nan)
+
+        out = t.index.to_frame(index=False)
+        out[f"mean{suffix}"] = mean
+        out[f"min{suffix}"] = t["min"].to_numpy()
+        out[f"max{suffix}"] = t["max"].to_numpy()
+        out[f"std{suffix}"] = std
+        out["observations"] = t["count"].to_numpy(dtype="int64")
+        return out
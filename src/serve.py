@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+src/serve.py
+
+Local HTTP service for the crop advisory contract (stdlib asyncio only).
+
+    python src/serve.py --port 8080 --max-batch-size 64 --max-wait-ms 3
+
+Endpoints
+- POST /predict   {"District": "..."}        -> advisory
+                  {"lat": 11.66, "lon": 78.15} (optionally with "District")
+                  [{"District": "..."}, ...] -> list of advisories
+- GET  /health    readiness (model loaded)
+- GET  /stats     micro-batching, cache and worker pool counters
+- GET  /metrics   per-stage latency histograms, Prometheus text format
+- GET  /metrics.json  the same histograms as JSON
+                  (stage timers are on only with ZENITH_METRICS=1; with
+                  --workers they are recorded inside each worker process)
+- POST /workers/restart  {"worker_id": i} or {} for a rolling restart
+
+Concurrent requests are queued and scored together: a batch is closed when
+it reaches --max-batch-size or --max-wait-ms after its first request,
+whichever comes first, and goes to the model as one predict_crops_batch call.
+
+    python src/serve.py --workers 16
+
+scores batches in 16 pre-forked processes that share the loaded model
+copy-on-write (see worker_pool.py).
+"""
+import argparse
+import asyncio
+import json
+import math
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from advisory_cache import AdvisoryCache
+from predict import Predictor, get_predictor
+from worker_pool import DISPATCH_MODES, WorkerPool
+
+MAX_BODY_BYTES = 1_000_000
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 3.0
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class BadRequest(Exception):
+    status = 400
+
+
+class PayloadTooLarge(BadRequest):
+    status = 413
+
+
+# ==================================================
+# MICRO-BATCHING
+# ==================================================
+class MicroBatcher:
+    """
+    Gathers single requests into batches for predict_fn(list) -> list.
+    predict_fn runs on background threads so the event loop keeps
+    accepting requests while a batch is being scored; up to
+    max_concurrent_batches batches are in flight (one per pool worker).
+    """
+
+    def __init__(self, predict_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, max_concurrent_batches=1):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent_batches = max_concurrent_batches
+
+        self.queue = None
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches, thread_name_prefix="batcher"
+        )
+        self._slots = None
+        self._task = None
+
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.busy_seconds = 0.0
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=True)
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # drain whatever is already queued without waiting
+            while not self.queue.empty() and len(batch) < self.max_batch_size:
+                batch.append(self.queue.get_nowait())
+            if len(batch) >= self.max_batch_size:
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = await self._collect()
+            loop.create_task(self._score(batch))
+
+    async def _score(self, batch):
+        loop = asyncio.get_running_loop()
+        items = [item for item, _ in batch]
+
+        start = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(self.executor, self.predict_fn, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.busy_seconds += time.perf_counter() - start
+            self._slots.release()
+
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+
+# ==================================================
+# HTTP
+# ==================================================
+async def read_request(reader):
+    """
+    Minimal HTTP/1.1 request parser -> (method, path, headers, body) or None on EOF.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    try:
+        method, target, _version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise BadRequest("malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY_BYTES:
+        raise PayloadTooLarge(f"body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+
+def encode_response(status, payload, keep_alive):
+    """
+    str payloads are sent as plain text (Prometheus exposition), the rest as JSON.
+    """
+    if isinstance(payload, str):
+        body = payload.encode("utf-8")
+        content_type = "text/plain; version=0.0.4"
+    else:
+        body = json.dumps(payload).encode("utf-8")
+        content_type = "application/json"
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def parse_farmer_inputs(body):
+    try:
+        payload = json.loads(body or b"null")
+    except ValueError:
+        raise BadRequest("body is not valid JSON")
+
+    many = isinstance(payload, list)
+    inputs = payload if many else [payload]
+    for farmer_input in inputs:
+        if not isinstance(farmer_input, dict):
+            raise BadRequest("each input must be a JSON object")
+        if "lat" in farmer_input or "lon" in farmer_input:
+            if not all(is_number(farmer_input.get(k)) for k in ("lat", "lon")):
+                raise BadRequest('"lat" and "lon" must both be numbers')
+            if not isinstance(farmer_input.get("District", ""), str):
+                raise BadRequest('"District" must be a string')
+        elif not isinstance(farmer_input.get("District"), str):
+            raise BadRequest('each input needs a "District" string or "lat"/"lon"')
+    return inputs, many
+
+
+def parse_worker_id(body, n_workers):
+    """
+    worker_id from a /workers/restart body; None (restart all) when the
+    body is empty or has no worker_id.
+    """
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise BadRequest("body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise BadRequest("body must be a JSON object")
+
+    worker_id = payload.get("worker_id")
+    if worker_id is None:
+        return None
+    if not isinstance(worker_id, int) or isinstance(worker_id, bool):
+        raise BadRequest('"worker_id" must be an integer')
+    if not 0 <= worker_id < n_workers:
+        raise BadRequest(f'"worker_id" must be in 0..{n_workers - 1}')
+    return worker_id
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+class AdvisoryServer:
+
+    def __init__(self, predictor, batcher, pool=None):
+        self.predictor = predictor
+        self.batcher = batcher
+        self.pool = pool
+        self.requests = 0
+
+    async def handle(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "OK" if self.predictor.loaded else "LOADING"}
+
+        if path == "/stats":
+            cache = self.predictor.cache
+            explainer = self.predictor.explainer
+            return 200, {
+                "requests": self.requests,
+                "batching": self.batcher.stats(),
+                "cache": cache.stats() if cache is not None else None,
+                "explanations": explainer.stats() if explainer is not None else None,
+                "pool": self.pool.stats() if self.pool is not None else None,
+            }
+
+        if path == "/metrics":
+            return 200, instrumentation.prometheus_text()
+
+        if path == "/metrics.json":
+            return 200, instrumentation.snapshot()
+
+        if path == "/workers/restart":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            if self.pool is None:
+                return 404, {"error": "not running with --workers"}
+            worker_id = parse_worker_id(body, self.pool.n_workers)
+            restart = (
+                self.pool.restart_all if worker_id is None
+                else lambda: self.pool.restart_worker(worker_id)
+            )
+            await asyncio.get_running_loop().run_in_executor(None, restart)
+            return 200, self.pool.stats()
+
+        if path == "/predict":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            inputs, many = parse_farmer_inputs(body)
+            results = await asyncio.gather(*(self.batcher.submit(i) for i in inputs))
+            return 200, results if many else results[0]
+
+        return 404, {"error": f"no route for {path}"}
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except BadRequest as e:
+                    writer.write(encode_response(e.status, {"error": str(e)}, False))
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self.requests += 1
+
+                try:
+                    status, payload = await self.handle(method, path, body)
+                except BadRequest as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def run_server(host, port, max_batch_size, max_wait_ms, predictor=None, pool=None):
+    """
+    With a started worker_pool.WorkerPool, batches are scored in the pool's
+    processes (one in-flight batch per worker) instead of in this process.
+    """
+    predictor = predictor or get_predictor()
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, predictor.load)
+
+    if pool is not None:
+        batcher = MicroBatcher(
+            pool.predict_crops_batch, max_batch_size, max_wait_ms,
+            max_concurrent_batches=pool.n_workers
+        )
+    else:
+        batcher = MicroBatcher(predictor.predict_crops_batch, max_batch_size, max_wait_ms)
+    batcher.start()
+
+    app = AdvisoryServer(predictor, batcher, pool)
+    server = await asyncio.start_server(app.serve_connection, host, port)
+    print(
+        f"✅ Serving crop advisories on http://{host}:{port} "
+        f"(max batch {max_batch_size}, max wait {max_wait_ms} ms, "
+        f"workers {pool.n_workers if pool is not None else 0})",
+        flush=True
+    )
+
+    # SIGTERM/SIGINT stop the server cleanly so the caller can close the pool
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        await batcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crop advisory HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument(
+        "--cache-size", type=int, default=None,
+        help="advisory cache entries (0 disables the cache; default: predictor default)"
+    )
+    parser.add_argument(
+        "--shap-budget-ms", type=float, default=None,
+        help="SHAP explanation work per batch (0 = cached explanations only; default: predictor default)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="pre-forked inference processes (0 = score in the server process)"
+    )
+    parser.add_argument("--dispatch", choices=DISPATCH_MODES, default="queue_depth")
+    args = parser.parse_args()
+
+    predictor = get_predictor()
+    if args.cache_size is not None:
+        predictor = Predictor(cache=AdvisoryCache(args.cache_size) if args.cache_size > 0 else None)
+    if args.shap_budget_ms is not None:
+        predictor.shap_budget_ms = args.shap_budget_ms
+
+    # Fork before the event loop starts any threads
+    pool = None
+    if args.workers > 0:
+        pool = WorkerPool(predictor, args.workers, args.dispatch).start()
+
+    try:
+        asyncio.run(run_server(
+            args.host, args.port, args.max_batch_size, args.max_wait_ms, predictor, pool
+        ))
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def infer_soil_behavior(soil_health: dict, ndvi: float, zone: str):
     """
     Infers soil behavior (not soil type)
@@ -23,3 +26,24 @@ def infer_soil_behavior(soil_health: dict, ndvi: float, zone: str):
         return "HIGH_RETENTION"
 
     return "BALANCED"
+
+
+def infer_soil_behavior_batch(nitrogen, ndvi, zone):
+    """
+    Array version of infer_soil_behavior: the rules become masks and the
+    first matching rule wins, as in the if-chain.
+    """
+    n = np.asarray(nitrogen, dtype=object)
+    ndvi = np.asarray(ndvi, dtype=float)
+    zone = np.asarray(zone, dtype=object)
+
+    return np.select(
+        [
+            (ndvi > 0.45) & (n == "LOW"),
+            (ndvi < 0.30) & (n == "MEDIUM"),
+            zone == "DRY",
+            zone == "DELTA"
+        ],
+        ["RESPONSIVE_BUT_DEPLETING", "MOISTURE_STRESSED", "LOW_RETENTION", "HIGH_RETENTION"],
+        default="BALANCED"
+    ).astype(object)
@@ -1,3 +1,15 @@
+import numpy as np
+
+BANDS = np.array(["LOW", "MEDIUM", "HIGH"], dtype=object)
+
+# (low, high) band edges per nutrient
+NUTRIENT_BANDS = {
+    "nitrogen": (30, 60),
+    "phosphorus": (20, 50),
+    "potassium": (20, 50)
+}
+
+
 def band_value(x, low, high):
     """
     Converts numeric value into LOW / MEDIUM / HIGH
@@ -10,20 +22,19 @@ def band_value(x, low, high):
         return "HIGH"
 
 
-def estimate_soil_health(district_rows):
+def band_value_batch(x, low, high):
     """
-    Uses nearby soil statistics (safe approximation)
+    Array version of band_value. np.digitize puts NaN past the last edge,
+    i.e. HIGH, same as the scalar comparisons.
     """
+    return BANDS[np.digitize(np.asarray(x, dtype=float), [low, high])]
 
-    # Default values if columns missing
-    nitrogen = district_rows["Nitrogen"].mean() if "Nitrogen" in district_rows.columns else 40
-    phosphorus = district_rows["Phosphorus"].mean() if "Phosphorus" in district_rows.columns else 30
-    potassium = district_rows["Potassium"].mean() if "Potassium" in district_rows.columns else 30
 
+def soil_health_bands(nitrogen, phosphorus, potassium):
     soil_health = {
-        "nitrogen": band_value(nitrogen, 30, 60),
-        "phosphorus": band_value(phosphorus, 20, 50),
-        "potassium": band_value(potassium, 20, 50)
+        "nitrogen": band_value(nitrogen, *NUTRIENT_BANDS["nitrogen"]),
+        "phosphorus": band_value(phosphorus, *NUTRIENT_BANDS["phosphorus"]),
+        "potassium": band_value(potassium, *NUTRIENT_BANDS["potassium"])
     }
 
     # Overall soil health
@@ -36,6 +47,39 @@ def estimate_soil_health(district_rows):
 
     return soil_health
 
+
+def soil_health_bands_batch(nitrogen, phosphorus, potassium):
+    """
+    Array version of soil_health_bands: {name: (N,) band array}.
+    """
+    soil_health = {
+        name: band_value_batch(values, *NUTRIENT_BANDS[name])
+        for name, values in (("nitrogen", nitrogen), ("phosphorus", phosphorus), ("potassium", potassium))
+    }
+    bands = list(soil_health.values())
+    soil_health["overall"] = np.select(
+        [
+            np.logical_or.reduce([b == "LOW" for b in bands]),
+            np.logical_or.reduce([b == "MEDIUM" for b in bands])
+        ],
+        ["POOR", "MODERATE"],
+        default="GOOD"
+    ).astype(object)
+    return soil_health
+
+
+def estimate_soil_health(district_rows):
+    """
+    Uses nearby soil statistics (safe approximation)
+    """
+
+    # Default values if columns missing
+    nitrogen = district_rows["Nitrogen"].mean() if "Nitrogen" in district_rows.columns else 40
+    phosphorus = district_rows["Phosphorus"].mean() if "Phosphorus" in district_rows.columns else 30
+    potassium = district_rows["Potassium"].mean() if "Potassium" in district_rows.columns else 30
+
+    return soil_health_bands(nitrogen, phosphorus, potassium)
+
 def estimated_nitrogen_value(soil_health: dict):
     """
     Converts soil health band into safe numeric nitrogen estimate
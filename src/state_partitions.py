@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+src/state_partitions.py
+
+Splits the national "India Agriculture Crop Production.csv" into one CSV
+per state in a single streaming pass, so per-state scripts read their
+partition instead of re-parsing the national file.
+
+    python src/state_partitions.py                          # split if stale
+    python src/state_partitions.py --force
+    python src/state_partitions.py --columns District Crop Year Production
+    python src/state_partitions.py --where "Season=Kharif,Rabi"
+
+The national file is streamed with the csv module (values are copied
+through unparsed), each distinct raw State value is normalized once into
+State_clean (stripped, lower case) and rows are appended to their state's
+partition every CHUNK_ROWS rows, so memory stays constant whatever the
+file size. Every state is
+written by default: adding a state later is a read of its partition.
+Partitions are keyed by state_slug(State_clean), so spellings that only
+differ in punctuation/spacing ("Tamil Nadu", "Tamil-Nadu") share one.
+
+Partitions live in data/processed/state_partitions/<slug>.csv with a
+manifest recording the source (size/mtime + sha256), the columns and the
+row filter they were written with, and the rows per state.
+ensure_partitions() re-splits only when the source changed or a request
+needs columns/rows the partitions left out; read_state() applies
+projection and row filters on read.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+from columnar import matches_source, source_stamp
+
+ROOT = Path(__file__).resolve().parents[1]
+NATIONAL_CSV = ROOT / "data" / "external" / "india_prod" / "India Agriculture Crop Production.csv"
+PARTITION_DIR = ROOT / "data" / "processed" / "state_partitions"
+MANIFEST_FILE = "manifest.json"
+
+# Bumped when the partition layout changes; older partitions are rebuilt
+PARTITION_FORMAT = 2
+
+CHUNK_ROWS = 50_000
+
+STATE_COLUMN = "State"
+
+
+def normalize_state(state):
+    """
+    State_clean for a raw state name: stripped, lower case.
+    """
+    return str(state).strip().lower()
+
+
+def state_slug(state_clean):
+    return re.sub(r"[^a-z0-9]+", "_", state_clean).strip("_") or "unknown"
+
+
+def state_key(state):
+    """
+    Partition key of a raw or clean state name.
+    """
+    return state_slug(normalize_state(state))
+
+
+def row_mask(df, where):
+    """
+    Boolean mask for rows whose (stripped) value of every `where` column
+    is one of its allowed values.
+    """
+    mask = None
+    for column, values in where.items():
+        keep = df[column].astype(str).str.strip().isin([str(v) for v in values])
+        mask = keep if mask is None else mask & keep
+    return mask
+
+
+# ==================================================
+# SPLIT (ONE PASS)
+# ==================================================
+def split_states(source=NATIONAL_CSV, out_dir=PARTITION_DIR, columns=None, where=None,
+                 states=None, chunk_rows=CHUNK_ROWS):
+    """
+    One pass over `source`, writing a partition per state (or only the
+    `states` given). `columns` projects the national columns (State and
+    the `where` columns are always kept), `where` is {column: allowed
+    values}. Rows are buffered
+    per state and flushed every `chunk_rows` rows.
+    Replaces out_dir atomically and returns the manifest.
+    """
+    out_dir = Path(out_dir)
+    where = {c: sorted(str(v) for v in vals) for c, vals in (where or {}).items()}
+    wanted_states = None if states is None else {state_key(s) for s in states}
+
+    tmp = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    # all keyed by partition key (slug); spellings: key -> State_clean values seen
+    writers = {}
+    handles = []
+    buffers = {}
+    rows = {}
+    spellings = {}
+    total = 0
+
+    def flush():
+        for key, buffered in buffers.items():
+            if key not in writers:
+                # "x": a second writer for one file is a bug, never a truncation
+                f = open(tmp / f"{key}.csv", "x", newline="", encoding="utf-8")
+                handles.append(f)
+                writers[key] = csv.writer(f)
+                writers[key].writerow(out_header)
+            writers[key].writerows(buffered)
+            rows[key] = rows.get(key, 0) + len(buffered)
+        buffers.clear()
+
+    try:
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            missing = ({STATE_COLUMN, *(columns or []), *where}) - set(header)
+            if missing:
+                raise KeyError(f"columns not in {source}: {sorted(missing)}")
+
+            # filter columns are kept so reads can filter further on them
+            projected = None if columns is None else {STATE_COLUMN, *columns, *where}
+            keep = [i for i, c in enumerate(header) if projected is None or c in projected]
+            out_header = [header[i] for i in keep] + ["State_clean"]
+            state_at = header.index(STATE_COLUMN)
+            checks = [(header.index(c), set(vals)) for c, vals in where.items()]
+            width = len(header)
+
+            # raw State value -> (State_clean, key) (None when the state is not wanted)
+            clean = {}
+            buffered = 0
+            for row in reader:
+                total += 1
+                if len(row) < width:
+                    row += [""] * (width - len(row))
+                raw = row[state_at]
+                entry = clean.get(raw, "")
+                if entry == "":
+                    state = normalize_state(raw)
+                    entry = clean[raw] = (state, state_slug(state))
+                    if wanted_states is not None and entry[1] not in wanted_states:
+                        entry = clean[raw] = None
+                    else:
+                        spellings.setdefault(entry[1], set()).add(state)
+                if entry is None:
+                    continue
+                if checks and not all(row[i].strip() in vals for i, vals in checks):
+                    continue
+                out = [row[i] for i in keep] if columns is not None else row[:width]
+                out.append(entry[0])
+                buffers.setdefault(entry[1], []).append(out)
+                buffered += 1
+                if buffered >= chunk_rows:
+                    flush()
+                    buffered = 0
+            flush()
+    finally:
+        for f in handles:
+            f.close()
+
+    manifest = {
+        "format": PARTITION_FORMAT,
+        "source_path": str(Path(source).resolve()),
+        "source": source_stamp(source),
+        "header": out_header,
+        "columns": None if columns is None else out_header[:-1],
+        "where": where,
+        "states": None if wanted_states is None else sorted(wanted_states),
+        "source_rows": total,
+        "partitions": {
+            key: {"file": f"{key}.csv", "rows": n, "states": sorted(spellings[key])}
+            for key, n in sorted(rows.items())
+        },
+    }
+    with open(tmp / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    os.replace(tmp, out_dir)
+    return manifest
+
+
+# ==================================================
+# READ
+# ==================================================
+def read_manifest(out_dir=PARTITION_DIR):
+    try:
+        with open(Path(out_dir) / MANIFEST_FILE, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format") == PARTITION_FORMAT else None
+
+
+def covers(manifest, columns=None, where=None, states=None):
+    """
+    True when partitions written with `manifest` hold everything a read
+    with these columns / row filter / states needs.
+    """
+    if manifest["columns"] is not None:
+        needed = {STATE_COLUMN, *(columns or []), *(where or {})}
+        if columns is None or not needed <= set(manifest["columns"]):
+            return False
+    if manifest["where"]:
+        requested = {c: sorted(str(v) for v in vals) for c, vals in (where or {}).items()}
+        if any(requested.get(c) is None or not set(requested[c]) <= set(vals)
+               for c, vals in manifest["where"].items()):
+            return False
+    if manifest["states"] is not None:
+        if states is None or not {state_key(s) for s in states} <= set(manifest["states"]):
+            return False
+    return True
+
+
+def fresh_manifest(source=NATIONAL_CSV, out_dir=PARTITION_DIR, columns=None, where=None, states=None):
+    """
+    Manifest of the partitions in out_dir when they were split from the
+    current `source` and cover the request, else None. When the source
+    file is gone, existing partitions count as current.
+    """
+    manifest = read_manifest(out_dir)
+    if manifest is None or manifest["source_path"] != str(Path(source).resolve()):
+        return None
+    if not matches_source(manifest["source"], source):
+        return None
+    return manifest if covers(manifest, columns, where, states) else None
+
+
+def ensure_partitions(source=NATIONAL_CSV, out_dir=PARTITION_DIR, columns=None, where=None,
+                      states=None, force=False):
+    """
+    Manifest of partitions that serve the request, re-splitting (all
+    states, all columns, every row) only when they are missing, stale or
+    too narrow.
+    """
+    manifest = None if force else fresh_manifest(source, out_dir, columns, where, states)
+    if manifest is not None:
+        return manifest
+
+    print("Splitting", source, "by state (one pass)...")
+    manifest = split_states(source, out_dir)
+    print(f"✅ {manifest['source_rows']} rows -> {len(manifest['partitions'])} state partitions in {out_dir}")
+    return manifest
+
+
+def read_state(state, columns=None, where=None, out_dir=PARTITION_DIR, manifest=None):
+    """
+    One state's rows as a DataFrame (dtypes inferred from that state's
+    rows), projected to `columns` (+ State_clean) and filtered by `where`.
+    An unknown state gives an empty frame.
+    """
+    import pandas as pd
+
+    manifest = manifest or read_manifest(out_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"no state partitions in {out_dir}; run src/state_partitions.py")
+
+    entry = manifest["partitions"].get(state_key(state))
+    if entry is None:
+        header = manifest["header"]
+        return pd.DataFrame(columns=header if columns is None else [c for c in header if c in {*columns, "State_clean"}])
+
+    path = Path(out_dir) / entry["file"]
+    usecols = None
+    if columns is not None:
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [c for c in header if c in {*columns, *(where or {}), "State_clean"}]
+    df = pd.read_csv(path, usecols=usecols, low_memory=False)
+
+    if where:
+        df = df[row_mask(df, where)].reset_index(drop=True)
+        if columns is not None:
+            df = df[[c for c in df.columns if c in {*columns, "State_clean"}]]
+    return df
+
+
+def read_states(states=None, columns=None, where=None, out_dir=PARTITION_DIR):
+    """
+    Rows of several states (all partitions by default), one partition in
+    memory at a time before the final concat.
+    """
+    import pandas as pd
+
+    manifest = read_manifest(out_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"no state partitions in {out_dir}; run src/state_partitions.py")
+    states = manifest["partitions"] if states is None else states
+    frames = [read_state(s, columns, where, out_dir, manifest) for s in states]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+# ==================================================
+# CLI
+# ==================================================
+def parse_where(items):
+    where = {}
+    for item in items:
+        column, _, values = item.partition("=")
+        where[column.strip()] = [v.strip() for v in values.split(",")]
+    return where
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split the national crop CSV by state")
+    parser.add_argument("--source", default=str(NATIONAL_CSV))
+    parser.add_argument("--out", default=str(PARTITION_DIR))
+    parser.add_argument("--states", nargs="*", help="only these states (default: all)")
+    parser.add_argument("--columns", nargs="*", help="only these columns (default: all)")
+    parser.add_argument("--where", nargs="*", default=[], metavar="COLUMN=V1,V2",
+                        help="keep rows whose column is one of the values")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--force", action="store_true", help="split even if partitions are fresh")
+    args = parser.parse_args()
+
+    where = parse_where(args.where)
+    manifest = None if args.force else fresh_manifest(args.source, args.out, args.columns, where, args.states)
+    if manifest is not None:
+        print("✅ State partitions are up to date:", args.out)
+    else:
+        manifest = split_states(args.source, args.out, args.columns, where, args.states, args.chunk_rows)
+        print(f"✅ {manifest['source_rows']} rows -> {len(manifest['partitions'])} state partitions in {args.out}")
+
+    for state, entry in manifest["partitions"].items():
+        print(f"   {state:<30} {entry['rows']:>9} rows  {entry['file']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,14 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import f1_score
 import joblib
 
+from columnar import read_dataset
+from explanation_bundle import EXPLANATIONS_PATH, build_explanation_bundle
+
 # ----------------------------
 # 1. Load dataset
 # ----------------------------
 print("Loading NDVI-aligned dataset...")
-df = pd.read_csv("data/processed/tn_ml_ndvi_only.csv")
+df = read_dataset("data/processed/tn_ml_ndvi_only.csv")
 
 # Target
 TARGET = "Crop"
@@ -85,8 +88,9 @@ print(f"✅ Top-3 Accuracy: {top3_acc:.4f}")
 # ----------------------------
 # 6. Save model
 # ----------------------------
-joblib.dump(model, "models/catboost_tn_top3.joblib")
-print("✅ Model saved to models/catboost_tn_top3.joblib")
+MODEL_PATH = "models/catboost_tn_top3.joblib"
+joblib.dump(model, MODEL_PATH)
+print(f"✅ Model saved to {MODEL_PATH}")
 
 # ----------------------------
 # 7. Save feature schema (IMPORTANT FOR XAI)
@@ -99,3 +103,14 @@ feature_schema = {
 joblib.dump(feature_schema, "models/feature_schema_catboost.joblib")
 print("✅ Feature schema saved")
 
+
+# ----------------------------
+# 8. Save explanation bundle (tied to this exact model file)
+# ----------------------------
+print("Precomputing SHAP explanations over the training set...")
+bundle = build_explanation_bundle(model, X_train, cat_features, model_path=MODEL_PATH)
+joblib.dump(bundle, EXPLANATIONS_PATH)
+print(
+    f"✅ Explanations saved to {EXPLANATIONS_PATH} "
+    f"({len(bundle['group_keys'])} district/season summaries over {bundle['rows']} rows)"
+)
@@ -0,0 +1,370 @@
+# worker_pool.py
+# Pre-fork pool of inference worker processes.
+#
+# The parent loads the Predictor (model, schema, district profiles) once and
+# then forks N workers, so every worker shares those pages copy-on-write
+# instead of loading its own copy. gc.freeze() before forking keeps the
+# collector from touching (and so un-sharing) the inherited objects.
+import gc
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from location_resolver import load_grid
+
+DISPATCH_MODES = ("queue_depth", "round_robin")
+
+# Set in the parent right before forking; workers inherit it.
+_worker_predictor = None
+
+
+# How often an idle worker checks that its parent is still alive
+PARENT_CHECK_SECONDS = 1.0
+
+# How often the collector checks that the workers are still alive
+HEALTH_CHECK_SECONDS = 0.5
+
+# Longest a caller waits for one batch (a hung worker fails its callers)
+RESULT_TIMEOUT_SECONDS = 60.0
+
+
+def _worker_main(worker_id, task_queue, result_queue, parent_pid):
+    predictor = _worker_predictor
+    while True:
+        try:
+            task = task_queue.get(timeout=PARENT_CHECK_SECONDS)
+        except queue.Empty:
+            if os.getppid() != parent_pid:  # parent died without close()
+                result_queue.cancel_join_thread()
+                break
+            continue
+        if task is None:  # graceful stop: everything queued before it is done
+            break
+
+        task_id, farmer_inputs = task
+        try:
+            result_queue.put((task_id, worker_id, True, predictor.predict_crops_batch(farmer_inputs)))
+        except Exception as e:
+            result_queue.put((task_id, worker_id, False, f"{type(e).__name__}: {e}"))
+
+
+def memory_mb(pid):
+    """
+    RSS and PSS (MB) of a process from /proc. PSS splits shared pages
+    between the processes sharing them, so summing PSS over the pool gives
+    its real footprint. Returns None values where /proc is unavailable.
+    """
+    rss = pss = None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) / 1024
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    pss = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return {"rss_mb": rss, "pss_mb": pss}
+
+
+class WorkerProcess:
+
+    def __init__(self, worker_id, process, task_queue):
+        self.worker_id = worker_id
+        self.process = process
+        self.task_queue = task_queue
+        self.in_flight = 0
+        self.completed = 0
+        self.draining = False
+        self.reaped = False
+
+
+class WorkerPool:
+    """
+    predict_crops_batch() has the same contract as Predictor's and can be
+    called from many threads; each call is one task for one worker.
+    dispatch="queue_depth" picks the worker with the fewest in-flight tasks,
+    "round_robin" cycles through workers. A worker that dies fails its
+    in-flight tasks and is replaced by the collector thread.
+    """
+
+    def __init__(self, predictor, n_workers=None, dispatch="queue_depth", thread_count=1):
+        if dispatch not in DISPATCH_MODES:
+            raise ValueError(f"dispatch must be one of {DISPATCH_MODES}")
+
+        self.predictor = predictor
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.dispatch = dispatch
+        # CatBoost threads per worker; N workers x all cores oversubscribes the box
+        self.thread_count = thread_count
+
+        self._ctx = mp.get_context("fork")
+        self._result_queue = None
+        self._workers = []
+        # old workers of restart_worker() still finishing their queue
+        self._draining = []
+        self._futures = {}
+        self._task_ids = itertools.count()
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        # serializes forks; never held by request threads
+        self._spawn_lock = threading.Lock()
+        self._closing = False
+        self._collector = None
+        self.restarts = 0
+        self.respawns = 0
+
+    # --------------------------
+    # LIFECYCLE
+    # --------------------------
+    def start(self):
+        global _worker_predictor
+
+        self.predictor.load()
+        self.predictor.thread_count = self.thread_count
+        # Built here so the polygon grid is shared by all workers, too
+        load_grid()
+        _worker_predictor = self.predictor
+
+        self._result_queue = self._ctx.Queue()
+        gc.collect()
+        gc.freeze()
+
+        self._workers = [self._spawn(i) for i in range(self.n_workers)]
+
+        self._collector = threading.Thread(target=self._collect, name="pool-collector", daemon=True)
+        self._collector.start()
+        return self
+
+    def _spawn(self, worker_id):
+        task_queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, task_queue, self._result_queue, os.getpid()),
+            name=f"advisory-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        return WorkerProcess(worker_id, process, task_queue)
+
+    def restart_worker(self, worker_id):
+        """
+        Graceful restart: a replacement takes new tasks immediately, the old
+        worker finishes what is already queued to it and exits (or is
+        terminated after RESULT_TIMEOUT_SECONDS).
+        """
+        # checked before forking, so a bad id leaves no orphan process
+        if not isinstance(worker_id, int) or not 0 <= worker_id < len(self._workers):
+            raise ValueError(f"worker_id must be in 0..{len(self._workers) - 1}, got {worker_id!r}")
+        # forked outside self._lock, so no child starts with it held
+        with self._spawn_lock:
+            new = self._spawn(worker_id)
+        with self._lock:
+            old = self._workers[worker_id]
+            old.draining = True
+            self._draining.append(old)
+            self._workers[worker_id] = new
+            self.restarts += 1
+
+        old.task_queue.put(None)
+        old.process.join(RESULT_TIMEOUT_SECONDS)
+        if old.process.is_alive():  # hung: its callers have timed out already
+            old.process.terminate()
+            old.process.join()
+        old.task_queue.close()
+        with self._lock:
+            self._draining.remove(old)
+
+    def restart_all(self):
+        for worker_id in range(len(self._workers)):
+            self.restart_worker(worker_id)
+
+    def close(self):
+        with self._lock:
+            self._closing = True
+            workers = list(self._workers)
+        for w in workers:
+            w.task_queue.put(None)
+        for w in workers:
+            w.process.join()
+        self._result_queue.put(None)
+        self._collector.join()
+        gc.unfreeze()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --------------------------
+    # DISPATCH
+    # --------------------------
+    def _pick_worker(self):
+        # a worker that died since the last health check gets no new tasks
+        alive = [w for w in self._workers if w.process.is_alive()] or self._workers
+        if self.dispatch == "round_robin":
+            return alive[next(self._round_robin) % len(alive)]
+        return min(alive, key=lambda w: w.in_flight)
+
+    def submit(self, farmer_inputs):
+        return self._submit(farmer_inputs)[1]
+
+    def _submit(self, farmer_inputs):
+        future = Future()
+        with self._lock:
+            task_id = next(self._task_ids)
+            worker = self._pick_worker()
+            worker.in_flight += 1
+            self._futures[task_id] = (future, worker)
+            worker.task_queue.put((task_id, list(farmer_inputs)))
+        return task_id, future
+
+    def predict_crops_batch(self, farmer_inputs, timeout=RESULT_TIMEOUT_SECONDS):
+        if not farmer_inputs:
+            return []
+        task_id, future = self._submit(farmer_inputs)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            self._abandon(task_id)
+            raise
+
+    def _abandon(self, task_id):
+        """
+        Forgets a timed-out task so a hung worker does not keep it (and its
+        load count) forever; a late result is dropped by _deliver.
+        """
+        with self._lock:
+            entry = self._futures.pop(task_id, None)
+            if entry is None:  # delivered or failed meanwhile
+                return
+            future, worker = entry
+            worker.in_flight -= 1
+        future.cancel()
+
+    def predict_crop(self, farmer_input):
+        return self.predict_crops_batch([farmer_input])[0]
+
+    # --------------------------
+    # RESULTS + HEALTH
+    # --------------------------
+    def _collect(self):
+        last_check = time.monotonic()
+        while True:
+            try:
+                message = self._result_queue.get(timeout=HEALTH_CHECK_SECONDS)
+            except queue.Empty:
+                message = False
+            if message is None:
+                break
+            if message:
+                self._deliver(message)
+            if time.monotonic() - last_check >= HEALTH_CHECK_SECONDS:
+                self._reap_dead_workers()
+                last_check = time.monotonic()
+
+    def _deliver(self, message):
+        task_id, _worker_id, ok, payload = message
+        with self._lock:
+            entry = self._futures.pop(task_id, None)
+            if entry is None:  # already failed when its worker died
+                return
+            future, worker = entry
+            worker.in_flight -= 1
+            worker.completed += 1
+
+        if ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def _reap_dead_workers(self):
+        """
+        Fails the in-flight tasks of workers that died (not retried: the
+        batch may be what killed them) and replaces live-pool workers.
+        """
+        with self._lock:
+            if self._closing:
+                return
+            dead = [
+                w for w in self._workers + self._draining
+                if not w.reaped and not w.process.is_alive()
+            ]
+        if not dead:
+            return
+
+        # results a worker queued before exiting are already in the pipe
+        while True:
+            try:
+                message = self._result_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message is None:  # close() raced us; let _collect stop
+                self._result_queue.put(None)
+                break
+            self._deliver(message)
+
+        for w in dead:
+            with self._lock:
+                w.reaped = True
+                lost = [(task_id, future) for task_id, (future, owner) in self._futures.items() if owner is w]
+                for task_id, _ in lost:
+                    del self._futures[task_id]
+                w.in_flight = 0
+            for _, future in lost:
+                future.set_exception(RuntimeError(
+                    f"advisory worker {w.worker_id} died (exit code {w.process.exitcode})"
+                ))
+            if not w.draining:
+                self._respawn(w)
+
+    def _respawn(self, dead):
+        with self._spawn_lock:
+            new = self._spawn(dead.worker_id)
+        with self._lock:
+            if self._workers[dead.worker_id] is dead and not self._closing:
+                self._workers[dead.worker_id] = new
+                self.respawns += 1
+                # dispatched to it after reaping (every worker was dead)
+                lost = [(task_id, future) for task_id, (future, owner) in self._futures.items() if owner is dead]
+                for task_id, _ in lost:
+                    del self._futures[task_id]
+            else:
+                lost = None
+        if lost is not None:
+            for _, future in lost:
+                future.set_exception(RuntimeError(f"advisory worker {dead.worker_id} died"))
+            return
+        # restarted or closed meanwhile
+        new.task_queue.put(None)
+
+    # --------------------------
+    # STATS
+    # --------------------------
+    def stats(self):
+        with self._lock:
+            workers = list(self._workers)
+        return {
+            "dispatch": self.dispatch,
+            "restarts": self.restarts,
+            "respawns": self.respawns,
+            "parent": {"pid": os.getpid(), **memory_mb(os.getpid())},
+            "workers": [
+                {
+                    "worker_id": w.worker_id,
+                    "pid": w.process.pid,
+                    "alive": w.process.is_alive(),
+                    "in_flight": w.in_flight,
+                    "completed": w.completed,
+                    **memory_mb(w.process.pid)
+                }
+                for w in workers
+            ]
+        }
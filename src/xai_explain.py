@@ -1,21 +1,47 @@
-import joblib
-import pandas as pd
+import datetime
+import threading
+import time
+
 import numpy as np
-from catboost import Pool
+
+from advisory_cache import AdvisoryCache
+from columnar import read_dataset
+from explanation_bundle import EXPLANATIONS_PATH, ExplanationStore
 
 # ==================================================
-# 1. Load model & schema
+# 1. Model, schema & dataset paths
 # ==================================================
-model = joblib.load("models/catboost_tn_top3.joblib")
-feature_schema = joblib.load("models/feature_schema_catboost.joblib")
+# Loaded lazily by load_artifacts() so importing this module is cheap.
+MODEL_PATH = "models/catboost_tn_top3.joblib"
+SCHEMA_PATH = "models/feature_schema_catboost.joblib"
+DATA_PATH = "data/processed/tn_ml_ndvi_only.csv"
 
-features = feature_schema["features"]
-cat_features = feature_schema["cat_features"]
+_artifacts = None
+_explanations = None
 
-# ==================================================
-# 2. Load dataset
-# ==================================================
-data = pd.read_csv("data/processed/tn_ml_ndvi_only.csv")
+def load_explanations():
+    """
+    Training-time explanation bundle for MODEL_PATH, or None when it is
+    missing or was built for another model.
+    """
+    global _explanations
+    if _explanations is None:
+        _explanations = ExplanationStore(EXPLANATIONS_PATH, MODEL_PATH)
+    return _explanations.get()
+
+def load_artifacts():
+    """
+    Returns (model, feature_schema, data), loading them on first use.
+    """
+    global _artifacts
+    if _artifacts is None:
+        import joblib
+
+        model = joblib.load(MODEL_PATH)
+        feature_schema = joblib.load(SCHEMA_PATH)
+        data = read_dataset(DATA_PATH)
+        _artifacts = (model, feature_schema, data)
+    return _artifacts
 
 # ==================================================
 # 3. Farmer minimal input (simulate NFC / voice)
@@ -31,7 +57,7 @@ def normalize_text(x):
     return str(x).strip().lower()
 
 def infer_season():
-    month = pd.Timestamp.now().month
+    month = datetime.date.today().month
     if month in [6, 7, 8, 9]:
         return "Kharif"
     elif month in [10, 11, 12, 1]:
@@ -48,91 +74,6 @@ def confidence_band_relative(p1, p2):
     else:
         return "LOW"
 
-# ==================================================
-# 5. Normalize district & infer season
-# ==================================================
-data["District_norm"] = data["District"].apply(normalize_text)
-farmer_district = normalize_text(farmer_input["District"])
-season = infer_season()
-
-district_rows = data[data["District_norm"] == farmer_district]
-
-# ==================================================
-# 6. Fallback handling (CRITICAL)
-# ==================================================
-fallback_level = "DISTRICT"
-
-if district_rows.empty:
-    fallback_level = "STATE"
-    print(
-        f"\n⚠️ District '{farmer_input['District']}' not found in dataset."
-        "\nUsing Tamil Nadu state-level statistics."
-    )
-    if "State_clean" in data.columns:
-        district_rows = data[data["State_clean"].str.lower() == "tamil nadu"]
-
-if district_rows.empty:
-    fallback_level = "GLOBAL"
-    print("\n⚠️ State-level data unavailable. Using global dataset averages.")
-    district_rows = data.copy()
-
-# ==================================================
-# 7. Select NDVI column (season-aware)
-# ==================================================
-if season == "Kharif":
-    ndvi_col = "ndvi_kharif_mean"
-elif season == "Rabi":
-    ndvi_col = "ndvi_rabi_mean"
-else:
-    ndvi_col = "ndvi_mean"
-
-if ndvi_col in district_rows.columns and not district_rows[ndvi_col].dropna().empty:
-    ndvi_value = float(district_rows[ndvi_col].mean())
-else:
-    ndvi_value = float(data[ndvi_col].mean())
-
-# ==================================================
-# 8. Build FULL feature row (SAFE + CONTEXTUAL)
-# ==================================================
-row = {}
-
-for f in features:
-    if f in cat_features:
-        if f in district_rows.columns and not district_rows[f].dropna().empty:
-            row[f] = district_rows[f].mode().iloc[0]
-        else:
-            row[f] = ""
-    else:
-        if f in district_rows.columns and not district_rows[f].dropna().empty:
-            row[f] = float(district_rows[f].mean())
-        else:
-            row[f] = 0.0
-
-# Override with system-derived values
-row["District"] = farmer_input["District"]
-row["Season"] = season
-row[ndvi_col] = ndvi_value
-
-X_sample = pd.DataFrame([row])
-
-# ==================================================
-# 9. Create CatBoost Pool
-# ==================================================
-pool = Pool(X_sample, cat_features=cat_features)
-
-# ==================================================
-# 10. Predict
-# ==================================================
-probs = model.predict_proba(pool)[0]
-classes = model.classes_
-
-top3_idx = np.argsort(probs)[::-1][:3]
-top3_crops = classes[top3_idx]
-top3_probs = probs[top3_idx]
-
-# ==================================================
-# 11. District affinity (gentle re-ranking)
-# ==================================================
 DISTRICT_AFFINITY = {
     "coimbatore": ["maize", "cotton"],
     "erode": ["turmeric", "groundnut"],
@@ -141,54 +82,291 @@ DISTRICT_AFFINITY = {
     "karaikal": ["paddy", "rice"]
 }
 
-affinity = DISTRICT_AFFINITY.get(farmer_district, [])
+def global_top_features(model, features, k=3):
+    """
+    Top-k features by the model's global importance
+    (precomputed at training time when the bundle matches the model)
+    """
+    import pandas as pd
 
-adjusted_scores = []
-for crop, prob in zip(top3_crops, top3_probs):
-    if any(a in crop.lower() for a in affinity):
-        adjusted_scores.append(prob + 0.05)
-    else:
-        adjusted_scores.append(prob)
+    bundle = load_explanations()
+    if bundle is not None:
+        return bundle.global_top_features(k)
 
-sorted_idx = np.argsort(adjusted_scores)[::-1]
-top3_crops = top3_crops[sorted_idx]
-top3_probs = top3_probs[sorted_idx]
+    importances = model.get_feature_importance()
+    fi = pd.DataFrame({
+        "feature": features,
+        "importance": importances
+    }).sort_values(by="importance", ascending=False)
 
-# ==================================================
-# 12. Relative confidence
-# ==================================================
-top3_conf = [
-    confidence_band_relative(top3_probs[0], top3_probs[1]),
-    "LOW",
-    "LOW"
-]
+    return fi.head(k)["feature"].tolist()
 
 # ==================================================
-# 13. Smart SAFE MODE
+# LOCAL EXPLANATIONS (PER-PREDICTION SHAP)
 # ==================================================
-safe_mode = False
-if top3_conf[0] == "LOW" and ndvi_value < 0.30:
-    safe_mode = True
+TOP_K_FACTORS = 3
 
-# ==================================================
-# 14. XAI (global importance)
-# ==================================================
-importances = model.get_feature_importance()
-fi = pd.DataFrame({
-    "feature": features,
-    "importance": importances
-}).sort_values(by="importance", ascending=False)
+# SHAP work allowed per batch; rows over it are served from cache or skipped
+SHAP_BUDGET_MS = 50.0
+SHAP_CACHE_SIZE = 4096
 
-top_features = fi.head(3)["feature"].tolist()
+# Starting guess for SHAP cost per row, refined from measured calls
+INITIAL_ROW_MS = 2.0
 
-# ==================================================
-# 15. OUTPUT
-# ==================================================
-def explain_prediction():
+class ShapExplainer:
+    """
+    Top-k SHAP contributions behind each prediction's top crop, from
+    CatBoost's ShapValues (contributions to that class's raw score).
+
+    Rows are explained with one call per batch and cached by the caller's
+    key, since the same locations repeat heavily. Work per batch is capped
+    at budget_ms using a running per-row cost estimate: rows over the cap
+    get None unless cached (at least one row is always computed so the
+    estimate keeps up). budget_ms=None means no cap, 0 means cache only.
+    With a `summary` (explanation_bundle.ExplanationStore), rows over the
+    cap get the training-time district/season summary instead.
+    """
+
+    def __init__(self, model, features, cat_features, top_k=TOP_K_FACTORS,
+                 budget_ms=SHAP_BUDGET_MS, cache=None, summary=None):
+        self.model = model
+        self.features = list(features)
+        self.cat_features = cat_features
+        self.top_k = top_k
+        self.budget_ms = budget_ms
+        self.cache = cache if cache is not None else AdvisoryCache(maxsize=SHAP_CACHE_SIZE)
+        self.summary = summary
+
+        self.row_ms = INITIAL_ROW_MS
+        self.computed = 0
+        self.summarized = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def row_limit(self, n):
+        if self.budget_ms is None:
+            return n
+        if self.budget_ms <= 0:
+            return 0
+        return min(n, max(1, int(self.budget_ms / self.row_ms)))
+
+    def top_factors(self, contributions):
+        order = np.argsort(-np.abs(contributions), kind="stable")[:self.top_k]
+        return [
+            {"feature": self.features[j], "contribution": round(float(contributions[j]), 4)}
+            for j in order.tolist()
+        ]
+
+    def explain(self, keys, X, class_idx, thread_count=-1, groups=None):
+        """
+        (factors, scopes) per row of X, explaining class class_idx[i].
+        keys[i] is the cache key; groups[i] = (district, season, crop) for
+        the summary fallback. Scope is PREDICTION for the row's own SHAP
+        values, TRAINING_SUMMARY for the bundle's, None when over budget
+        with nothing to fall back on (factors None).
+        """
+        factors = [self.cache.get(key) for key in keys]
+        missing = [i for i, f in enumerate(factors) if f is None]
+
+        with self._lock:
+            todo = missing[:self.row_limit(len(missing))]
+        if todo:
+            self._compute(todo, keys, X, class_idx, thread_count, factors)
+        scopes = ["PREDICTION" if f is not None else None for f in factors]
+
+        over_budget = missing[len(todo):]
+        bundle = self.summary.get() if over_budget and self.summary is not None and groups else None
+        summarized = 0
+        if bundle is not None:
+            for i in over_budget:
+                factors[i] = bundle.top_factors(*groups[i], k=self.top_k)
+                if factors[i] is not None:
+                    scopes[i] = "TRAINING_SUMMARY"
+                    summarized += 1
+
+        with self._lock:
+            self.summarized += summarized
+            self.skipped += len(over_budget) - summarized
+        return factors, scopes
+
+    def _compute(self, todo, keys, X, class_idx, thread_count, factors):
+        from catboost import Pool
+
+        start = time.perf_counter()
+        shap = np.asarray(self.model.get_feature_importance(
+            Pool(X.iloc[todo], cat_features=self.cat_features),
+            type="ShapValues",
+            thread_count=thread_count
+        ))
+        elapsed_ms = (time.perf_counter() - start) * 1e3
+
+        for n, i in enumerate(todo):
+            if shap.ndim == 3:
+                # multiclass: (rows, classes, features + bias)
+                contributions = shap[n, class_idx[i], :-1]
+            else:
+                # binary: contributions towards class 1
+                contributions = shap[n, :-1] * (1 if class_idx[i] == 1 else -1)
+            factors[i] = self.top_factors(contributions)
+            self.cache.put(keys[i], factors[i])
+
+        with self._lock:
+            self.row_ms = 0.8 * self.row_ms + 0.2 * elapsed_ms / len(todo)
+            self.computed += len(todo)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "budget_ms": self.budget_ms,
+                "row_ms_estimate": round(self.row_ms, 3),
+                "computed": self.computed,
+                "summarized": self.summarized,
+                "skipped": self.skipped,
+                "cache": self.cache.stats()
+            }
+
+def explain_district(farmer_input):
     """
     Returns XAI explanation as structured data
     """
+    import pandas as pd
+    from catboost import Pool
+
+    model, feature_schema, data = load_artifacts()
+    features = feature_schema["features"]
+    cat_features = feature_schema["cat_features"]
+
+    # ==================================================
+    # 5. Normalize district & infer season
+    # ==================================================
+    district_norm = data["District"].apply(normalize_text)
+    farmer_district = normalize_text(farmer_input["District"])
+    season = infer_season()
+
+    district_rows = data[district_norm == farmer_district]
+
+    # ==================================================
+    # 6. Fallback handling (CRITICAL)
+    # ==================================================
+    fallback_level = "DISTRICT"
+
+    if district_rows.empty:
+        fallback_level = "STATE"
+        print(
+            f"\n⚠️ District '{farmer_input['District']}' not found in dataset."
+            "\nUsing Tamil Nadu state-level statistics."
+        )
+        if "State_clean" in data.columns:
+            district_rows = data[data["State_clean"].str.lower() == "tamil nadu"]
+
+    if district_rows.empty:
+        fallback_level = "GLOBAL"
+        print("\n⚠️ State-level data unavailable. Using global dataset averages.")
+        district_rows = data
+
+    # ==================================================
+    # 7. Select NDVI column (season-aware)
+    # ==================================================
+    if season == "Kharif":
+        ndvi_col = "ndvi_kharif_mean"
+    elif season == "Rabi":
+        ndvi_col = "ndvi_rabi_mean"
+    else:
+        ndvi_col = "ndvi_mean"
 
+    if ndvi_col in district_rows.columns and not district_rows[ndvi_col].dropna().empty:
+        ndvi_value = float(district_rows[ndvi_col].mean())
+    else:
+        ndvi_value = float(data[ndvi_col].mean())
+
+    # ==================================================
+    # 8. Build FULL feature row (SAFE + CONTEXTUAL)
+    # ==================================================
+    row = {}
+
+    for f in features:
+        if f in cat_features:
+            if f in district_rows.columns and not district_rows[f].dropna().empty:
+                row[f] = district_rows[f].mode().iloc[0]
+            else:
+                row[f] = ""
+        else:
+            if f in district_rows.columns and not district_rows[f].dropna().empty:
+                row[f] = float(district_rows[f].mean())
+            else:
+                row[f] = 0.0
+
+    # Override with system-derived values
+    row["District"] = farmer_input["District"]
+    row["Season"] = season
+    row[ndvi_col] = ndvi_value
+
+    X_sample = pd.DataFrame([row])
+
+    # ==================================================
+    # 9. Create CatBoost Pool
+    # ==================================================
+    pool = Pool(X_sample, cat_features=cat_features)
+
+    # ==================================================
+    # 10. Predict
+    # ==================================================
+    probs = model.predict_proba(pool)[0]
+    classes = model.classes_
+
+    top3_idx = np.argsort(probs)[::-1][:3]
+    top3_crops = classes[top3_idx]
+    top3_probs = probs[top3_idx]
+
+    # ==================================================
+    # 11. District affinity (gentle re-ranking)
+    # ==================================================
+    affinity = DISTRICT_AFFINITY.get(farmer_district, [])
+
+    adjusted_scores = []
+    for crop, prob in zip(top3_crops, top3_probs):
+        if any(a in crop.lower() for a in affinity):
+            adjusted_scores.append(prob + 0.05)
+        else:
+            adjusted_scores.append(prob)
+
+    sorted_idx = np.argsort(adjusted_scores)[::-1]
+    top3_crops = top3_crops[sorted_idx]
+    top3_probs = top3_probs[sorted_idx]
+
+    # ==================================================
+    # 12. Relative confidence
+    # ==================================================
+    top3_conf = [
+        confidence_band_relative(top3_probs[0], top3_probs[1]),
+        "LOW",
+        "LOW"
+    ]
+
+    # ==================================================
+    # 13. Smart SAFE MODE
+    # ==================================================
+    safe_mode = False
+    if top3_conf[0] == "LOW" and ndvi_value < 0.30:
+        safe_mode = True
+
+    # ==================================================
+    # 14. XAI (training-time summary, else local SHAP)
+    # ==================================================
+    bundle = load_explanations()
+    top_factors = (
+        bundle.top_factors(farmer_district, season, top3_crops[0])
+        if bundle is not None else None
+    )
+    if top_factors is None:
+        explainer = ShapExplainer(model, features, cat_features, budget_ms=None)
+        top_class = int(np.flatnonzero(classes == top3_crops[0])[0])
+        top_factors = explainer.explain([None], X_sample, [top_class])[0][0]
+    top_features = [f["feature"] for f in top_factors]
+
+    # ==================================================
+    # 15. OUTPUT
+    # ==================================================
     explanation = {
         "top_factors": top_features,
         "safe_mode": safe_mode,
@@ -227,7 +405,9 @@ def explain_prediction():
 #     "prevent risky recommendations."
 # )
 
-print("\n✅ Explanation generated successfully")
+if __name__ == "__main__":
+    explanation = explain_district(farmer_input)
+    print("\n✅ Explanation generated successfully")
 
 
 #['ARIYALUR', 'CHENGALPATTU', 'CHENNAI', 'COIMBATORE', 'CUDDALORE', 'DHARMAPURI', 'DINDIGUL', 
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+src/zonal_ndvi.py
+
+District x month NDVI from point or gridded observations.
+
+    python src/zonal_ndvi.py                                  # data/processed/ndvi_year_grid.csv
+    python src/zonal_ndvi.py exports/ndvi_points_2020.csv ... # any lat/lon NDVI tables
+
+Observations are lon/lat cells: ingest_ndvi.py's lat/lon grid, point
+exports, or raster pixel centres. Each distinct cell is assigned to a
+district polygon of tn_districts.geojson once (district_polygons.DistrictGrid)
+and kept in a cell map on disk, keyed by the geojson's hash:
+
+    cell     = coordinates rounded to CELL_DECIMALS (ingest_ndvi rounds to 3)
+    cell map = dense int16 raster of district index over the state's bbox,
+               cells located lazily the first time they are seen
+
+Per chunk of observations the work is an index gather, then bincount /
+ufunc.at reductions over (month, district) group ids into mergeable
+sum/count/min/max/sum-of-squares (running_stats.py), so memory is one
+chunk plus one row per district-month and millions of pixels per month
+reduce in well under a second. Rows that already are aggregates (mean_ndvi
++ observations [+ min/max/std]) are merged exactly, weighted by their
+observations.
+
+raster_districts() gives the same mapping for every pixel of a regular
+lon/lat grid (one int16 per pixel), for array inputs.
+
+Output: data/processed/tn_ndvi_district_month.csv
+    District, year[, month], mean_ndvi, min_ndvi, max_ndvi, std_ndvi, observations
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from artifacts import file_digest
+from district_polygons import GEOJSON_PATH, OUTSIDE, load_district_grid
+from running_stats import STAT_COLUMNS, RunningStats
+
+CELL_MAP_DIR = "data/processed/.zonal"
+GRID_PATH = "data/processed/ndvi_year_grid.csv"
+OUT_PATH = "data/processed/tn_ndvi_district_month.csv"
+
+CELL_DECIMALS = 3
+CHUNK_ROWS = 1_000_000
+
+# Dense cell map limit (int16 each): Tamil Nadu at 3 decimals is ~24M cells
+MAX_CELLS = 100_000_000
+UNLOCATED = -2
+
+LAT_NAMES = ["lat_round", "lat", "latitude", "y"]
+LON_NAMES = ["lon_round", "lon", "longitude", "long", "x"]
+NDVI_NAMES = ["mean_ndvi", "ndvi", "ndvi_mean", "NDVI"]
+DATE_NAMES = ["date", "acq_date", "time"]
+
+
+def pick(columns, candidates):
+    lower = {c.lower(): c for c in columns}
+    return next((lower[c.lower()] for c in candidates if c.lower() in lower), None)
+
+
+# ==================================================
+# CELL -> DISTRICT MAP (COMPUTED ONCE PER CELL)
+# ==================================================
+class CellMap:
+    """
+    District index per cell of a dense lon/lat raster (cells of
+    10**-decimals degrees) over the polygons' bounding box. Cells start
+    UNLOCATED and are located against the polygons the first time an
+    observation falls in them.
+    """
+
+    def __init__(self, names, origin, shape, decimals=CELL_DECIMALS, table=None,
+                 geojson_path=GEOJSON_PATH, grid=None):
+        self.names = list(names)
+        self.decimals = decimals
+        self.scale = 10 ** decimals
+        self.origin = tuple(origin)
+        self.shape = tuple(shape)
+        if self.shape[0] * self.shape[1] > MAX_CELLS:
+            raise ValueError(f"{decimals} decimals needs {self.shape[0] * self.shape[1]:,} cells; use fewer")
+        if table is None:
+            table = np.full(self.shape, UNLOCATED, dtype=np.int16)
+        self.table = table
+        self.geojson_path = geojson_path
+        self._grid = grid
+        self.located = int((table != UNLOCATED).sum())
+        self.added = 0
+
+    @classmethod
+    def for_grid(cls, grid, decimals=CELL_DECIMALS, geojson_path=GEOJSON_PATH):
+        """
+        Empty cell map covering the bounding box of `grid`'s districts.
+        """
+        scale = 10 ** decimals
+        x_min, y_min = grid.origin
+        x_max = x_min + grid.shape[1] * grid.cell
+        y_max = y_min + grid.shape[0] * grid.cell
+        origin = (math.floor(x_min * scale) - 1, math.floor(y_min * scale) - 1)
+        shape = (math.ceil(y_max * scale) + 2 - origin[1], math.ceil(x_max * scale) + 2 - origin[0])
+        return cls(grid.names, origin, shape, decimals, geojson_path=geojson_path, grid=grid)
+
+    @property
+    def grid(self):
+        # the polygons are only needed to locate new cells
+        if self._grid is None:
+            self._grid = load_district_grid(self.geojson_path)
+        return self._grid
+
+    def lookup(self, lon, lat):
+        """
+        District index (OUTSIDE if none) per observation.
+        """
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        with np.errstate(invalid="ignore"):
+            r = np.round(lat * self.scale) - self.origin[1]
+            c = np.round(lon * self.scale) - self.origin[0]
+        inside = (r >= 0) & (r < self.shape[0]) & (c >= 0) & (c < self.shape[1])
+        flat = np.where(inside, r * self.shape[1] + c, 0).astype(np.int64)
+
+        table = self.table.ravel()
+        out = table[flat]
+        missing = inside & (out == UNLOCATED)
+        if missing.any():
+            self.add(np.unique(flat[missing]))
+            out = table[flat]
+        out = out.astype(np.int64)
+        out[~inside] = OUTSIDE
+        return out
+
+    def add(self, cells):
+        r, c = np.divmod(cells, self.shape[1])
+        lon = (c + self.origin[0]) / self.scale
+        lat = (r + self.origin[1]) / self.scale
+        self.table.ravel()[cells] = self.grid.locate(lon, lat)
+        self.located += len(cells)
+        self.added += len(cells)
+
+    @staticmethod
+    def path_for(geojson_path, decimals, cache_dir=CELL_MAP_DIR):
+        digest = file_digest(geojson_path)
+        return Path(cache_dir) / f"cells_{digest[:16]}_d{decimals}.npz"
+
+    @classmethod
+    def load(cls, geojson_path=GEOJSON_PATH, decimals=CELL_DECIMALS, cache_dir=CELL_MAP_DIR):
+        path = cls.path_for(geojson_path, decimals, cache_dir)
+        try:
+            with np.load(path) as saved:
+                return cls(saved["names"].tolist(), saved["origin"].tolist(), saved["table"].shape,
+                           decimals, saved["table"], geojson_path)
+        except (OSError, KeyError, ValueError):
+            return cls.for_grid(load_district_grid(geojson_path), decimals, geojson_path)
+
+    def save(self, cache_dir=CELL_MAP_DIR):
+        path = self.path_for(self.geojson_path, self.decimals, cache_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        # mostly long runs of one value: compresses to a small fraction
+        np.savez_compressed(tmp, table=self.table, origin=np.array(self.origin), names=np.array(self.names))
+        os.replace(tmp, path)
+
+
+def raster_districts(grid, lon0, lat0, dlon, dlat, shape, out=None):
+    """
+    District index (int16, OUTSIDE if none) of every pixel centre of a
+    regular grid whose top-left corner is (lon0, lat0), pixel size
+    (dlon, dlat) with dlat negative for north-up rasters.
+    Scanline fill: each pixel row costs one crossing computation per
+    district whose bbox it meets, whatever the number of pixels, and rows
+    are written straight into `out` (e.g. a memmap), so the build never
+    holds more than one row of its own.
+    """
+    rows, cols = shape
+    if dlon <= 0:
+        raise ValueError("dlon must be positive (west to east columns)")
+    if out is None:
+        out = np.empty(shape, dtype=np.int16)
+    out[:] = OUTSIDE
+    centres_x = lon0 + (np.arange(cols) + 0.5) * dlon
+    centres_y = lat0 + (np.arange(rows) + 0.5) * dlat
+
+    for d, e in enumerate(grid.edges):
+        x_min, y_min, x_max, y_max = e.bbox
+        if x_max < centres_x[0] or x_min > centres_x[-1]:
+            continue
+        for r in np.flatnonzero((centres_y >= y_min) & (centres_y <= y_max)):
+            xs = e.crossings_at(centres_y[r])
+            for a, b in zip(xs[0::2], xs[1::2]):
+                c0, c1 = np.searchsorted(centres_x, (a, b))
+                out[r, c0:c1] = d
+    return out
+
+
+# ==================================================
+# GROUP REDUCTIONS
+# ==================================================
+def observation_stats(values, counts=None, mins=None, maxs=None, stds=None):
+    """
+    Per-row sum/count/sumsq/min/max. Plain observations count once;
+    aggregate rows (mean + observations, optionally min/max/std) expand to
+    the stats of the rows they summarize. Missing values count zero times.
+    """
+    v = np.asarray(values, dtype=float)
+    n = np.ones(len(v)) if counts is None else np.asarray(counts, dtype=float)
+    n = np.where(np.isfinite(v) & np.isfinite(n), n, 0.0)
+    v = np.where(n > 0, v, 0.0)
+
+    if stds is None:
+        # n identical values (exact for single observations)
+        sumsq = n * v * v
+    else:
+        s = np.nan_to_num(np.asarray(stds, dtype=float))
+        sumsq = np.maximum(n - 1, 0) * s * s + n * v * v
+    lo = v if mins is None else np.asarray(mins, dtype=float)
+    hi = v if maxs is None else np.asarray(maxs, dtype=float)
+    lo = np.where(np.isfinite(lo), lo, v)
+    hi = np.where(np.isfinite(hi), hi, v)
+    return {
+        "sum": n * v,
+        "count": n,
+        "sumsq": sumsq,
+        "min": np.where(n > 0, lo, np.inf),
+        "max": np.where(n > 0, hi, -np.inf),
+    }
+
+
+def reduce_groups(group, stats, n_groups):
+    """
+    Stats per group id in [0, n_groups) (negative ids dropped), by
+    bincount for the sums and ufunc.at for min/max.
+    """
+    keep = group >= 0
+    g = group[keep]
+    out = {
+        c: np.bincount(g, weights=stats[c][keep], minlength=n_groups)
+        for c in ("sum", "count", "sumsq")
+    }
+    out["min"] = np.full(n_groups, np.inf)
+    np.minimum.at(out["min"], g, stats["min"][keep])
+    out["max"] = np.full(n_groups, -np.inf)
+    np.maximum.at(out["max"], g, stats["max"][keep])
+    return out
+
+
+def zonal_chunk(chunk, cells, cols, stats):
+    """
+    Folds one chunk of observations into `stats` (RunningStats keyed by
+    District + time columns).
+    """
+    import pandas as pd
+
+    districts = cells.lookup(chunk[cols["lon"]].to_numpy(), chunk[cols["lat"]].to_numpy())
+
+    # one code per distinct (year, month): factorize each column (fast on
+    # plain arrays), then the mixed-radix combination of the codes
+    time_keys = [c for c in ("year", "month") if c in cols]
+    combined = np.zeros(len(chunk), dtype=np.int64)
+    valid = np.ones(len(chunk), dtype=bool)
+    uniques = []
+    for k in time_keys:
+        codes, values = pd.factorize(chunk[cols[k]].to_numpy())
+        valid &= codes >= 0
+        combined = combined * len(values) + codes
+        uniques.append(values)
+    time_idx, time_codes = pd.factorize(np.where(valid, combined, -1))
+    time_values = []
+    for code in time_codes.tolist():
+        parts = []
+        for values in reversed(uniques):
+            code, i = divmod(code, len(values))
+            parts.append(values[i])
+        time_values.append(tuple(reversed(parts)))
+    # rows with a missing year/month share the code of combined == -1
+    time_idx[~valid] = -1
+
+    n_districts = len(cells.names)
+    ok = (districts != OUTSIDE) & (time_idx >= 0)
+    group = np.where(ok, time_idx * n_districts + districts, -1)
+
+    per_row = observation_stats(
+        chunk[cols["ndvi"]].to_numpy(dtype=float),
+        chunk[cols["count"]].to_numpy(dtype=float) if "count" in cols else None,
+        chunk[cols["min"]].to_numpy(dtype=float) if "min" in cols else None,
+        chunk[cols["max"]].to_numpy(dtype=float) if "max" in cols else None,
+        chunk[cols["std"]].to_numpy(dtype=float) if "std" in cols else None,
+    )
+    reduced = reduce_groups(group, per_row, len(time_values) * n_districts)
+
+    seen = np.flatnonzero(reduced["count"] > 0)
+    t, d = np.divmod(seen, n_districts)
+    index = {"District": np.array([cells.names[i].upper() for i in d.tolist()], dtype=object)}
+    for j, k in enumerate(time_keys):
+        index[k] = np.array([time_values[i][j] for i in t.tolist()])
+    table = pd.DataFrame({c: reduced[c][seen] for c in STAT_COLUMNS})
+    table.index = pd.MultiIndex.from_arrays(list(index.values()), names=list(index))
+    stats.merge_table(table)
+
+
+def detect_columns(columns):
+    cols = {
+        "lat": pick(columns, LAT_NAMES),
+        "lon": pick(columns, LON_NAMES),
+        "ndvi": pick(columns, NDVI_NAMES),
+        "year": pick(columns, ["year"]),
+        "month": pick(columns, ["month"]),
+        "date": pick(columns, DATE_NAMES),
+        "count": pick(columns, ["observations", "count"]),
+        "min": pick(columns, ["min_ndvi"]),
+        "max": pick(columns, ["max_ndvi"]),
+        "std": pick(columns, ["std_ndvi"]),
+    }
+    return {k: v for k, v in cols.items() if v is not None}
+
+
+def zonal_stats(paths, cells, chunk_rows=CHUNK_ROWS):
+    """
+    District x (year, month) NDVI over every lat/lon table in `paths`.
+    Returns (RunningStats, rows read).
+    """
+    import pandas as pd
+
+    stats = None
+    rows = 0
+    for path in paths:
+        cols = detect_columns(pd.read_csv(path, nrows=0).columns)
+        missing = {"lat", "lon", "ndvi"} - set(cols)
+        if missing:
+            raise KeyError(f"{path}: no {sorted(missing)} column")
+        usecols = sorted(set(cols.values()))
+
+        # a date column stands in for year + month
+        from_dates = "date" in cols and "year" not in cols
+        if from_dates:
+            cols.update(year="_year", month="_month")
+        keys = ["District"] + [k for k in ("year", "month") if k in cols]
+        if stats is None:
+            stats = RunningStats(keys)
+        elif stats.keys != keys:
+            raise ValueError(f"{path}: periods {keys[1:]} differ from earlier inputs ({stats.keys[1:]})")
+
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunk_rows):
+            if from_dates:
+                dates = pd.to_datetime(chunk[cols["date"]], errors="coerce")
+                chunk = chunk.assign(_year=dates.dt.year, _month=dates.dt.month)
+            zonal_chunk(chunk, cells, cols, stats)
+            rows += len(chunk)
+    return stats, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="District x month NDVI from lat/lon observations")
+    parser.add_argument("inputs", nargs="*", default=[GRID_PATH])
+    parser.add_argument("--out", default=OUT_PATH)
+    parser.add_argument("--geojson", default=GEOJSON_PATH)
+    parser.add_argument("--decimals", type=int, default=CELL_DECIMALS, help="cell size as rounding decimals")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    missing = [p for p in args.inputs if not Path(p).exists()]
+    if missing:
+        print("No NDVI observations at", missing, "- run src/ingest_ndvi.py on lat/lon NDVI files first.")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    cells = CellMap.load(args.geojson, args.decimals)
+    known = cells.located
+    stats, rows = zonal_stats(args.inputs, cells, args.chunk_rows)
+    if cells.added:
+        cells.save()
+    seconds = time.perf_counter() - start
+
+    result = stats.result(suffix="_ndvi")
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    result.to_csv(args.out, index=False)
+
+    print(f"Cells: {known} from cache, {cells.added} newly located")
+    print(f"Reduced {rows} observations in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/sec)")
+    print(f"✅ {len(result)} district-period rows "
+          f"({result['District'].nunique()} districts) saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+tests/test_predict_cache.py
+
+The advisory cache must not leak one request's location resolution into
+another that shares the cached advisory (run from the repo root):
+
+    python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from advisory_cache import AdvisoryCache
+from predict import MODEL_PATH, Predictor
+
+pytestmark = pytest.mark.skipif(
+    not (ROOT / MODEL_PATH).exists(), reason=f"{MODEL_PATH} not built (src/train_catboost_top3.py)"
+)
+
+NAME = {"District": "salem"}
+GPS = {"lat": 11.66, "lon": 78.15}
+GPS_NAMED = {"District": "salem", "lat": 11.66, "lon": 78.15}
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.fixture(scope="module")
+def uncached():
+    return Predictor()
+
+
+def method(advisory):
+    return advisory["location_resolution"]["method"]
+
+
+@pytest.mark.parametrize("order", [(NAME, GPS, GPS_NAMED), (GPS, GPS_NAMED, NAME), (GPS_NAMED, NAME, GPS)])
+def test_cached_advisory_keeps_each_requests_resolution(order, uncached):
+    cached = Predictor(cache=AdvisoryCache())
+    for farmer_input in order:
+        got = cached.predict_crop(farmer_input)
+        expected = uncached.predict_crop(farmer_input)
+        assert got["location_resolution"] == expected["location_resolution"]
+        assert got == expected
+
+    assert method(cached.predict_crop(NAME)) != "COORDINATE_MATCH"
+    assert method(cached.predict_crop(GPS)) == "COORDINATE_MATCH"
+    # name and GPS requests for the same place still share one entry
+    assert cached.cache.stats()["size"] < len(order)
+
+
+def test_no_location_is_not_outside_coverage(uncached):
+    assert method(uncached.predict_crop({"District": ""})) == "NO_LOCATION"
+    assert method(uncached.predict_crop({"lat": 20.0, "lon": 70.0})) == "OUTSIDE_COVERAGE"
@@ -1,10 +1,12 @@
-﻿import pandas as pd
-import sys
+﻿import sys
 
-path = r"data/raw/India Agriculture Crop Production.csv"
+sys.path.insert(0, "src")
+from state_partitions import NATIONAL_CSV, ensure_partitions, read_states
+
+path = NATIONAL_CSV
 
 try:
-    df = pd.read_csv(path, low_memory=False)
+    manifest = ensure_partitions(path)
 except FileNotFoundError:
     print("ERROR: file not found:", path)
     sys.exit(1)
@@ -12,19 +14,22 @@ except Exception as e:
     print("ERROR reading CSV:", e)
     sys.exit(1)
 
-# find columns that look like year columns
-year_cols = [c for c in df.columns if "year" in c.lower() or "yr"==c.lower()]
+# find columns that look like year columns (header only)
+header = manifest["header"]
+year_cols = [c for c in header if "year" in c.lower() or "yr"==c.lower()]
 
 print("Year-like columns found:", year_cols)
 
 if year_cols:
     col = year_cols[0]
     print(f"\nUsing column: {col}")
+    df = read_states(columns=[col])
     vals = df[col].dropna().astype(str).unique()[:50].tolist()
     print("Sample unique values (up to 50):")
     print(vals)
 else:
     # fallback: try to detect patterns like '2001-02' or single 4-digit years anywhere
+    df = read_states()
     possible = []
     for c in df.columns:
         s = df[c].astype(str)
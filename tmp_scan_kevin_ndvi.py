@@ -2,6 +2,9 @@
 from pathlib import Path
 import sys
 
+sys.path.insert(0, 'src')
+from excel_cache import read_excel_cached
+
 root = Path('data/external/india_drought')
 if not root.exists():
     print('ERROR: folder not found:', root)
@@ -17,7 +20,8 @@ for p in files:
     print('\\n===', p.name, '===') 
     try:
         if p.suffix.lower() in ('.xls','.xlsx'):
-            df = pd.read_excel(p, sheet_name=0, nrows=5, engine='openpyxl')
+            # parsed with openpyxl once, then read from the cache
+            df = read_excel_cached(p, sheet_name=0, nrows=5)
         else:
             df = pd.read_csv(p, nrows=5, low_memory=False)
     except Exception as e: